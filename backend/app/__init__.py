@@ -4,6 +4,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.routes import router as api_router
 from app.websockets.routes import router as websocket_router
+from app.services.transcription_backends import close_transcription_backend
+from app.services.write_batcher import close_write_batcher
 
 def create_app() -> FastAPI:
     """
@@ -30,6 +32,11 @@ def create_app() -> FastAPI:
     app.include_router(api_router, prefix="/api")
     app.include_router(websocket_router)
     
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await close_transcription_backend()
+        await close_write_batcher()
+    
     # Add health check endpoint
     @app.get("/health")
     async def health_check():
@@ -1,18 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List
 
-from app.core.security import verify_token
-from app.db.session import get_db_session
+from app.core.security import verify_token, password_pool_busy
+from app.core.passwords import PasswordHasherBusyError
+from app.db.session import get_db_session, AsyncSessionFactory
 from app.services.auth import authenticate_user, reset_password
 from app.services.transcription import (
     delete_transcription,
     delete_multiple_transcriptions,
     get_transcription_audio
 )
+from app.services.audio_stream import BytesSource, is_not_modified, open_recording, stream_response
 from app.core.logging import logger
+from app.core.metrics import metrics
 
 # Create router
 router = APIRouter()
@@ -77,7 +80,10 @@ async def get_user_profile(
 @router.post("/reset-password")
 async def reset_password_endpoint(reset_data: PasswordResetRequest, db: AsyncSession = Depends(get_db_session)):
     """Reset a user's password."""
-    success = await reset_password(reset_data.username, reset_data.new_password, db)
+    try:
+        success = await reset_password(reset_data.username, reset_data.new_password, db)
+    except PasswordHasherBusyError:
+        raise password_pool_busy()
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -137,11 +143,25 @@ async def delete_multiple_transcriptions_endpoint(
 @router.get("/transcriptions/{transcription_id}/audio")
 async def get_transcription_audio_endpoint(
     transcription_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db_session),
     user = Depends(verify_token)
 ):
-    """Get audio data for a transcription."""
+    """Get audio data for a transcription, honouring Range requests."""
     try:
+        recording = await open_recording(db, transcription_id, AsyncSessionFactory)
+        if recording is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Transcription with ID {transcription_id} not found"
+            )
+        
+        # The rendition is named after the recording's content, so a client that
+        # has it already is answered before anything is converted
+        etag = f'"{recording.content_hash}-mp4"' if recording.content_hash else None
+        if is_not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        
         audio_data, mime_type = await get_transcription_audio(db, transcription_id)
         if not audio_data:
             raise HTTPException(
@@ -149,15 +169,11 @@ async def get_transcription_audio_endpoint(
                 detail=f"Transcription with ID {transcription_id} not found"
             )
         
-        # Return the audio data with appropriate headers
-        return Response(
-            content=audio_data,
-            media_type=mime_type,
-            headers={
-                "Content-Disposition": f"attachment; filename=transcription_{transcription_id}.{mime_type.split('/')[-1]}",
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "no-cache, no-store, must-revalidate"
-            }
+        return stream_response(
+            request,
+            BytesSource(audio_data, etag),
+            mime_type,
+            {"Content-Disposition": f"attachment; filename=transcription_{transcription_id}.{mime_type.split('/')[-1]}"}
         )
     except HTTPException:
         raise
@@ -166,4 +182,14 @@ async def get_transcription_audio_endpoint(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch audio"
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/metrics")
+async def get_metrics_endpoint(current_user = Depends(verify_token)):
+    """Get in-process counters (VAD savings, caches, queues). Admin only."""
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return metrics.snapshot()
@@ -11,6 +11,7 @@ from app.core.logging import logger
 from app.core.security import create_access_token
 from app.db.session import get_db_session
 from app.models.user import users
+from app.services.principal_cache import principal_cache
 
 load_dotenv()
 
@@ -83,6 +84,7 @@ async def google_auth_callback(code: str, db: AsyncSession = Depends(get_db_sess
             query = users.insert().values(**user_data)
             await db.execute(query)
             await db.commit()
+            principal_cache.invalidate(user_data["username"])
             
             # Get the newly created user
             query = select(users).where(users.c.email == user_info["email"])
@@ -0,0 +1,35 @@
+from typing import Dict, Any
+
+class Metrics:
+    """In-process counters, gauges and timing summaries exposed on /api/metrics."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        """Add value to a counter."""
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Record the current value of a gauge."""
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record one sample of a timing, keeping count, sum and max."""
+        timing = self._timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["sum"] += value
+        timing["max"] = max(timing["max"], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of all metrics."""
+        return {
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "timings": {name: dict(timing) for name, timing in self._timings.items()}
+        }
+
+# Create metrics instance
+metrics = Metrics()
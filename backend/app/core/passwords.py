@@ -0,0 +1,81 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# bcrypt takes a few hundred milliseconds per call by design. Run on the event
+# loop it would stall every socket of the worker, so all hashing and checking
+# goes through a small thread pool (bcrypt releases the GIL). Work beyond the
+# pool and its queue is refused rather than left to pile up during a login burst.
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the password pool and its queue are full."""
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt, with admission control."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0  # Running plus waiting
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Run a password function in the pool.
+
+        Raises:
+            PasswordHasherBusyError: if max_queue calls are already waiting for a thread
+        """
+        if self._in_flight >= self.workers + self.max_queue:
+            metrics.incr("passwords.rejected")
+            raise PasswordHasherBusyError(f"{self._in_flight} password operations in progress")
+
+        self._in_flight += 1
+        self._report_queue()
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            metrics.observe("passwords.wait_seconds", started - submitted)
+            try:
+                return func(*args)
+            finally:
+                metrics.observe("passwords.hash_seconds", time.perf_counter() - started)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._in_flight -= 1
+            self._report_queue()
+
+    async def check(self, password: bytes, hashed: bytes) -> bool:
+        """bcrypt.checkpw in the pool."""
+        return await self.run(bcrypt.checkpw, password, hashed)
+
+    def _report_queue(self):
+        metrics.set_gauge("passwords.queue_depth", max(0, self._in_flight - self.workers))
+
+_hasher: Optional[PasswordHasher] = None
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the process-wide password pool."""
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+    return _hasher
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """
+    Check a password against its stored bcrypt hash.
+
+    Raises:
+        PasswordHasherBusyError: if the password pool and its queue are full
+    """
+    # Compare the hashes, off the event loop; stripped as in hash_password
+    return await get_password_hasher().check(password.strip().encode('utf-8'), hashed.encode('utf-8'))
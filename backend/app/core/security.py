@@ -10,8 +10,10 @@ from sqlalchemy import select
 
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.passwords import PasswordHasherBusyError, verify_password
 from app.db.session import get_db_session
 from app.models.user import users
+from app.services.principal_cache import get_principal
 
 # Security scheme for JWT
 security = HTTPBearer()
@@ -28,6 +30,14 @@ def hash_password(plain_password: str) -> str:
     # Return the hash as a string
     return hashed.decode('utf-8')
 
+def password_pool_busy() -> HTTPException:
+    """Response for a password operation refused because the password pool is saturated."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password operations in progress, try again shortly",
+        headers={"Retry-After": "1"}
+    )
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -58,9 +68,7 @@ async def verify_token(
             detail="Invalid authentication credentials"
         )
     
-    query = select(users).where(users.c.username == username)
-    result = await db.execute(query)
-    user = result.fetchone()
+    user = await get_principal(db, username)
     
     if user is None:
         raise HTTPException(
@@ -87,13 +95,8 @@ async def verify_user(username: str, password: str, db: AsyncSession):
     
     logger.debug(f"Found user: {user.username}, role: {user.role}")
     
-    # Convert password to bytes for bcrypt
-    password_bytes = password.strip().encode('utf-8')
-    stored_hash_bytes = user.password_hash.encode('utf-8')
-    
     try:
-        # Compare the hashes
-        is_valid = bcrypt.checkpw(password_bytes, stored_hash_bytes)
+        is_valid = await verify_password(password, user.password_hash)
         logger.debug(f"Password check result: {is_valid}")
         
         if not is_valid:
@@ -105,6 +108,9 @@ async def verify_user(username: str, password: str, db: AsyncSession):
             
         return user
         
+    except PasswordHasherBusyError as e:
+        logger.warning(f"Refusing login of {username}: {e}")
+        raise password_pool_busy()
     except Exception as e:
         logger.error(f"Error during password check: {str(e)}")
         import traceback
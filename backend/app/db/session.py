@@ -1,3 +1,4 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
@@ -12,9 +13,27 @@ AsyncSessionFactory = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# WebSocket ingest writes go through a pool of their own, so many live
+# recordings cannot take every connection the API needs, and vice versa
+writer_url = settings.WRITER_DATABASE_URL or settings.DATABASE_URL
+writer_pool_options = {}
+if make_url(writer_url).get_backend_name() != "sqlite":
+    # SQLite engines (the tests) use a single connection or none, not a sized QueuePool
+    writer_pool_options = dict(
+        pool_size=settings.WRITER_POOL_SIZE,
+        max_overflow=settings.WRITER_MAX_OVERFLOW,
+        pool_timeout=settings.WRITER_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+writer_engine = create_async_engine(writer_url, **writer_pool_options)
+
+WriterSessionFactory = sessionmaker(
+    writer_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 async def get_db_session() -> AsyncSession:
     """Dependency to get an async database session."""
     logger.debug("Creating new database session")
     async with AsyncSessionFactory() as session:
         logger.debug("Database session created successfully")
-        yield session 
\ No newline at end of file
+        yield session
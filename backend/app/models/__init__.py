@@ -1,6 +1,6 @@
 from app.models.base import metadata, create_tables
 from app.models.user import users
-from app.models.transcription import voice_records
+from app.models.transcription import voice_records, voice_chunks, transcription_jobs
 from app.models.schemas import User
 
-__all__ = ["metadata", "create_tables", "users", "voice_records", "User"] 
\ No newline at end of file
+__all__ = ["metadata", "create_tables", "users", "voice_records", "voice_chunks", "transcription_jobs", "User"]
@@ -1,4 +1,5 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey, LargeBinary, Text, DateTime, JSON, String
+from sqlalchemy import Table, Column, Integer, BigInteger, ForeignKey, LargeBinary, Text, DateTime, JSON, String, UniqueConstraint, Index
+from sqlalchemy import text
 from datetime import datetime
 
 from app.models.base import metadata
@@ -9,10 +10,46 @@ voice_records = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("user_id", Integer, ForeignKey("users.id")),
-    Column("audio_byte", LargeBinary),
+    Column("audio_byte", LargeBinary),  # NULL once the audio is in the blob store
+    Column("audio_ref", String(64), nullable=True, index=True),  # SHA-256 of the finished audio; in the blob store when audio_byte is NULL
     Column("transcript", Text),
     Column("created_at", DateTime, default=datetime.utcnow),
     Column("client_info", JSON, nullable=True),  # Store client information as JSON
     Column("session_id", String, nullable=True),
-    Column("client_type", String(20))  # Regular VARCHAR column for client type
-) 
\ No newline at end of file
+    Column("client_type", String(20)),  # Regular VARCHAR column for client type
+    # Metadata of audio_byte, so listings never have to read the blob
+    Column("audio_size", BigInteger, nullable=True),  # Bytes, including chunks not yet folded in
+    Column("audio_duration_ms", Integer, nullable=True),  # Set when the recording is finalized
+    Column("audio_codec", String(32), nullable=True),  # As named by ffmpeg, e.g. opus or aac
+    # Keyset pagination of the transcription list, newest first
+    Index("idx_voice_records_user_created_id", "user_id", text("created_at DESC"), text("id DESC")),
+    Index("idx_voice_records_created_id", text("created_at DESC"), text("id DESC"))
+)
+
+# Append-only audio chunks of a recording; folded into voice_records.audio_byte on session close
+voice_chunks = Table(
+    "voice_chunks",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("record_id", Integer, ForeignKey("voice_records.id", ondelete="CASCADE"), nullable=False),
+    Column("seq", Integer, nullable=False),  # 0-based position of the chunk within the recording
+    Column("chunk_byte", LargeBinary, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+    UniqueConstraint("record_id", "seq", name="uq_voice_chunks_record_seq")
+)
+
+# Durable transcription work, claimed by transcription_worker.py with SELECT ... FOR UPDATE SKIP LOCKED
+transcription_jobs = Table(
+    "transcription_jobs",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("record_id", Integer, ForeignKey("voice_records.id", ondelete="CASCADE"), nullable=False),
+    Column("status", String(20), nullable=False, default="queued"),  # queued, running, done or failed
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("run_after", DateTime, nullable=False, default=datetime.utcnow),  # Not claimed before this time
+    Column("locked_until", DateTime, nullable=True),  # Visibility timeout of a running job
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime, default=datetime.utcnow),
+    Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    Index("idx_transcription_jobs_status_run_after", "status", "run_after")
+)
@@ -0,0 +1,122 @@
+import logging
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.transcription import voice_records
+from app.services.ffmpeg import run_ffmpeg, FFmpegError
+from app.services.recording import load_recording_audio
+
+logger = logging.getLogger(__name__)
+
+# MediaRecorder streams carry no duration in their headers, so the audio is
+# decoded to the null muxer and the duration read from ffmpeg's last progress line.
+_TIME_RE = re.compile(r"time=(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_CODEC_RE = re.compile(r"Stream #\d+:\d+.*?: Audio: (\w+)")
+
+def parse_probe_output(stderr: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Read duration and codec from the stderr of an ffmpeg decode.
+
+    Returns:
+        (duration in milliseconds, codec name); either is None if not found
+    """
+    duration_ms = None
+    times = _TIME_RE.findall(stderr)
+    if times:
+        hours, minutes, seconds = times[-1]
+        duration_ms = round((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1000)
+    codec = _CODEC_RE.search(stderr)
+    return duration_ms, codec.group(1) if codec else None
+
+async def probe_audio(audio_data: bytes) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Duration and codec of encoded audio.
+
+    Returns:
+        (duration in milliseconds, codec name), or (None, None) if ffmpeg cannot read it
+    """
+    try:
+        result = await run_ffmpeg(
+            ['-hide_banner', '-i', 'pipe:0', '-vn', '-f', 'null', '-'],
+            input_data=audio_data
+        )
+    except FFmpegError as e:
+        logger.warning(f"Could not probe audio ({len(audio_data)} bytes): {e.stderr or e}")
+        return None, None
+    return parse_probe_output(result.stderr)
+
+async def store_audio_metadata(db: AsyncSession, record_id: int, audio_data: bytes) -> Optional[int]:
+    """
+    Probe the full audio of a recording and store its size, duration and codec.
+
+    Returns:
+        The duration in milliseconds, or None if it could not be probed
+    """
+    duration_ms, codec = await probe_audio(audio_data)
+    update_query = (
+        update(voice_records)
+        .where(voice_records.c.id == record_id)
+        .values(audio_size=len(audio_data), audio_duration_ms=duration_ms, audio_codec=codec)
+    )
+    await db.execute(update_query)
+    await db.commit()
+    return duration_ms
+
+async def backfill_audio_metadata(db: AsyncSession, batch_size: int = 100, probe: bool = True) -> Tuple[int, int]:
+    """
+    Fill in the metadata columns of recordings stored before they existed.
+
+    Sizes are computed in SQL, which reads them from the column header without
+    loading the blobs. With probe set, recordings without a duration are then
+    loaded and probed one at a time.
+
+    Returns:
+        Number of recordings given a size, and number of recordings probed
+    """
+    sized = 0
+    while True:
+        query = select(voice_records.c.id).where(voice_records.c.audio_size.is_(None)).limit(batch_size)
+        result = await db.execute(query)
+        ids = [row.id for row in result.fetchall()]
+        if not ids:
+            break
+        update_query = (
+            update(voice_records)
+            .where(voice_records.c.id.in_(ids))
+            .values(audio_size=func.coalesce(func.length(voice_records.c.audio_byte), 0))
+        )
+        await db.execute(update_query)
+        await db.commit()
+        sized += len(ids)
+        logger.info(f"Backfilled the size of {sized} recordings")
+
+    if not probe:
+        return sized, 0
+
+    # Ids only move forward, so recordings ffmpeg cannot read are tried once per run
+    last_id = 0
+    probed = 0
+    while True:
+        query = (
+            select(voice_records.c.id)
+            .where(voice_records.c.audio_duration_ms.is_(None))
+            .where(voice_records.c.audio_size > 0)
+            .where(voice_records.c.id > last_id)
+            .order_by(voice_records.c.id)
+            .limit(batch_size)
+        )
+        result = await db.execute(query)
+        ids = [row.id for row in result.fetchall()]
+        if not ids:
+            break
+        for record_id in ids:
+            audio_data = await load_recording_audio(db, record_id)
+            if audio_data:
+                await store_audio_metadata(db, record_id, audio_data)
+                probed += 1
+        last_id = ids[-1]
+        logger.info(f"Probed {probed} recordings")
+    return sized, probed
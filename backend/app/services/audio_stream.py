@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.transcription import voice_records, voice_chunks
+from app.services.blob_store import BlobNotFoundError, get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# Audio is sent in pieces of AUDIO_STREAM_CHUNK_BYTES read straight from where it
+# is stored, so neither a full download nor a seek loads the recording into memory.
+
+class RangeNotSatisfiableError(Exception):
+    """Raised for a Range header that selects no bytes of the body."""
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Read a Range header.
+
+    Only a single byte range is honoured; anything else is ignored, as RFC 9110
+    allows, and the whole body is sent.
+
+    Returns:
+        (start, end) byte offsets, end exclusive, or None for the whole body
+
+    Raises:
+        RangeNotSatisfiableError: if the range starts past the end of the body
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiableError(f"Empty suffix range {header}")
+            start, end = max(0, size - length), size
+        else:
+            start = int(first)
+            end = size if not last else int(last) + 1
+            if last and end <= start:
+                return None
+            if start >= size:
+                raise RangeNotSatisfiableError(f"Range {header} is past the end of {size} bytes")
+            end = min(end, size)
+    except ValueError:
+        return None
+    if start >= end:
+        # Suffix range of an empty body
+        raise RangeNotSatisfiableError(f"Range {header} selects nothing of {size} bytes")
+    return start, end
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    """Whether the client's If-None-Match already names etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not etag or not if_none_match:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
+
+class AudioSource(ABC):
+    """Bytes of one audio file, readable in pieces."""
+
+    size = 0
+    etag: Optional[str] = None
+
+    @abstractmethod
+    def read(self, start: int, end: int) -> AsyncIterator[bytes]:
+        """Yield the bytes from start to end (exclusive) in pieces of at most AUDIO_STREAM_CHUNK_BYTES."""
+
+class BytesSource(AudioSource):
+    """Audio already in memory, such as a rendition made for the request."""
+
+    def __init__(self, data: bytes, etag: Optional[str] = None):
+        self.data = data
+        self.size = len(data)
+        self.etag = etag or f'"{hashlib.sha256(data).hexdigest()}"'
+
+    async def read(self, start: int, end: int) -> AsyncIterator[bytes]:
+        view = memoryview(self.data)
+        for position in range(start, end, settings.AUDIO_STREAM_CHUNK_BYTES):
+            yield bytes(view[position:min(end, position + settings.AUDIO_STREAM_CHUNK_BYTES)])
+
+class _Segment:
+    """A stretch of a recording: its blob, its audio_byte or one pending chunk."""
+
+    def __init__(self, size: int, store=None, ref: Optional[str] = None, column=None, key_column=None, key: Optional[int] = None):
+        self.size = size
+        self.store = store
+        self.ref = ref
+        self.column = column
+        self.key_column = key_column
+        self.key = key
+
+    async def read(self, db: AsyncSession, offset: int, length: int) -> Optional[bytes]:
+        if self.ref is not None:
+            return await asyncio.to_thread(self.store.read_range, self.ref, offset, length)
+        # substring() on the server, so only the requested slice crosses the connection
+        query = select(func.substring(self.column, offset + 1, length)).where(self.key_column == self.key)
+        result = await db.execute(query)
+        return result.scalar()
+
+class RecordingSource(AudioSource):
+    """
+    A stored recording: its blob or audio_byte, followed by any pending chunks.
+
+    Database slices are read with a session of their own, so the body can be
+    streamed after the request's session is gone.
+    """
+
+    def __init__(self, segments: List[_Segment], content_hash: Optional[str], session_factory):
+        self.segments = segments
+        self.size = sum(segment.size for segment in segments)
+        self.content_hash = content_hash
+        self.etag = f'"{content_hash}"' if content_hash else None
+        self.session_factory = session_factory
+
+    async def read(self, start: int, end: int) -> AsyncIterator[bytes]:
+        async with self.session_factory() as db:
+            segment_start = 0
+            for segment in self.segments:
+                segment_end = segment_start + segment.size
+                position = max(start, segment_start)
+                while position < min(end, segment_end):
+                    length = min(settings.AUDIO_STREAM_CHUNK_BYTES, min(end, segment_end) - position)
+                    data = await segment.read(db, position - segment_start, length)
+                    if not data:
+                        # Folded or moved to the blob store while streaming; the client retries
+                        logger.warning(f"Recording changed while streaming, stopping at byte {position}")
+                        return
+                    yield data
+                    position += len(data)
+                segment_start = segment_end
+
+async def open_recording(db: AsyncSession, record_id: int, session_factory) -> Optional[RecordingSource]:
+    """
+    Locate the audio of a recording without reading it.
+
+    Only finished recordings have a content_hash, and so an ETag; one still
+    receiving chunks has no stable validator.
+
+    Returns:
+        The recording's audio, or None if there is no such recording
+    """
+    query = select(
+        voice_records.c.audio_ref,
+        (voice_records.c.audio_byte.is_(None)).label("in_store"),
+        func.length(voice_records.c.audio_byte).label("stored_size")
+    ).where(voice_records.c.id == record_id)
+    result = await db.execute(query)
+    record = result.fetchone()
+    if not record:
+        return None
+
+    segments = []
+    if record.in_store and record.audio_ref:
+        store = get_blob_store()
+        if store is None:
+            raise BlobNotFoundError(f"Audio {record.audio_ref} is in the blob store but BLOB_STORE_DIR is not set")
+        size = await asyncio.to_thread(store.size, record.audio_ref)
+        segments.append(_Segment(size, store=store, ref=record.audio_ref))
+    elif record.stored_size:
+        segments.append(_Segment(record.stored_size, column=voice_records.c.audio_byte, key_column=voice_records.c.id, key=record_id))
+
+    query = (
+        select(voice_chunks.c.id, func.length(voice_chunks.c.chunk_byte).label("size"))
+        .where(voice_chunks.c.record_id == record_id)
+        .order_by(voice_chunks.c.seq)
+    )
+    result = await db.execute(query)
+    chunks = result.fetchall()
+    for chunk in chunks:
+        segments.append(_Segment(chunk.size, column=voice_chunks.c.chunk_byte, key_column=voice_chunks.c.id, key=chunk.id))
+
+    content_hash = record.audio_ref if not chunks else None
+    return RecordingSource(segments, content_hash, session_factory)
+
+def stream_response(request: Request, source: AudioSource, media_type: str, headers: Dict[str, str]) -> Response:
+    """
+    Response for a GET of source that honours Range, If-Range and If-None-Match.
+
+    Args:
+        request: The incoming request, for its conditional and Range headers
+        source: The audio to send
+        media_type: Content type of the audio
+        headers: Extra response headers, such as Content-Disposition
+
+    Returns:
+        A 200 or 206 streaming response, a 304 or a 416
+    """
+    headers = dict(headers, **{"Accept-Ranges": "bytes", "Cache-Control": "private, no-cache"})
+    if source.etag:
+        headers["ETag"] = source.etag
+    if is_not_modified(request, source.etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    # A Range only applies to the representation the client already has part of
+    if if_range is None or (source.etag is not None and if_range.strip() == source.etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), source.size)
+        except RangeNotSatisfiableError:
+            headers["Content-Range"] = f"bytes */{source.size}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(source.size)
+        return StreamingResponse(source.read(0, source.size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{source.size}"
+    headers["Content-Length"] = str(end - start)
+    return StreamingResponse(source.read(start, end), status_code=206, media_type=media_type, headers=headers)
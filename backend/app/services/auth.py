@@ -5,7 +5,9 @@ from sqlalchemy import select
 from app.core.config import settings
 from app.core.logging import logger
 from app.core.security import verify_user, create_access_token, hash_password
+from app.core.passwords import PasswordHasherBusyError, get_password_hasher
 from app.models.user import users
+from app.services.principal_cache import principal_cache
 
 async def authenticate_user(username: str, password: str, db: AsyncSession):
     """Authenticate a user and return a JWT token."""
@@ -45,7 +47,7 @@ async def reset_password(username: str, new_password: str, db: AsyncSession):
             return False
         
         # Hash the new password
-        hashed_password = hash_password(new_password)
+        hashed_password = await get_password_hasher().run(hash_password, new_password)
         
         # Update the user's password
         update_query = (
@@ -56,8 +58,11 @@ async def reset_password(username: str, new_password: str, db: AsyncSession):
         
         await db.execute(update_query)
         await db.commit()
+        principal_cache.invalidate(username)
         
         return True
+    except PasswordHasherBusyError:
+        raise
     except Exception as e:
         logger.error(f"Password reset error: {str(e)}")
         return False 
\ No newline at end of file
@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import time
+from typing import Iterator, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Recordings are stored once per distinct content, named by their SHA-256. The
+# database keeps only the hash (voice_records.audio_ref), so the table and its
+# TOAST stay small, and identical audio is written once however many rows use it.
+
+class BlobNotFoundError(Exception):
+    """Raised when a referenced blob is missing from the store."""
+
+class BlobStore:
+    """
+    Content-addressed files under a local directory.
+
+    A blob with hash abcdef... lives at root/ab/cd/abcdef..., so no directory
+    grows past 65536 entries. Writes go to a temporary file that is renamed
+    into place, so a blob is either complete or absent.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ref: str) -> str:
+        return os.path.join(self.root, ref[:2], ref[2:4], ref)
+
+    def put(self, data: bytes) -> str:
+        """Store data and return its reference; content already stored is not written again."""
+        ref = hashlib.sha256(data).hexdigest()
+        path = self.path(ref)
+        if os.path.exists(path):
+            # Fresh again, so garbage collection leaves it to the row about to refer to it
+            os.utime(path)
+            metrics.incr("blob_store.dedup_hits")
+            return ref
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                os.fchmod(f.fileno(), 0o644)  # mkstemp creates files only the owner can read
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        metrics.incr("blob_store.writes")
+        metrics.incr("blob_store.bytes_written", len(data))
+        return ref
+
+    def size(self, ref: str) -> int:
+        try:
+            return os.path.getsize(self.path(ref))
+        except FileNotFoundError:
+            raise BlobNotFoundError(f"Blob {ref} not found")
+
+    def open(self, ref: str):
+        """
+        Map a blob read-only; slicing the result reads straight from the page cache.
+
+        Returns:
+            An mmap to use as a context manager, or an empty bytes object for an empty blob
+        """
+        try:
+            with open(self.path(ref), 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            raise BlobNotFoundError(f"Blob {ref} not found")
+
+    def read_range(self, ref: str, offset: int, length: int) -> bytes:
+        blob = self.open(ref)
+        if not blob:
+            return b""
+        with blob:
+            return blob[offset:offset + length]
+
+    def read(self, ref: str) -> bytes:
+        blob = self.open(ref)
+        if not blob:
+            return b""
+        with blob:
+            return blob[:]
+
+    def delete(self, ref: str):
+        try:
+            os.unlink(self.path(ref))
+        except FileNotFoundError:
+            pass
+
+    def refs(self, older_than: Optional[float] = None) -> Iterator[str]:
+        """Every stored reference, optionally only blobs last written more than older_than seconds ago."""
+        cutoff = time.time() - older_than if older_than is not None else None
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                if cutoff is not None and os.path.getmtime(os.path.join(directory, name)) > cutoff:
+                    continue
+                yield name
+
+_store: Optional[BlobStore] = None
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Return the process-wide store, or None when BLOB_STORE_DIR is not set."""
+    global _store
+    if _store is None and settings.BLOB_STORE_DIR:
+        _store = BlobStore(settings.BLOB_STORE_DIR)
+    return _store
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import tempfile
+from typing import List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# All ffmpeg calls go through run_ffmpeg so that a conversion never blocks the
+# event loop and the number of concurrent processes per worker stays bounded.
+
+_semaphore: Optional[asyncio.Semaphore] = None
+
+class FFmpegError(Exception):
+    """Raised when an ffmpeg process fails or times out."""
+
+    def __init__(self, message: str, returncode: Optional[int] = None, stderr: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+
+class FFmpegTimeoutError(FFmpegError):
+    """Raised when an ffmpeg process exceeds its timeout."""
+
+class FFmpegResult:
+    """Outcome of a finished ffmpeg process."""
+
+    def __init__(self, returncode: int, stdout: bytes, stderr: str):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.FFMPEG_MAX_CONCURRENCY)
+    return _semaphore
+
+async def _kill(process: asyncio.subprocess.Process):
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+async def run_ffmpeg(
+    args: List[str],
+    input_data: Optional[bytes] = None,
+    timeout: Optional[float] = None,
+    check: bool = True,
+    pass_fds: Sequence[int] = ()
+) -> FFmpegResult:
+    """
+    Run ffmpeg asynchronously.
+
+    Args:
+        args: Command line arguments, without the ffmpeg binary itself
+        input_data: Bytes to write to the process stdin, if any
+        timeout: Seconds before the process is killed (defaults to FFMPEG_TIMEOUT_SECONDS)
+        check: Raise FFmpegError when ffmpeg exits with a non-zero code
+        pass_fds: File descriptors the process inherits
+
+    Returns:
+        The process result with stdout bytes and decoded stderr
+    """
+    if timeout is None:
+        timeout = settings.FFMPEG_TIMEOUT_SECONDS
+
+    async with _get_semaphore():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                settings.FFMPEG_BINARY, *args,
+                stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=pass_fds
+            )
+        except OSError as e:
+            # A missing or unusable binary fails like a conversion, so callers' fallbacks apply
+            raise FFmpegError(f"Could not start {settings.FFMPEG_BINARY}: {e}")
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(input_data), timeout)
+        except asyncio.TimeoutError:
+            await _kill(process)
+            raise FFmpegTimeoutError(f"ffmpeg timed out after {timeout}s")
+        except asyncio.CancelledError:
+            # Do not leave orphaned ffmpeg processes behind a cancelled task
+            await _kill(process)
+            raise
+
+    result = FFmpegResult(process.returncode, stdout, stderr.decode(errors="replace"))
+    if check and result.returncode != 0:
+        raise FFmpegError(
+            f"ffmpeg exited with code {result.returncode}",
+            returncode=result.returncode,
+            stderr=result.stderr
+        )
+    return result
+
+class _SeekableBuffer:
+    """
+    Seekable file shared with ffmpeg for muxers and demuxers that cannot use a pipe.
+
+    Backed by a memfd where the platform has one, so the bytes never leave
+    memory; otherwise by a file in the TRANSCODE_SCRATCH_DIR tmpfs.
+    """
+
+    def __init__(self):
+        self.pass_fds = ()
+        self._scratch_path = None
+        try:
+            self.fd = os.memfd_create("ffmpeg")
+            self.path = f"/dev/fd/{self.fd}"
+            self.pass_fds = (self.fd,)
+        except (AttributeError, OSError):
+            metrics.incr("ffmpeg.scratch_fallbacks")
+            self.fd, self._scratch_path = tempfile.mkstemp(dir=settings.TRANSCODE_SCRATCH_DIR or None)
+            self.path = self._scratch_path
+
+    def write(self, data: bytes):
+        with open(self.fd, 'wb', closefd=False) as f:
+            f.write(data)
+
+    def read(self) -> bytes:
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        with open(self.fd, 'rb', closefd=False) as f:
+            return f.read()
+
+    def close(self):
+        os.close(self.fd)
+        if self._scratch_path:
+            os.unlink(self._scratch_path)
+
+async def transcode(
+    input_data: bytes,
+    output_args: List[str],
+    input_args: Optional[List[str]] = None,
+    seekable_input: bool = False,
+    seekable_output: bool = False,
+    timeout: Optional[float] = None
+) -> bytes:
+    """
+    Convert audio in memory and return the output bytes.
+
+    Input and output go through stdin and stdout. Formats that need to seek
+    (an MP4 with its index at the end, or an MP4 being written) use a
+    memory-backed file instead; see _SeekableBuffer.
+
+    Args:
+        input_data: Audio to convert
+        output_args: Codec options, ending with '-f <format>' since there is
+            no file name to guess the format from
+        input_args: Options placed before the input, e.g. ['-f', 'mp4']
+        seekable_input: Give ffmpeg a seekable copy of the input instead of stdin
+        seekable_output: Let ffmpeg write to a seekable file instead of stdout
+        timeout: Seconds before the process is killed
+
+    Raises:
+        FFmpegError: if ffmpeg fails
+    """
+    buffers = []
+    try:
+        if seekable_input:
+            source = _SeekableBuffer()
+            buffers.append(source)
+            source.write(input_data)
+            input_path = source.path
+        else:
+            input_path = 'pipe:0'
+        if seekable_output:
+            target = _SeekableBuffer()
+            buffers.append(target)
+            output_path = target.path
+        else:
+            output_path = 'pipe:1'
+
+        result = await run_ffmpeg(
+            ['-y', *(input_args or []), '-i', input_path, *output_args, output_path],
+            input_data=None if seekable_input else input_data,
+            timeout=timeout,
+            pass_fds=[fd for buffer in buffers for fd in buffer.pass_fds]
+        )
+        return target.read() if seekable_output else result.stdout
+    finally:
+        for buffer in buffers:
+            buffer.close()
@@ -0,0 +1,79 @@
+import struct
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Top-level boxes that carry no media and are dropped
+SKIPPED_BOX_TYPES = {b'free', b'skip', b'mfra'}
+
+class MP4ParseError(Exception):
+    """Raised when the stream is not an MP4 box stream we can split."""
+
+class FragmentedMP4Parser:
+    """
+    Incremental top-level box parser for the fragmented MP4 (moof/mdat) stream
+    recorded on iOS.
+
+    The init segment (ftyp + moov) from the first chunk is kept, and every later
+    fragment can be turned into a standalone .m4a file by prefixing it, without
+    running ffmpeg.
+    """
+
+    def __init__(self):
+        self.init_segment: Optional[bytes] = None
+        self._init_parts: List[bytes] = []
+        self._buffer = bytearray()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the init segment has been received."""
+        return self.init_segment is not None
+
+    def feed(self, data: bytes) -> bytes:
+        """
+        Parse the next chunk of the stream.
+
+        Returns:
+            The complete media boxes (moof, mdat, ...) contained in this chunk; a
+            box cut at the end of the chunk is held back until the rest arrives
+        """
+        self._buffer += data
+        fragments = bytearray()
+        pos = 0
+        try:
+            while len(self._buffer) - pos >= 8:
+                size, box_type = struct.unpack_from(">I4s", self._buffer, pos)
+                header_length = 8
+                if size == 1:
+                    if len(self._buffer) - pos < 16:
+                        break
+                    size = struct.unpack_from(">Q", self._buffer, pos + 8)[0]
+                    header_length = 16
+                elif size == 0:
+                    raise MP4ParseError(f"Box {box_type!r} without a size is not supported")
+                if size < header_length or not all(0x20 <= c <= 0x7E for c in box_type):
+                    raise MP4ParseError(f"Invalid MP4 box header at offset {pos}")
+                if len(self._buffer) - pos < size:
+                    break
+
+                box = bytes(self._buffer[pos:pos + size])
+                pos += size
+                if box_type == b'ftyp':
+                    # A new file starts; its moov replaces the previous init segment
+                    self._init_parts = [box]
+                elif box_type == b'moov':
+                    self._init_parts.append(box)
+                    self.init_segment = b"".join(self._init_parts)
+                    logger.debug(f"MP4 init segment captured ({len(self.init_segment)} bytes)")
+                elif box_type not in SKIPPED_BOX_TYPES:
+                    fragments += box
+        finally:
+            del self._buffer[:pos]
+        return bytes(fragments)
+
+    def standalone(self, fragments: bytes) -> bytes:
+        """Build a standalone .m4a file from media boxes returned by feed()."""
+        if not self.ready:
+            raise MP4ParseError("Init segment has not been received yet")
+        return self.init_segment + fragments
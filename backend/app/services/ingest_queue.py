@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Backpressure policies applied when the queue is full. All of them keep chunk order.
+DROP_PREVIEW = "drop_preview"  # Receiver waits for space; quick transcriptions are skipped while backlogged
+COALESCE = "coalesce"  # The new chunk is appended to the last queued one; the receiver never waits
+SIGNAL = "signal"  # The client is told about the backlog, then the receiver waits for space
+POLICIES = {DROP_PREVIEW, COALESCE, SIGNAL}
+
+class ChunkQueue:
+    """Bounded FIFO of audio chunks between a socket receiver and its processing worker."""
+
+    def __init__(self, maxsize: int, policy: str = DROP_PREVIEW):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.closed = False
+        self.coalesced = 0  # Chunks merged into an already queued one
+        self._items = deque()
+        self._changed = asyncio.Condition()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def full(self) -> bool:
+        return len(self._items) >= self.maxsize
+
+    async def put(self, chunk: bytes):
+        """Queue a chunk, applying the backpressure policy when full."""
+        async with self._changed:
+            if self.closed:
+                raise RuntimeError("Cannot put into a closed queue")
+            if self.full() and self.policy == COALESCE and self._items:
+                # Consecutive chunks of a recording concatenate into a valid chunk
+                self._items[-1] = self._items[-1] + chunk
+                self.coalesced += 1
+            else:
+                await self._changed.wait_for(lambda: not self.full())
+                self._items.append(chunk)
+            self._changed.notify_all()
+
+    async def get(self) -> Optional[bytes]:
+        """Take the next chunk; returns None once the queue is closed and drained."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._items or self.closed)
+            if not self._items:
+                return None
+            chunk = self._items.popleft()
+            self._changed.notify_all()
+            return chunk
+
+    async def close(self):
+        """Stop accepting chunks; the worker still drains what is queued."""
+        async with self._changed:
+            self.closed = True
+            self._changed.notify_all()
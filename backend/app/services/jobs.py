@@ -0,0 +1,247 @@
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.transcription import voice_records, transcription_jobs
+from app.services.recording import finalize_recording
+from app.services.scheduler import PRIORITY_FINAL
+from app.services.transcription import transcribe_audio
+from app.services.long_audio import transcribe_long_audio
+from app.services.audio_metadata import store_audio_metadata
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# A recording gets one job when its session starts, due far in the future. Closing
+# the session makes it due at once. If the web process dies first, the job still
+# comes due on its own, so no recording is left with a partial transcript.
+
+class TranscriptionJobError(Exception):
+    """Raised by a job that should be retried."""
+
+async def enqueue_transcription_job(db: AsyncSession, record_id: int, delay_seconds: float = 0) -> int:
+    """
+    Queue a full transcription pass of a recording.
+
+    Args:
+        db: Database session
+        record_id: Recording to transcribe
+        delay_seconds: Time before the job may be claimed
+
+    Returns:
+        The job id
+    """
+    now = datetime.utcnow()
+    insert_query = transcription_jobs.insert().values(
+        record_id=record_id,
+        status=QUEUED,
+        attempts=0,
+        run_after=now + timedelta(seconds=delay_seconds),
+        created_at=now,
+        updated_at=now
+    )
+    result = await db.execute(insert_query)
+    await db.commit()
+    return result.inserted_primary_key[0]
+
+async def schedule_job_now(db: AsyncSession, job_id: int):
+    """
+    Make a job due immediately, re-queueing it if it already ran.
+
+    A job a worker is running is left alone, unless its visibility timeout
+    has passed; re-queueing it would let another worker run it at the same time.
+    """
+    now = datetime.utcnow()
+    update_query = (
+        update(transcription_jobs)
+        .where(transcription_jobs.c.id == job_id)
+        .where(or_(transcription_jobs.c.status != RUNNING, transcription_jobs.c.locked_until < now))
+        .values(status=QUEUED, attempts=0, run_after=now, locked_until=None, last_error=None)
+    )
+    await db.execute(update_query)
+    await db.commit()
+
+async def postpone_job(db: AsyncSession, job_id: int, delay_seconds: float):
+    """
+    Push back a queued job that is not due yet, while its recording is still live.
+
+    A job already running or done is left alone.
+    """
+    now = datetime.utcnow()
+    update_query = (
+        update(transcription_jobs)
+        .where(transcription_jobs.c.id == job_id)
+        .where(transcription_jobs.c.status == QUEUED)
+        .values(run_after=now + timedelta(seconds=delay_seconds), updated_at=now)
+    )
+    await db.execute(update_query)
+    await db.commit()
+
+async def claim_job(db: AsyncSession):
+    """
+    Take the next due job, or None if there is none.
+
+    Rows locked by other workers are skipped, so any number of workers can poll
+    the table at once. A running job whose visibility timeout has passed was
+    abandoned by a dead worker and is claimed again.
+    """
+    while True:
+        now = datetime.utcnow()
+        query = (
+            select(transcription_jobs)
+            .where(or_(
+                and_(transcription_jobs.c.status == QUEUED, transcription_jobs.c.run_after <= now),
+                and_(transcription_jobs.c.status == RUNNING, transcription_jobs.c.locked_until < now)
+            ))
+            .order_by(transcription_jobs.c.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(query)
+        job = result.fetchone()
+
+        if job is None:
+            await db.commit()  # End the transaction
+            return None
+
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            # Kept killing its workers; stop handing it out
+            await db.execute(
+                update(transcription_jobs)
+                .where(transcription_jobs.c.id == job.id)
+                .values(status=FAILED, locked_until=None, updated_at=now, last_error="Abandoned too many times")
+            )
+            await db.commit()
+            logger.error(f"Transcription job {job.id} abandoned {job.attempts} times, giving up")
+            continue
+
+        await db.execute(
+            update(transcription_jobs)
+            .where(transcription_jobs.c.id == job.id)
+            .values(
+                status=RUNNING,
+                attempts=job.attempts + 1,
+                locked_until=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS),
+                updated_at=now
+            )
+        )
+        await db.commit()
+
+        result = await db.execute(select(transcription_jobs).where(transcription_jobs.c.id == job.id))
+        return result.fetchone()
+
+async def extend_lock(db: AsyncSession, job_id: int):
+    """Push back the visibility timeout of a job that is still being worked on."""
+    now = datetime.utcnow()
+    update_query = (
+        update(transcription_jobs)
+        .where(transcription_jobs.c.id == job_id)
+        .where(transcription_jobs.c.status == RUNNING)
+        .values(locked_until=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS), updated_at=now)
+    )
+    await db.execute(update_query)
+    await db.commit()
+
+async def complete_job(db: AsyncSession, job_id: int):
+    """Mark a job as done."""
+    update_query = (
+        update(transcription_jobs)
+        .where(transcription_jobs.c.id == job_id)
+        .values(status=DONE, locked_until=None, last_error=None, updated_at=datetime.utcnow())
+    )
+    await db.execute(update_query)
+    await db.commit()
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retry number attempts: exponential with full jitter."""
+    return random.uniform(0, min(settings.JOB_BACKOFF_MAX_SECONDS, settings.JOB_BACKOFF_BASE_SECONDS * (2 ** attempts)))
+
+async def fail_job(db: AsyncSession, job, error: str):
+    """Schedule a retry with backoff, or mark the job failed after JOB_MAX_ATTEMPTS."""
+    now = datetime.utcnow()
+    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        values = dict(status=FAILED, locked_until=None, last_error=error, updated_at=now)
+        logger.error(f"Transcription job {job.id} failed after {job.attempts} attempts: {error}")
+    else:
+        delay = retry_delay(job.attempts)
+        values = dict(
+            status=QUEUED,
+            run_after=now + timedelta(seconds=delay),
+            locked_until=None,
+            last_error=error,
+            updated_at=now
+        )
+        logger.warning(f"Transcription job {job.id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {error}")
+    await db.execute(update(transcription_jobs).where(transcription_jobs.c.id == job.id).values(**values))
+    await db.commit()
+
+async def run_final_pass(db: AsyncSession, record_id: int) -> Optional[str]:
+    """
+    Transcribe a whole recording and store the result as its transcript.
+
+    Raises:
+        TranscriptionJobError: if the transcription failed and should be retried
+    """
+    # Folds in chunks left behind by a session that never closed cleanly
+    audio_data = await finalize_recording(db, record_id)
+    if not audio_data:
+        logger.info(f"Recording {record_id} has no audio, nothing to transcribe")
+        return None
+
+    query = select(
+        voice_records.c.user_id,
+        voice_records.c.session_id,
+        voice_records.c.client_type,
+        voice_records.c.audio_duration_ms
+    ).where(voice_records.c.id == record_id)
+    result = await db.execute(query)
+    record = result.fetchone()
+
+    duration_ms = record.audio_duration_ms
+    if duration_ms is None:
+        # The session never closed cleanly, so its metadata was not stored
+        duration_ms = await store_audio_metadata(db, record_id, audio_data)
+
+    if settings.LONG_AUDIO_ENABLED:
+        # Long recordings are split at silence and their parts transcribed in parallel;
+        # the stored duration spares short ones a decode just to measure them
+        transcript = await transcribe_long_audio(
+            audio_data,
+            record.client_type or "unknown",
+            user_id=record.user_id,
+            session_id=record.session_id,
+            priority=PRIORITY_FINAL,
+            duration_ms=duration_ms
+        )
+    else:
+        transcript = await transcribe_audio(
+            audio_data,
+            record.client_type or "unknown",
+            user_id=record.user_id,
+            session_id=record.session_id,
+            priority=PRIORITY_FINAL
+        )
+    if transcript is None:
+        raise TranscriptionJobError(f"Transcription of recording {record_id} failed")
+
+    if transcript.strip():
+        # The full pass replaces the transcript stitched together from live windows
+        update_query = (
+            update(voice_records)
+            .where(voice_records.c.id == record_id)
+            .values(transcript=transcript)
+        )
+        await db.execute(update_query)
+        await db.commit()
+    logger.info(f"Final transcription of recording {record_id}: {len(transcript)} characters")
+    return transcript
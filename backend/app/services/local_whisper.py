@@ -0,0 +1,18 @@
+import io
+
+# Runs inside the local backend's worker processes. Each worker loads the model
+# once in its initializer and keeps it warm for every job it is given.
+
+_model = None
+
+def load_model(model_name: str, compute_type: str, cpu_threads: int):
+    """Process pool initializer: load the faster-whisper model into this worker."""
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+def transcribe(audio_data: bytes) -> str:
+    """Transcribe encoded audio with the worker's model."""
+    # faster-whisper decodes any container itself, so the upload bytes are used as is
+    segments, _ = _model.transcribe(io.BytesIO(audio_data), beam_size=1, vad_filter=False)
+    return " ".join(segment.text.strip() for segment in segments)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.ffmpeg import FFmpegError
+from app.services.pcm import BYTES_PER_SECOND, SAMPLE_WIDTH, decode_to_pcm, pcm_to_wav
+from app.services.scheduler import PRIORITY_FINAL
+from app.services.transcription import transcribe_audio
+from app.services.vad import FRAME_MS, FRAME_SAMPLES, frame_levels
+
+logger = logging.getLogger(__name__)
+
+# Frames averaged when looking for a pause, so a gap inside a word is not taken for one
+SMOOTHING_FRAMES = 10
+
+class TranscriptSegment:
+    """Text of one part of a recording, with its position in seconds."""
+
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+
+def split_at_silence(pcm: bytes, target_seconds: float, search_seconds: float) -> List[Tuple[int, int]]:
+    """
+    Cut 16 kHz mono PCM into segments of about target_seconds.
+
+    Each cut is placed at the quietest point within search_seconds of where it
+    would fall by duration alone, so words are not split between segments.
+
+    Returns:
+        (start, end) byte offsets of the segments, covering all of pcm in order
+    """
+    levels = frame_levels(pcm)
+    if len(levels) >= SMOOTHING_FRAMES:
+        levels = np.convolve(levels, np.ones(SMOOTHING_FRAMES) / SMOOTHING_FRAMES, mode='same')
+    target = max(1, int(target_seconds * 1000 / FRAME_MS))
+    search = min(target // 2, int(search_seconds * 1000 / FRAME_MS))
+
+    cuts = [0]
+    # Stop when the rest fits in one segment, so the last one is never a sliver
+    while len(levels) - cuts[-1] > target + search:
+        ideal = cuts[-1] + target
+        low, high = ideal - search, min(len(levels), ideal + search + 1)
+        cuts.append(low + int(np.argmin(levels[low:high])))
+
+    frame_bytes = FRAME_SAMPLES * SAMPLE_WIDTH
+    bounds = [cut * frame_bytes for cut in cuts] + [len(pcm)]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(cuts))]
+
+def stitch(segments: List[TranscriptSegment], timestamps: bool = True) -> str:
+    """Join segment texts in order, each prefixed with [hh:mm:ss] when timestamps is set."""
+    lines = []
+    for segment in segments:
+        text = segment.text.strip()
+        if not text:
+            continue
+        if timestamps:
+            seconds = int(segment.start)
+            text = f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}] {text}"
+        lines.append(text)
+    return ("\n" if timestamps else " ").join(lines)
+
+async def transcribe_segments(
+    pcm: bytes,
+    client_type: str = "unknown",
+    user_id: Optional[int] = None,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_FINAL
+) -> Optional[List[TranscriptSegment]]:
+    """
+    Transcribe decoded audio as segments split at silence, all at once.
+
+    Every segment goes through transcribe_audio, so the scheduler bounds the
+    concurrency and the cache keeps segments that already succeeded when a
+    failed run is retried.
+
+    Returns:
+        The segments in order, or None if any of them failed
+    """
+    spans = split_at_silence(pcm, settings.LONG_AUDIO_SEGMENT_SECONDS, settings.LONG_AUDIO_SEARCH_SECONDS)
+    logger.info(f"Transcribing {len(pcm) / BYTES_PER_SECOND:.0f}s of audio as {len(spans)} segments")
+
+    texts = await asyncio.gather(*(
+        transcribe_audio(
+            pcm_to_wav(pcm[start:end]),
+            client_type,
+            filename="audio.wav",
+            user_id=user_id,
+            session_id=session_id,
+            priority=priority
+        )
+        for start, end in spans
+    ))
+    if any(text is None for text in texts):
+        logger.error(f"{sum(text is None for text in texts)} of {len(spans)} segments failed")
+        return None
+    return [
+        TranscriptSegment(start / BYTES_PER_SECOND, end / BYTES_PER_SECOND, text)
+        for (start, end), text in zip(spans, texts)
+    ]
+
+async def transcribe_long_audio(
+    audio_data: bytes,
+    client_type: str = "unknown",
+    user_id: Optional[int] = None,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_FINAL,
+    duration_ms: Optional[int] = None
+) -> Optional[str]:
+    """
+    Transcribe a stored recording of any length.
+
+    Recordings shorter than LONG_AUDIO_MIN_SECONDS are sent in one request.
+    Longer ones are split at silence and transcribed in parallel, so the wall
+    clock time follows the slowest segment rather than the total length.
+
+    Args:
+        duration_ms: Length of the recording (voice_records.audio_duration_ms) if
+            known; a short recording is then sent without being decoded first
+
+    Returns:
+        Transcribed text or None if transcription fails
+    """
+    pcm = b""
+    if duration_ms is None or duration_ms >= settings.LONG_AUDIO_MIN_SECONDS * 1000:
+        try:
+            pcm = await decode_to_pcm(audio_data)
+        except FFmpegError as e:
+            logger.warning(f"Could not decode recording for splitting, sending it whole: {e.stderr or e}")
+    if len(pcm) < settings.LONG_AUDIO_MIN_SECONDS * BYTES_PER_SECOND:
+        return await transcribe_audio(
+            audio_data,
+            client_type,
+            user_id=user_id,
+            session_id=session_id,
+            priority=priority
+        )
+
+    segments = await transcribe_segments(pcm, client_type, user_id, session_id, priority)
+    if segments is None:
+        return None
+    return stitch(segments, timestamps=settings.LONG_AUDIO_TIMESTAMPS)
@@ -0,0 +1,149 @@
+import base64
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# How the total of a listing is computed
+COUNT_EXACT = "exact"  # COUNT(*) on every request
+COUNT_CACHED = "cached"  # Exact count, reused per user and filter for COUNT_CACHE_TTL_SECONDS
+COUNT_ESTIMATE = "estimate"  # Planner row estimate; exact on databases without one
+COUNT_NONE = "none"  # No total
+COUNT_MODES = {COUNT_EXACT, COUNT_CACHED, COUNT_ESTIMATE, COUNT_NONE}
+
+class InvalidCursorError(Exception):
+    """Raised for a cursor token that was not produced by encode_cursor."""
+
+def encode_cursor(created_at: Optional[datetime], record_id: int, row_number: int) -> str:
+    """Opaque token for the position after a row in (created_at, id) order."""
+    payload = {
+        "c": created_at.isoformat() if created_at else None,
+        "i": record_id,
+        "n": row_number
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int, int]:
+    """
+    Read a cursor token.
+
+    Returns:
+        (created_at, id) of the last row already returned, and the row number
+        of the next one
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, int(payload["i"]), int(payload["n"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+
+def keyset_order(created_at, record_id):
+    """
+    ORDER BY of a keyset-paginated listing: newest first, rows without a
+    created_at before all others, as PostgreSQL and its (created_at DESC, id
+    DESC) indexes sort them on every database.
+    """
+    return created_at.desc().nullsfirst(), record_id.desc()
+
+def keyset_after(created_at, record_id, last_created_at: Optional[datetime], last_id: int):
+    """WHERE clause for the rows after (last_created_at, last_id) in keyset_order."""
+    if last_created_at is None:
+        # A row comparison with NULL matches nothing: continue among the rows
+        # without a timestamp by id, then with every row that has one
+        return or_(and_(created_at.is_(None), record_id < last_id), created_at.isnot(None))
+    # Rows without a timestamp all came first, and NULL never compares less
+    return tuple_(created_at, record_id) < tuple_(last_created_at, last_id)
+
+class CountCache:
+    """Totals of listings keyed by (user scope, filter), with a TTL."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._counts: Dict[Tuple[Hashable, str], Tuple[float, int]] = {}
+
+    def get(self, scope: Hashable, time_filter: str) -> Optional[int]:
+        entry = self._counts.get((scope, time_filter))
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def set(self, scope: Hashable, time_filter: str, count: int):
+        self._counts[(scope, time_filter)] = (time.monotonic(), count)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget the counts that include user_id's recordings, or all counts if None."""
+        if user_id is None:
+            self._counts.clear()
+            return
+        for key in [key for key in self._counts if key[0] in (user_id, None)]:
+            del self._counts[key]
+
+# Scope None is the admin view of every user's recordings
+count_cache = CountCache(settings.COUNT_CACHE_TTL_SECONDS)
+
+def explain_statement(query) -> Tuple[str, Dict[str, Any]]:
+    """
+    EXPLAIN of query for PostgreSQL, with its values left as bound parameters.
+
+    Rendering the values inline (literal_binds) fails for types such as
+    datetime, so the statement is compiled with named parameters for text().
+
+    Returns:
+        The SQL and its parameters
+    """
+    compiled = query.compile(
+        dialect=postgresql.dialect(paramstyle="named"),
+        compile_kwargs={"render_postcompile": True}
+    )
+    return f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+
+async def estimate_count(db: AsyncSession, query) -> int:
+    """Row count of query as estimated by the PostgreSQL planner, exact elsewhere."""
+    if db.bind.dialect.name != "postgresql":
+        return await exact_count(db, query)
+    sql, params = explain_statement(query)
+    result = await db.execute(text(sql), params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+async def exact_count(db: AsyncSession, query) -> int:
+    result = await db.execute(select(func.count()).select_from(query.subquery()))
+    return result.scalar()
+
+async def count_rows(db: AsyncSession, query, mode: str, scope: Hashable, time_filter: str) -> Optional[int]:
+    """
+    Total for a listing according to mode.
+
+    Args:
+        db: Database session
+        query: The filtered listing query, without ordering or limits
+        mode: One of COUNT_MODES
+        scope: User id the listing is limited to, None for all users
+        time_filter: Filter applied to the listing, part of the cache key
+
+    Returns:
+        The total, or None for COUNT_NONE
+    """
+    if mode == COUNT_NONE:
+        return None
+    if mode == COUNT_ESTIMATE:
+        return await estimate_count(db, query)
+    if mode == COUNT_CACHED:
+        count = count_cache.get(scope, time_filter)
+        if count is None:
+            count = await exact_count(db, query)
+            count_cache.set(scope, time_filter, count)
+        return count
+    return await exact_count(db, query)
@@ -0,0 +1,34 @@
+import io
+import wave
+from typing import List, Optional
+
+from app.services.ffmpeg import transcode
+
+# Format of decoded audio used for voice activity detection and Whisper uploads
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit signed little-endian
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+
+async def decode_to_pcm(
+    audio_data: bytes,
+    sample_rate: int = SAMPLE_RATE,
+    input_args: Optional[List[str]] = None,
+    seekable_input: bool = False
+) -> bytes:
+    """Decode any audio ffmpeg understands to mono s16le PCM (16 kHz by default)."""
+    return await transcode(audio_data, [
+        '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate),
+        '-ac', '1',
+        '-f', 's16le'
+    ], input_args=input_args, seekable_input=seekable_input)
+
+def pcm_to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wrap mono s16le PCM in a WAV container."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
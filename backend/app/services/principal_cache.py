@@ -0,0 +1,70 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.user import users
+
+logger = logging.getLogger(__name__)
+
+# Every authenticated request and socket resolves its token's username to a users
+# row. Rows are kept here for a short TTL so that lookup is usually free. Changes
+# made in this process invalidate the entry at once; other worker processes see
+# them once the TTL has passed.
+
+class PrincipalCache:
+    """LRU cache of users rows by username, with a TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()  # username -> (stored at, row)
+
+    def get(self, username: str):
+        entry = self._entries.get(username)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        self._entries.move_to_end(username)
+        return entry[1]
+
+    def set(self, username: str, user):
+        self._entries[username] = (time.monotonic(), user)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        """Forget one user, or everyone if username is None."""
+        if username is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(username, None)
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+async def get_principal(db: AsyncSession, username: str):
+    """
+    Look up the users row of an authenticated username.
+
+    Returns:
+        The row, or None if there is no such user. Missing users are not
+        cached, so an account is usable as soon as it is created.
+    """
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        user = principal_cache.get(username)
+        if user is not None:
+            metrics.incr("principal_cache.hits")
+            return user
+        metrics.incr("principal_cache.misses")
+
+    query = select(users).where(users.c.username == username)
+    result = await db.execute(query)
+    user = result.fetchone()
+    if user is not None and settings.PRINCIPAL_CACHE_ENABLED:
+        principal_cache.set(username, user)
+    return user
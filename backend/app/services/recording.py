@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+from typing import Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, exists
+import logging
+
+from app.core.config import settings
+from app.models.transcription import voice_records, voice_chunks
+from app.services.blob_store import BlobStore, BlobNotFoundError, get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# A recording is stored as its first chunk in voice_records.audio_byte followed by
+# the rows of voice_chunks ordered by seq. Appending is a single INSERT, so the
+# per-chunk cost does not depend on how long the recording already is. The chunks
+# are folded back into audio_byte when the session closes, or, with BLOB_STORE_DIR
+# set, written to the blob store and audio_byte cleared. Either way audio_ref
+# then holds the SHA-256 of the finished audio.
+
+async def append_chunk(db: AsyncSession, record_id: int, seq: int, chunk: bytes):
+    """Append one audio chunk to a recording."""
+    insert_query = voice_chunks.insert().values(
+        record_id=record_id,
+        seq=seq,
+        chunk_byte=chunk
+    )
+    await db.execute(insert_query)
+    # Rows without a size yet are left to the backfill
+    update_query = (
+        update(voice_records)
+        .where(voice_records.c.id == record_id)
+        .where(voice_records.c.audio_size.isnot(None))
+        .values(audio_size=voice_records.c.audio_size + len(chunk))
+    )
+    await db.execute(update_query)
+    await db.commit()
+
+async def _stored_audio(record) -> Optional[bytes]:
+    """The audio of a voice_records row, from the blob store or audio_byte."""
+    if record.audio_byte is None and record.audio_ref:
+        store = get_blob_store()
+        if store is None:
+            raise BlobNotFoundError(f"Audio {record.audio_ref} is in the blob store but BLOB_STORE_DIR is not set")
+        return await asyncio.to_thread(store.read, record.audio_ref)
+    return record.audio_byte
+
+async def load_recording_audio(db: AsyncSession, record_id: int) -> Optional[bytes]:
+    """Assemble the full audio of a recording, including chunks not yet folded in."""
+    query = select(voice_records.c.audio_byte, voice_records.c.audio_ref).where(voice_records.c.id == record_id)
+    result = await db.execute(query)
+    record = result.fetchone()
+
+    if not record:
+        return None
+
+    query = (
+        select(voice_chunks.c.chunk_byte)
+        .where(voice_chunks.c.record_id == record_id)
+        .order_by(voice_chunks.c.seq)
+    )
+    result = await db.execute(query)
+    chunks = [row.chunk_byte for row in result.fetchall()]
+
+    audio_data = await _stored_audio(record)
+    if not chunks:
+        return audio_data
+    return b"".join([audio_data or b""] + chunks)
+
+async def finalize_recording(db: AsyncSession, record_id: int) -> Optional[bytes]:
+    """Fold all pending chunks into the stored audio of a recording and drop them."""
+    try:
+        query = select(voice_records.c.audio_byte, voice_records.c.audio_ref).where(voice_records.c.id == record_id)
+        result = await db.execute(query)
+        record = result.fetchone()
+
+        if not record:
+            return None
+
+        query = (
+            select(voice_chunks.c.seq, voice_chunks.c.chunk_byte)
+            .where(voice_chunks.c.record_id == record_id)
+            .order_by(voice_chunks.c.seq)
+        )
+        result = await db.execute(query)
+        rows = result.fetchall()
+
+        store = get_blob_store()
+        stored_audio = await _stored_audio(record)
+        if not rows and (store is None or not record.audio_byte):
+            if stored_audio and not record.audio_ref:
+                # A recording of a single chunk has nothing to fold, but still needs its hash
+                update_query = (
+                    update(voice_records)
+                    .where(voice_records.c.id == record_id)
+                    .values(audio_ref=hashlib.sha256(stored_audio).hexdigest(), audio_size=len(stored_audio))
+                )
+                await db.execute(update_query)
+                await db.commit()
+            return stored_audio
+
+        audio_data = b"".join([stored_audio or b""] + [row.chunk_byte for row in rows])
+
+        if store is not None:
+            ref = await asyncio.to_thread(store.put, audio_data)
+            values = dict(audio_byte=None, audio_ref=ref, audio_size=len(audio_data))
+        else:
+            ref = hashlib.sha256(audio_data).hexdigest()
+            values = dict(audio_byte=audio_data, audio_ref=ref, audio_size=len(audio_data))
+        update_query = (
+            update(voice_records)
+            .where(voice_records.c.id == record_id)
+            .values(**values)
+        )
+        await db.execute(update_query)
+
+        if rows:
+            # Only drop the chunks that were folded in; a late writer keeps its rows
+            delete_query = (
+                delete(voice_chunks)
+                .where(voice_chunks.c.record_id == record_id)
+                .where(voice_chunks.c.seq <= rows[-1].seq)
+            )
+            await db.execute(delete_query)
+        await db.commit()
+
+        logger.info(f"Folded {len(rows)} chunks into recording {record_id} ({len(audio_data)} bytes)")
+        return audio_data
+    except Exception:
+        await db.rollback()
+        raise
+
+async def migrate_to_blob_store(db: AsyncSession, store: BlobStore, batch_size: int = 100) -> int:
+    """
+    Move recordings still held in audio_byte to the blob store.
+
+    Rows are moved one at a time, each in its own transaction, so the migration
+    can be stopped and resumed and never holds more than one recording in
+    memory. Recordings with pending chunks belong to open sessions and are
+    moved when they are finalized instead.
+
+    Returns:
+        Number of recordings moved
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        query = (
+            select(voice_records.c.id)
+            .where(voice_records.c.audio_byte.isnot(None))
+            .where(~exists().where(voice_chunks.c.record_id == voice_records.c.id))
+            .where(voice_records.c.id > last_id)
+            .order_by(voice_records.c.id)
+            .limit(batch_size)
+        )
+        result = await db.execute(query)
+        ids = [row.id for row in result.fetchall()]
+        if not ids:
+            break
+
+        for record_id in ids:
+            result = await db.execute(select(voice_records.c.audio_byte).where(voice_records.c.id == record_id))
+            audio_data = result.scalar()
+            if audio_data is None:
+                continue
+            ref = await asyncio.to_thread(store.put, audio_data)
+            update_query = (
+                update(voice_records)
+                .where(voice_records.c.id == record_id)
+                .where(voice_records.c.audio_byte.isnot(None))
+                .values(audio_byte=None, audio_ref=ref, audio_size=len(audio_data))
+            )
+            await db.execute(update_query)
+            await db.commit()
+            moved += 1
+        last_id = ids[-1]
+        logger.info(f"Moved {moved} recordings to the blob store")
+    return moved
+
+async def collect_garbage(db: AsyncSession, store: BlobStore) -> Tuple[int, int]:
+    """
+    Delete blobs no recording refers to any more.
+
+    Blobs written within BLOB_STORE_GC_GRACE_SECONDS are kept, since a
+    recording being finalized writes its blob before it commits the reference.
+
+    Returns:
+        Number of blobs kept and number deleted
+    """
+    result = await db.execute(select(voice_records.c.audio_ref).where(voice_records.c.audio_ref.isnot(None)).distinct())
+    referenced = {row.audio_ref for row in result.fetchall()}
+
+    kept = deleted = 0
+    for ref in list(store.refs(older_than=settings.BLOB_STORE_GC_GRACE_SECONDS)):
+        if ref in referenced:
+            kept += 1
+        else:
+            store.delete(ref)
+            deleted += 1
+    logger.info(f"Blob store garbage collection: {kept} kept, {deleted} deleted")
+    return kept, deleted
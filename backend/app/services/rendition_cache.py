@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Renditions of a recording (an AAC/MP4 copy for iOS, ...) are derived from
+# immutable audio, so they are keyed by the audio's content hash and the target
+# format and made at most once, however many clients ask for them at the same time.
+
+def rendition_key(source: str, fmt: str) -> str:
+    """Key of a rendition: the content hash of the audio (or a record id and size) and the format."""
+    return f"{source}.{fmt}"
+
+class RenditionCache:
+    """
+    Two-tier LRU cache of encoded renditions, bounded by size.
+
+    The memory tier holds up to max_memory_bytes. With disk_dir set, every
+    rendition is also written there and the least recently used files are
+    deleted beyond max_disk_bytes; files left by an earlier run are picked up
+    in order of last use.
+    """
+
+    def __init__(self, max_memory_bytes: int, disk_dir: Optional[str] = None, max_disk_bytes: int = 0):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, least recently used first
+        self._disk_bytes = 0
+        self._pending: Dict[str, asyncio.Task] = {}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return a cached rendition, or None on a miss."""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            metrics.incr("rendition_cache.memory_hits")
+            return data
+        if key in self._disk:
+            data = self._read_disk(key)
+            if data is not None:
+                self._remember(key, data)
+                metrics.incr("rendition_cache.disk_hits")
+                return data
+        metrics.incr("rendition_cache.misses")
+        return None
+
+    def has(self, key: str) -> bool:
+        """Whether key is cached or being produced, without counting a hit or miss."""
+        return key in self._memory or key in self._disk or key in self._pending
+
+    def set(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.disk_dir:
+            self._write_disk(key, data)
+
+    async def get_or_create(self, key: str, produce: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        """
+        Return the rendition, producing it on a miss.
+
+        Concurrent callers for the same missing key share one call to produce,
+        which runs as a task of its own so a caller that goes away does not
+        cancel it for the others. A None result is returned but not cached.
+        """
+        data = self.get(key)
+        if data is not None:
+            return data
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._produce(key, produce))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            metrics.incr("rendition_cache.coalesced")
+        return await asyncio.shield(task)
+
+    async def _produce(self, key: str, produce: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        metrics.incr("rendition_cache.encodes")
+        data = await produce()
+        if data is not None:
+            self.set(key, data)
+        return data
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+        metrics.set_gauge("rendition_cache.memory_bytes", self._memory_bytes)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _scan_disk(self):
+        entries = []
+        for directory, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # The modification time orders the files for eviction after a restart
+        except OSError as e:
+            logger.warning(f"Unreadable rendition cache file {path}: {e}")
+            self._disk_bytes -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return data
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so a crash never leaves a partial rendition
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write rendition cache file {path}: {e}")
+            return
+        self._disk_bytes -= self._disk.pop(key, 0)
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+        metrics.set_gauge("rendition_cache.disk_bytes", self._disk_bytes)
+
+_cache: Optional[RenditionCache] = None
+_background: Set[asyncio.Task] = set()
+
+def get_rendition_cache() -> Optional[RenditionCache]:
+    """Return the process-wide rendition cache, or None when it is disabled."""
+    global _cache
+    if _cache is None and settings.RENDITION_CACHE_ENABLED:
+        _cache = RenditionCache(
+            settings.RENDITION_CACHE_MEMORY_BYTES,
+            settings.RENDITION_CACHE_DIR or None,
+            settings.RENDITION_CACHE_DISK_BYTES
+        )
+    return _cache
+
+def pregenerate(key: str, produce: Callable[[], Awaitable[Optional[bytes]]]):
+    """Start making a rendition in the background, unless it is cached or being made already."""
+    cache = get_rendition_cache()
+    if cache is None or cache.has(key):
+        return
+
+    async def run():
+        try:
+            await cache.get_or_create(key, produce)
+        except Exception as e:
+            logger.warning(f"Background rendition {key} failed: {e}")
+
+    task = asyncio.create_task(run())
+    # Held until done, since the event loop keeps only weak references to tasks
+    _background.add(task)
+    task.add_done_callback(_background.discard)
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lowest value runs first
+PRIORITY_FINAL = 0  # Final pass when a session closes
+PRIORITY_COMMITTED = 1  # Transcripts that are stored or are the only output for their audio
+PRIORITY_PREVIEW = 2  # Quick previews, superseded by the next preview of the same session
+
+class StaleJobError(Exception):
+    """Raised for a queued preview that was replaced by a newer one for the same session."""
+
+class _Job:
+    __slots__ = ("factory", "user", "session", "priority", "future", "task")
+
+    def __init__(self, factory, user, session, priority):
+        self.factory = factory
+        self.user = user
+        self.session = session
+        self.priority = priority
+        self.future = asyncio.get_running_loop().create_future()
+        self.task = None
+
+class TranscriptionScheduler:
+    """
+    Process-wide scheduler for transcription jobs.
+
+    At most max_concurrency jobs run at once. Waiting jobs are taken by priority
+    class and, within a class, round-robin across users so one user with many
+    sessions cannot starve the others.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.dropped_stale = 0
+        # priority -> user -> queued jobs; user order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[Hashable, deque]"] = {}
+        self._previews: Dict[Hashable, _Job] = {}  # Queued preview per session
+
+    def queued(self) -> int:
+        return sum(len(jobs) for users in self._queues.values() for jobs in users.values())
+
+    async def run(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        user_id: Optional[Hashable] = None,
+        session_id: Optional[Hashable] = None,
+        priority: int = PRIORITY_COMMITTED
+    ) -> Any:
+        """
+        Run factory() once a slot is free and return its result.
+
+        Raises:
+            StaleJobError: if this is a preview replaced by a newer one before it started
+        """
+        job = _Job(factory, user_id, session_id, priority)
+
+        if priority == PRIORITY_PREVIEW and session_id is not None:
+            stale = self._previews.pop(session_id, None)
+            if stale is not None:
+                self._remove(stale)
+                self.dropped_stale += 1
+                stale.future.set_exception(StaleJobError(f"Preview for session {session_id} superseded"))
+            self._previews[session_id] = job
+
+        self._queues.setdefault(priority, OrderedDict()).setdefault(user_id, deque()).append(job)
+        self._dispatch()
+
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            if job.task is None:
+                self._remove(job)
+            else:
+                job.task.cancel()
+            raise
+
+    def _remove(self, job: _Job):
+        """Take a job that has not started out of its queue."""
+        users = self._queues.get(job.priority)
+        jobs = users.get(job.user) if users else None
+        if jobs is None or job not in jobs:
+            return
+        jobs.remove(job)
+        if not jobs:
+            del users[job.user]
+        if self._previews.get(job.session) is job:
+            del self._previews[job.session]
+
+    def _next_job(self) -> Optional[_Job]:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            if not users:
+                continue
+            user, jobs = next(iter(users.items()))
+            job = jobs.popleft()
+            # Move the user to the back of the round-robin order
+            del users[user]
+            if jobs:
+                users[user] = jobs
+            if self._previews.get(job.session) is job:
+                del self._previews[job.session]
+            return job
+        return None
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                break
+            self.running += 1
+            job.task = asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: _Job):
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            job.future.cancel()
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            self.running -= 1
+            self._dispatch()
+
+_scheduler: Optional[TranscriptionScheduler] = None
+
+def get_scheduler() -> TranscriptionScheduler:
+    """Return the process-wide transcription scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TranscriptionScheduler(settings.TRANSCRIBE_MAX_CONCURRENCY)
+    return _scheduler
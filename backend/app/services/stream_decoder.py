@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.services.pcm import SAMPLE_RATE, SAMPLE_WIDTH, BYTES_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+# A StreamDecoder lives as long as its WebSocket session, so it does not take a
+# run_ffmpeg slot; holding one would starve the short-lived conversions.
+
+class StreamDecoderError(Exception):
+    """Raised when the decoder process cannot be started or has died."""
+
+class StreamDecoder:
+    """
+    Persistent ffmpeg process turning a live audio stream into 16 kHz mono PCM.
+
+    Chunks are written to ffmpeg's stdin as they arrive and the decoded PCM is
+    read continuously from stdout into a ring buffer holding the last
+    max_seconds of audio. Positions are absolute byte offsets into the decoded
+    stream, so callers can remember where a window ended and cut the next one
+    from there without decoding anything twice.
+    """
+
+    def __init__(self, max_seconds: float):
+        self.capacity = int(max_seconds * BYTES_PER_SECOND) // SAMPLE_WIDTH * SAMPLE_WIDTH
+        self.start_offset = 0  # Offset of the oldest byte still in the buffer
+        self._buffer = bytearray()
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._stderr_reader: Optional[asyncio.Task] = None
+        self._stderr_tail = b""
+
+    @property
+    def end_offset(self) -> int:
+        """Offset just past the last decoded byte."""
+        return self.start_offset + len(self._buffer)
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self):
+        """Spawn the ffmpeg process."""
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                settings.FFMPEG_BINARY,
+                '-loglevel', 'error',
+                '-fflags', 'nobuffer',
+                '-i', 'pipe:0',
+                '-f', 's16le',
+                '-acodec', 'pcm_s16le',
+                '-ar', str(SAMPLE_RATE),
+                '-ac', '1',
+                'pipe:1',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            raise StreamDecoderError(f"Could not start ffmpeg: {e}")
+        self._reader = asyncio.create_task(self._read_output())
+        self._stderr_reader = asyncio.create_task(self._read_stderr())
+
+    def feed(self, chunk: bytes):
+        """
+        Queue a chunk for decoding.
+
+        The write is buffered by the event loop and does not wait for ffmpeg;
+        the chunks are held in memory by the session anyway.
+        """
+        if not self.alive or self._process.stdin.is_closing():
+            raise StreamDecoderError(f"Decoder is not running: {self.stderr}")
+        self._process.stdin.write(chunk)
+
+    def pcm(self, start: int, end: Optional[int] = None) -> bytes:
+        """
+        Decoded audio between two absolute offsets.
+
+        Audio that has already left the ring buffer is skipped, so the result
+        may start later than requested.
+        """
+        end = self.end_offset if end is None else min(end, self.end_offset)
+        start = max(start, self.start_offset)
+        # Keep sample alignment even if a read ended mid-sample
+        start += start % SAMPLE_WIDTH
+        end -= end % SAMPLE_WIDTH
+        if end <= start:
+            return b""
+        return bytes(self._buffer[start - self.start_offset:end - self.start_offset])
+
+    async def close(self, timeout: Optional[float] = None):
+        """Signal the end of the stream and wait until everything fed is decoded."""
+        if self._process is None:
+            return
+        if timeout is None:
+            timeout = settings.FFMPEG_TIMEOUT_SECONDS
+        try:
+            if not self._process.stdin.is_closing():
+                self._process.stdin.close()
+            await asyncio.wait_for(asyncio.gather(self._reader, self._stderr_reader), timeout)
+            await asyncio.wait_for(self._process.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Stream decoder did not finish within {timeout}s")
+            await self.abort()
+        else:
+            if self._process.returncode != 0:
+                logger.warning(f"Stream decoder exited with code {self._process.returncode}: {self.stderr}")
+
+    async def abort(self):
+        """Kill the process without waiting for pending output."""
+        if self._process is None:
+            return
+        if self._process.returncode is None:
+            try:
+                self._process.kill()
+            except ProcessLookupError:
+                pass
+            await self._process.wait()
+        for task in (self._reader, self._stderr_reader):
+            if task is not None and not task.done():
+                task.cancel()
+
+    @property
+    def stderr(self) -> str:
+        return self._stderr_tail.decode(errors="replace")
+
+    async def _read_output(self):
+        while True:
+            data = await self._process.stdout.read(65536)
+            if not data:
+                break
+            self._buffer += data
+            excess = len(self._buffer) - self.capacity
+            if excess > 0:
+                # bytearray drops from the front without copying the rest
+                del self._buffer[:excess]
+                self.start_offset += excess
+
+    async def _read_stderr(self):
+        # Drained continuously so ffmpeg never blocks on a full pipe
+        while True:
+            data = await self._process.stderr.read(4096)
+            if not data:
+                break
+            self._stderr_tail = (self._stderr_tail + data)[-2048:]
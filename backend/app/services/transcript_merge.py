@@ -0,0 +1,54 @@
+import re
+from typing import List
+
+# Words at the very start of a window are often cut mid-word by the window
+# boundary, so the overlap is allowed to begin a few words into the new text.
+MAX_LEADING_SKIP = 2
+
+_PUNCTUATION = re.compile(r"[^\w']+", re.UNICODE)
+
+def _normalize(word: str) -> str:
+    return _PUNCTUATION.sub("", word).lower()
+
+def _find_overlap(previous: List[str], new: List[str], max_overlap_words: int):
+    """Return (skip, length) of the longest run of new words repeating the end of previous."""
+    best_skip, best_length = 0, 0
+    for skip in range(min(MAX_LEADING_SKIP, len(new)) + 1):
+        limit = min(len(previous), len(new) - skip, max_overlap_words)
+        # Skipping leading words needs a longer match to rule out coincidences
+        minimum = 1 if skip == 0 else 2
+        for length in range(limit, max(best_length, minimum - 1), -1):
+            if previous[-length:] == new[skip:skip + length]:
+                best_skip, best_length = skip, length
+                break
+    return best_skip, best_length
+
+def merge_transcripts(previous: str, new: str, max_overlap_words: int = 30) -> str:
+    """
+    Append a window transcript to the committed transcript, dropping the words
+    that the overlapping audio transcribed twice.
+
+    Args:
+        previous: Transcript committed so far
+        new: Transcript of the latest window, which starts with some overlap
+        max_overlap_words: Longest overlap to look for
+
+    Returns:
+        The merged transcript
+    """
+    previous = (previous or "").strip()
+    new = (new or "").strip()
+    if not previous:
+        return new
+    if not new:
+        return previous
+
+    new_words = new.split()
+    previous_norm = [_normalize(w) for w in previous.split()]
+    new_norm = [_normalize(w) for w in new_words]
+
+    skip, length = _find_overlap(previous_norm, new_norm, max_overlap_words)
+    if length:
+        new_words = new_words[skip + length:]
+
+    return " ".join([previous] + new_words).strip()
@@ -1,219 +1,163 @@
-import os
-import tempfile
-import openai
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, exists
 from typing import List, Optional, Union
 from io import BytesIO
-import subprocess
 import io
 import logging
 
 from app.core.config import settings
 from app.core.logging import logger
-from app.models.transcription import voice_records
-
-# Set OpenAI API key
-openai.api_key = settings.OPENAI_API_KEY
+from app.models.transcription import voice_records, voice_chunks
+from app.services.recording import load_recording_audio
+from app.services.ffmpeg import transcode, FFmpegError
+from app.services.pcm import decode_to_pcm, pcm_to_wav
+from app.services.upload_encoder import prepare_upload
+from app.services.transcription_backends import get_transcription_backend
+from app.services.scheduler import get_scheduler, StaleJobError, PRIORITY_COMMITTED
+from app.services.transcription_cache import cache_key, get_transcription_cache
+from app.services.pagination import count_cache
+from app.services.rendition_cache import get_rendition_cache, pregenerate, rendition_key
 
 logger = logging.getLogger(__name__)
 
-def convert_to_ios_compatible(audio_data: bytes) -> bytes:
+IOS_RENDITION_FORMAT = "mp4"  # AAC in MP4, which every iOS player accepts
+
+async def convert_to_ios_compatible(audio_data: bytes) -> bytes:
     """Convert audio to iOS-compatible format (AAC in MP4 container)"""
+    logger.info("Starting iOS audio conversion")
+    logger.info(f"Input size: {len(audio_data)} bytes")
+    aac_args = [
+        '-c:a', 'aac',
+        '-b:a', '128k',
+        '-ar', '44100',
+        '-ac', '2',
+        '-f', 'mp4'
+    ]
+    
+    # First try direct conversion to AAC
     try:
-        logger.info("Starting iOS audio conversion")
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as input_file, \
-             tempfile.NamedTemporaryFile(suffix='.m4a', delete=False) as output_file:
-            
-            input_path = input_file.name
-            output_path = output_file.name
-            
-            # Write input data
-            input_file.write(audio_data)
-            input_file.flush()
-            
-            logger.info(f"Input file size: {len(audio_data)} bytes")
-            
-            # First try direct conversion to AAC
-            try:
-                logger.info("Attempting primary conversion method")
-                cmd = [
-                    'ffmpeg', '-y',
-                    '-i', input_path,
-                    '-c:a', 'aac',
-                    '-b:a', '128k',
-                    '-ar', '44100',
-                    '-ac', '2',
-                    '-f', 'mp4',
-                    output_path
-                ]
-                logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
-                convert_result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                if convert_result.returncode != 0:
-                    logger.error(f"Primary conversion failed: {convert_result.stderr}")
-                    raise Exception("Primary conversion failed")
-                
-                # Read the converted file
-                with open(output_path, 'rb') as f:
-                    converted_data = f.read()
-                
-                logger.info(f"Successfully converted audio. Output size: {len(converted_data)} bytes")
-                return converted_data
-                
-            except Exception as e:
-                logger.error(f"Primary conversion failed: {str(e)}")
-                logger.info("Attempting fallback conversion method")
-                
-                # Fallback: Convert to WAV first, then to AAC
-                try:
-                    # First convert to WAV
-                    wav_path = input_path + '.wav'
-                    wav_cmd = [
-                        'ffmpeg', '-y',
-                        '-i', input_path,
-                        '-acodec', 'pcm_s16le',
-                        '-ar', '44100',
-                        '-ac', '2',
-                        wav_path
-                    ]
-                    logger.info(f"Running WAV conversion: {' '.join(wav_cmd)}")
-                    subprocess.run(wav_cmd, check=True, capture_output=True)
-                    
-                    # Then convert WAV to AAC
-                    aac_cmd = [
-                        'ffmpeg', '-y',
-                        '-i', wav_path,
-                        '-c:a', 'aac',
-                        '-b:a', '128k',
-                        '-ar', '44100',
-                        '-ac', '2',
-                        '-f', 'mp4',
-                        output_path
-                    ]
-                    logger.info(f"Running AAC conversion: {' '.join(aac_cmd)}")
-                    subprocess.run(aac_cmd, check=True, capture_output=True)
-                    
-                    # Read the converted file
-                    with open(output_path, 'rb') as f:
-                        converted_data = f.read()
-                    
-                    logger.info(f"Fallback conversion successful. Output size: {len(converted_data)} bytes")
-                    return converted_data
-                    
-                except Exception as e2:
-                    logger.error(f"Fallback conversion failed: {str(e2)}")
-                    raise
-                    
+        logger.info("Attempting primary conversion method")
+        # The MP4 muxer seeks back to write its index, so it gets a seekable output
+        converted_data = await transcode(audio_data, aac_args, seekable_output=True)
+        logger.info(f"Successfully converted audio. Output size: {len(converted_data)} bytes")
+        return converted_data
+    except FFmpegError as e:
+        logger.error(f"Primary conversion failed: {e.stderr or e}")
+        logger.info("Attempting fallback conversion method")
+    
+    # Fallback: decode to PCM from a seekable copy of the input, then encode AAC
+    try:
+        pcm = await decode_to_pcm(audio_data, 44100, seekable_input=True)
+        converted_data = await transcode(
+            pcm,
+            aac_args,
+            input_args=['-f', 's16le', '-ar', '44100', '-ac', '1'],
+            seekable_output=True
+        )
+        logger.info(f"Fallback conversion successful. Output size: {len(converted_data)} bytes")
+        return converted_data
     except Exception as e:
-        logger.error(f"Audio conversion failed: {str(e)}")
+        logger.error(f"Fallback conversion failed: {str(e)}")
         raise
-    finally:
-        # Clean up temporary files
-        try:
-            if 'input_path' in locals():
-                os.unlink(input_path)
-            if 'output_path' in locals():
-                os.unlink(output_path)
-            if 'wav_path' in locals():
-                os.unlink(wav_path)
-        except Exception as e:
-            logger.error(f"Error cleaning up temporary files: {str(e)}")
 
 
 # --- Audio Transcription Function ---
-async def transcribe_audio(audio_data: Union[bytes, BytesIO], client_type: str = "unknown") -> Optional[str]:
+async def transcribe_audio(
+    audio_data: Union[bytes, BytesIO],
+    client_type: str = "unknown",
+    filename: Optional[str] = None,
+    user_id: Optional[int] = None,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_COMMITTED
+) -> Optional[str]:
     """
-    Transcribe audio data using OpenAI's Whisper API.
+    Transcribe audio data with the configured backend (OpenAI's Whisper API by default).
+    
+    Results are cached by a hash of the audio and the transcription
+    parameters, so identical audio is only sent once. Misses run through the
+    process-wide scheduler, which limits concurrent transcriptions and shares
+    them fairly between users.
     
     Args:
         audio_data: Raw audio bytes in WebM format or BytesIO object
         client_type: Type of client sending the audio (e.g., 'ios', 'web')
+        filename: Upload the audio as is under this name, skipping the
+            client-specific conversion (e.g. 'audio.m4a')
+        user_id: User the audio belongs to, for fair queuing
+        session_id: Recording session, used to drop superseded previews
+        priority: PRIORITY_FINAL, PRIORITY_COMMITTED or PRIORITY_PREVIEW
         
     Returns:
         Transcribed text or None if transcription fails
     """
+    if isinstance(audio_data, BytesIO):
+        audio_data = audio_data.getvalue()
+    
+    cache = get_transcription_cache()
+    if cache is not None:
+        backend = get_transcription_backend()
+        key = cache_key(audio_data, client_type.lower(), filename, backend.name, backend.model)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"Transcription cache hit for {len(audio_data)} bytes")
+            return cached
+    
+    try:
+        text = await get_scheduler().run(
+            lambda: _transcribe_audio(audio_data, client_type, filename),
+            user_id=user_id,
+            session_id=session_id,
+            priority=priority
+        )
+    except StaleJobError:
+        logger.info(f"Dropped stale preview transcription for session {session_id}")
+        return None
+    
+    # Failures return None and are not cached, so they are retried next time
+    if cache is not None and text is not None:
+        cache.set(key, text)
+    return text
+
+async def _transcribe_audio(
+    audio_data: Union[bytes, BytesIO],
+    client_type: str,
+    filename: Optional[str]
+) -> Optional[str]:
     try:
         # Convert BytesIO to bytes if necessary
         if isinstance(audio_data, BytesIO):
             audio_data = audio_data.getvalue()
             
-        # Create a temporary file for the audio data
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
+        # The caller already produced a file Whisper can read
+        if filename:
+            return await _upload(audio_data, filename)
             
-        try:
-            # For iOS devices, we need to convert the audio to a compatible format
-            if client_type.lower() == 'ios':
-                logger.info("Processing iOS audio format")
-                # First convert to WAV with specific settings for iOS audio
-                wav_path = temp_file_path + '.wav'
-                wav_cmd = [
-                    'ffmpeg', '-y',
-                    '-i', temp_file_path,
-                    '-acodec', 'pcm_s16le',
-                    '-ar', '16000',  # Use 16kHz for better Whisper compatibility
-                    '-ac', '1',      # Convert to mono
-                    '-f', 'wav',
-                    wav_path
-                ]
-                logger.info(f"Running WAV conversion: {' '.join(wav_cmd)}")
-                result = subprocess.run(wav_cmd, capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    logger.error(f"WAV conversion failed: {result.stderr}")
-                    # Try fallback conversion
-                    fallback_cmd = [
-                        'ffmpeg', '-y',
-                        '-i', temp_file_path,
-                        '-acodec', 'pcm_s16le',
-                        '-ar', '44100',
-                        '-ac', '1',
-                        '-f', 'wav',
-                        wav_path
-                    ]
-                    logger.info(f"Running fallback WAV conversion: {' '.join(fallback_cmd)}")
-                    result = subprocess.run(fallback_cmd, capture_output=True, text=True)
-                    if result.returncode != 0:
-                        logger.error(f"Fallback WAV conversion failed: {result.stderr}")
-                        raise Exception("WAV conversion failed")
-                
-                # Use the WAV file for transcription
-                with open(wav_path, "rb") as audio_file:
-                    transcript = openai.Audio.transcribe(
-                        "whisper-1",
-                        audio_file
-                    )
-                
-                # Clean up the WAV file
-                os.unlink(wav_path)
-            else:
-                # For non-iOS devices, use the original file
-                with open(temp_file_path, "rb") as audio_file:
-                    transcript = openai.Audio.transcribe(
-                        "whisper-1",
-                        audio_file
-                    )
-                
-            return transcript.text
+        # For iOS devices, we need to convert the audio to a compatible format
+        if client_type.lower() == 'ios':
+            logger.info("Processing iOS audio format")
+            # 16kHz mono WAV for better Whisper compatibility
+            try:
+                pcm = await decode_to_pcm(audio_data)
+            except FFmpegError as e:
+                logger.error(f"WAV conversion failed: {e.stderr or e}")
+                # The container may need seeking, which a pipe cannot do
+                logger.info("Retrying WAV conversion with seekable input")
+                pcm = await decode_to_pcm(audio_data, seekable_input=True)
+            return await _upload(pcm_to_wav(pcm), "audio.wav")
             
-        except Exception as e:
-            logger.error(f"Error in transcription: {str(e)}")
-            return None
+        # For non-iOS devices, upload the original audio
+        return await _upload(audio_data, "audio.webm")
             
     except Exception as e:
-        logger.error(f"Error processing audio: {str(e)}")
+        logger.error(f"Error in transcription: {str(e)}")
         return None
-        
-    finally:
-        # Clean up temporary file
-        try:
-            if 'temp_file_path' in locals():
-                os.unlink(temp_file_path)
-        except Exception as e:
-            logger.error(f"Error cleaning up temporary file: {str(e)}")
+
+async def _upload(audio_data: bytes, filename: str) -> str:
+    """Send audio to the transcription backend, compacted and split to fit the API limit."""
+    texts = []
+    for part, part_filename in await prepare_upload(audio_data, filename):
+        texts.append(await get_transcription_backend().transcribe(part, part_filename))
+    return " ".join(text.strip() for text in texts if text and text.strip())
 
 async def delete_transcription(
     db: AsyncSession,
@@ -230,6 +174,7 @@ async def delete_transcription(
     delete_query = voice_records.delete().where(voice_records.c.id == transcription_id)
     await db.execute(delete_query)
     await db.commit()
+    count_cache.invalidate(transcription.user_id)
     
     return True
 
@@ -244,23 +189,52 @@ async def delete_multiple_transcriptions(
     delete_query = voice_records.delete().where(voice_records.c.id.in_(ids))
     await db.execute(delete_query)
     await db.commit()
+    count_cache.invalidate()
     
     return True
 
+def pregenerate_ios_rendition(content_hash: str, audio_data: bytes):
+    """Make the iOS rendition of a finished recording in the background, ahead of its first download."""
+    pregenerate(rendition_key(content_hash, IOS_RENDITION_FORMAT), lambda: convert_to_ios_compatible(audio_data))
+
 async def get_transcription_audio(
     db: AsyncSession,
     transcription_id: int
 ):
-    """Get audio data for a transcription."""
-    query = select(voice_records).where(voice_records.c.id == transcription_id)
+    """Get audio data for a transcription, as a cached iOS-compatible rendition."""
+    query = select(
+        voice_records.c.audio_ref,
+        voice_records.c.audio_size,
+        exists().where(voice_chunks.c.record_id == voice_records.c.id).label("has_chunks")
+    ).where(voice_records.c.id == transcription_id)
     result = await db.execute(query)
-    transcription = result.fetchone()
+    record = result.fetchone()
     
-    if not transcription:
+    if record is None:
         return None, None
     
-    # Convert the audio to iOS-compatible format
-    audio_data = convert_to_ios_compatible(transcription.audio_byte)
+    async def convert() -> Optional[bytes]:
+        recording = await load_recording_audio(db, transcription_id)
+        if recording is None:
+            return None
+        return await convert_to_ios_compatible(recording)
+    
+    # Finished recordings are named by content; one still recording by its id and
+    # current size, which changes with every chunk
+    if record.audio_ref and not record.has_chunks:
+        source = record.audio_ref
+    elif record.audio_size is not None:
+        source = f"record-{transcription_id}-{record.audio_size}"
+    else:
+        source = None
+    
+    cache = get_rendition_cache()
+    if cache is None or source is None:
+        audio_data = await convert()
+    else:
+        audio_data = await cache.get_or_create(rendition_key(source, IOS_RENDITION_FORMAT), convert)
+    if audio_data is None:
+        return None, None
     return audio_data, "audio/mp4"
 
 def format_file_size(size_bytes):
@@ -0,0 +1,118 @@
+import asyncio
+import importlib.util
+import logging
+from abc import ABC, abstractmethod
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.core.config import settings
+from app.services import local_whisper
+from app.services.whisper_client import WhisperClient
+
+logger = logging.getLogger(__name__)
+
+class TranscriptionBackend(ABC):
+    """Speech-to-text engine behind transcribe_audio."""
+
+    name = ""
+    model = ""
+
+    @abstractmethod
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        """Transcribe one encoded audio file; filename carries its format."""
+
+    async def aclose(self):
+        """Release connections or worker processes."""
+
+class WhisperAPIBackend(TranscriptionBackend):
+    """An OpenAI-compatible /audio/transcriptions endpoint: OpenAI itself or the fake server."""
+
+    def __init__(self, name: str, client: WhisperClient):
+        self.name = name
+        self.model = client.model
+        self.client = client
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        return await self.client.transcribe(audio_data, filename)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper on the CPU, in a pool of worker processes.
+
+    Each worker loads the model once when it starts, so only the first job of
+    a worker pays for loading it. Decoding runs in the workers, so it holds
+    neither the event loop nor the GIL of the web process.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str, workers: int, compute_type: str, cpu_threads: int):
+        if importlib.util.find_spec("faster_whisper") is None:
+            raise RuntimeError("The local transcription backend needs faster-whisper (pip install faster-whisper)")
+        self.model = model
+        # spawn, since forking a process that runs an event loop is unsafe
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=local_whisper.load_model,
+            initargs=(model, compute_type, cpu_threads)
+        )
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, local_whisper.transcribe, audio_data)
+
+    async def aclose(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+def _whisper_client(base_url: str, api_key: str) -> WhisperClient:
+    return WhisperClient(
+        api_key=api_key,
+        base_url=base_url,
+        model=settings.WHISPER_MODEL,
+        max_connections=settings.WHISPER_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.WHISPER_MAX_KEEPALIVE_CONNECTIONS,
+        connect_timeout=settings.WHISPER_CONNECT_TIMEOUT,
+        read_timeout=settings.WHISPER_READ_TIMEOUT,
+        max_retries=settings.WHISPER_MAX_RETRIES,
+        backoff_base=settings.WHISPER_BACKOFF_BASE,
+        backoff_max=settings.WHISPER_BACKOFF_MAX
+    )
+
+def create_backend(name: str) -> TranscriptionBackend:
+    """Build the backend called name: openai, local or fake."""
+    if name == "openai":
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        return WhisperAPIBackend(name, _whisper_client(settings.OPENAI_API_BASE, settings.OPENAI_API_KEY))
+    if name == "fake":
+        return WhisperAPIBackend(name, _whisper_client(settings.FAKE_WHISPER_URL, "fake"))
+    if name == "local":
+        return LocalWhisperBackend(
+            settings.LOCAL_WHISPER_MODEL,
+            settings.LOCAL_WHISPER_WORKERS,
+            settings.LOCAL_WHISPER_COMPUTE_TYPE,
+            settings.LOCAL_WHISPER_CPU_THREADS
+        )
+    raise ValueError(f"Unknown transcription backend: {name}")
+
+_backend: Optional[TranscriptionBackend] = None
+
+def get_transcription_backend() -> TranscriptionBackend:
+    """Return the process-wide backend selected by TRANSCRIPTION_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(settings.TRANSCRIPTION_BACKEND)
+        logger.info(f"Using {_backend.name} transcription backend ({_backend.model})")
+    return _backend
+
+async def close_transcription_backend():
+    """Close the backend; called on application shutdown."""
+    global _backend
+    if _backend is not None:
+        await _backend.aclose()
+        _backend = None
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def cache_key(audio_data: bytes, *params) -> str:
+    """Hash of the audio bytes and every parameter that changes the transcript."""
+    digest = hashlib.sha256(audio_data)
+    for param in params:
+        digest.update(b'\0' + str(param).encode())
+    return digest.hexdigest()
+
+class TranscriptionCache:
+    """
+    LRU cache of transcripts keyed by cache_key().
+
+    Entries expire after ttl seconds. With disk_dir set, entries are also
+    written there as small JSON files so they survive restarts; expired files
+    are removed when they are read.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (stored at, text)
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached transcript, or None on a miss."""
+        text = self._get_memory(key)
+        if text is None and self.disk_dir:
+            text = self._get_disk(key)
+        if text is None:
+            self.misses += 1
+            metrics.incr("transcription_cache.misses")
+        else:
+            self.hits += 1
+            metrics.incr("transcription_cache.hits")
+        return text
+
+    def set(self, key: str, text: str):
+        """Store a transcript, evicting the least recently used entries over the limit."""
+        stored_at = time.time()
+        self._remember(key, stored_at, text)
+        if self.disk_dir:
+            self._set_disk(key, stored_at, text)
+
+    def stats(self) -> dict:
+        """Hit/miss counts and current size of the in-memory tier."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _remember(self, key: str, stored_at: float, text: str):
+        self._entries[key] = (stored_at, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        metrics.set_gauge("transcription_cache.entries", len(self._entries))
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, text = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + '.json')
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable transcription cache file {path}: {e}")
+            return None
+
+        if time.time() - entry["stored_at"] > self.ttl:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        # Promote to memory, keeping the original age so the TTL still applies
+        self._remember(key, entry["stored_at"], entry["text"])
+        return entry["text"]
+
+    def _set_disk(self, key: str, stored_at: float, text: str):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so a crash never leaves a partial entry
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"stored_at": stored_at, "text": text}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write transcription cache file {path}: {e}")
+
+_cache: Optional[TranscriptionCache] = None
+
+def get_transcription_cache() -> Optional[TranscriptionCache]:
+    """Return the process-wide transcription cache, or None when caching is disabled."""
+    global _cache
+    if _cache is None and settings.TRANSCRIPTION_CACHE_ENABLED:
+        _cache = TranscriptionCache(
+            settings.TRANSCRIPTION_CACHE_MAX_ENTRIES,
+            settings.TRANSCRIPTION_CACHE_TTL_SECONDS,
+            settings.TRANSCRIPTION_CACHE_DIR or None
+        )
+    return _cache
@@ -0,0 +1,85 @@
+import logging
+import math
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.ffmpeg import transcode, FFmpegError
+from app.services.pcm import SAMPLE_RATE, SAMPLE_WIDTH, decode_to_pcm, pcm_to_wav
+
+logger = logging.getLogger(__name__)
+
+# Upload encodings: ffmpeg output options and the file name Whisper gets
+ENCODERS = {
+    "opus": (['-c:a', 'libopus', '-application', 'voip', '-f', 'ogg'], "audio.ogg"),
+    "flac": (['-c:a', 'flac', '-f', 'flac'], "audio.flac"),
+}
+
+# Uploads that are worth re-encoding; compressed formats are sent as they are
+UNCOMPRESSED_SUFFIXES = ('.wav', '.pcm', '.raw')
+
+async def encode(audio_data: bytes, encoding: str, pcm_input: bool = False) -> Tuple[bytes, str]:
+    """Encode audio as 16 kHz mono with one of ENCODERS; pcm_input marks 16 kHz s16le input."""
+    output_args, filename = ENCODERS[encoding]
+    if encoding == "opus":
+        output_args = ['-b:a', settings.UPLOAD_OPUS_BITRATE] + output_args
+    input_args = ['-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', '1'] if pcm_input else None
+    encoded = await transcode(
+        audio_data,
+        ['-ar', str(SAMPLE_RATE), '-ac', '1'] + output_args,
+        input_args=input_args
+    )
+    return encoded, filename
+
+async def prepare_upload(audio_data: bytes, filename: str) -> List[Tuple[bytes, str]]:
+    """
+    Get audio ready for the Whisper API.
+
+    Uncompressed uploads are re-encoded with UPLOAD_ENCODING. Anything still
+    larger than WHISPER_MAX_UPLOAD_BYTES is split into consecutive parts that
+    each fit.
+
+    Returns:
+        (audio, filename) for each request to make, in order
+    """
+    parts = [(audio_data, filename)]
+    encoding = settings.UPLOAD_ENCODING
+    if encoding in ENCODERS and filename.lower().endswith(UNCOMPRESSED_SUFFIXES):
+        try:
+            parts = [await encode(audio_data, encoding)]
+        except FFmpegError as e:
+            logger.warning(f"Upload encoding to {encoding} failed, sending {filename} as is: {e.stderr or e}")
+
+    if len(parts[0][0]) > settings.WHISPER_MAX_UPLOAD_BYTES:
+        try:
+            parts = await _split(audio_data, len(parts[0][0]), encoding)
+        except FFmpegError as e:
+            # Let the API reject it rather than losing the audio here
+            logger.error(f"Could not split oversized upload {filename}: {e.stderr or e}")
+
+    after = sum(len(part) for part, _ in parts)
+    metrics.incr("upload.bytes_before", len(audio_data))
+    metrics.incr("upload.bytes_after", after)
+    logger.info(f"Upload {filename}: {len(audio_data)} -> {after} bytes in {len(parts)} request(s) as {parts[0][1]}")
+    return parts
+
+async def _split(audio_data: bytes, encoded_size: int, encoding: str) -> List[Tuple[bytes, str]]:
+    """Split audio into the fewest equal parts whose encodings fit the upload limit."""
+    pcm = await decode_to_pcm(audio_data)
+    limit = settings.WHISPER_MAX_UPLOAD_BYTES
+    count = math.ceil(encoded_size / limit)
+    while True:
+        size = math.ceil(len(pcm) / count / SAMPLE_WIDTH) * SAMPLE_WIDTH
+        parts = []
+        for start in range(0, len(pcm), size):
+            part = pcm[start:start + size]
+            if encoding in ENCODERS:
+                parts.append(await encode(part, encoding, pcm_input=True))
+            else:
+                parts.append((pcm_to_wav(part), "audio.wav"))
+        if all(len(part) <= limit for part, _ in parts) or size <= SAMPLE_RATE * SAMPLE_WIDTH:
+            metrics.incr("upload.splits")
+            logger.info(f"Split oversized upload into {len(parts)} parts")
+            return parts
+        # Encoded size is not exactly proportional to duration; try smaller parts
+        count += 1
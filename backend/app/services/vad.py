@@ -0,0 +1,108 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.ffmpeg import FFmpegError
+from app.services.pcm import SAMPLE_RATE, SAMPLE_WIDTH, BYTES_PER_SECOND, decode_to_pcm, pcm_to_wav
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+def frame_levels(pcm: bytes) -> np.ndarray:
+    """RMS level in dBFS of each 20 ms frame of 16 kHz mono s16le PCM."""
+    samples = np.frombuffer(pcm, dtype='<i2', count=len(pcm) // SAMPLE_WIDTH)
+    frame_count = len(samples) // FRAME_SAMPLES
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[:frame_count * FRAME_SAMPLES].reshape(frame_count, FRAME_SAMPLES)
+    frames = frames.astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+def find_speech(
+    pcm: bytes,
+    threshold_db: float = -45.0,
+    min_speech_ms: int = 200,
+    padding_ms: int = 300
+) -> Optional[Tuple[int, int]]:
+    """
+    Locate speech in 16 kHz mono s16le PCM by frame energy.
+
+    Args:
+        pcm: Decoded audio
+        threshold_db: Frames louder than this count as speech
+        min_speech_ms: Less speech than this means the audio is silent
+        padding_ms: Silence kept around the speech so words are not clipped
+
+    Returns:
+        (start, end) byte offsets of the speech, or None if the audio is silent
+    """
+    levels = frame_levels(pcm)
+    voiced = np.flatnonzero(levels > threshold_db)
+    if len(voiced) * FRAME_MS < min_speech_ms:
+        return None
+
+    padding = padding_ms // FRAME_MS
+    first = max(0, voiced[0] - padding)
+    last = min(len(levels), voiced[-1] + 1 + padding)
+    frame_bytes = FRAME_SAMPLES * SAMPLE_WIDTH
+    # Keep the partial frame at the end when the speech runs up to it
+    end = len(pcm) if last == len(levels) else int(last) * frame_bytes
+    return int(first) * frame_bytes, end
+
+def _speech_span(pcm: bytes) -> Optional[Tuple[int, int]]:
+    """find_speech with the configured thresholds, counting skipped windows."""
+    metrics.incr("vad.windows")
+    span = find_speech(pcm, settings.VAD_THRESHOLD_DB, settings.VAD_MIN_SPEECH_MS, settings.VAD_PADDING_MS)
+    if span is None:
+        metrics.incr("vad.requests_saved")
+        metrics.incr("vad.seconds_saved", len(pcm) / BYTES_PER_SECOND)
+        logger.info(f"Skipping silent audio ({len(pcm) / BYTES_PER_SECOND:.1f}s)")
+    return span
+
+def trim_silence(pcm: bytes) -> Optional[bytes]:
+    """
+    Run voice activity detection on already decoded 16 kHz mono PCM.
+
+    Returns:
+        None if the audio is silent, otherwise the PCM trimmed to the speech
+    """
+    span = _speech_span(pcm)
+    if span is None:
+        return None
+    start, end = span
+    metrics.incr("vad.seconds_saved", (len(pcm) - (end - start)) / BYTES_PER_SECOND)
+    return pcm[start:end]
+
+async def remove_silence(audio_data: bytes, filename: Optional[str] = None) -> Optional[Tuple[bytes, Optional[str]]]:
+    """
+    Run voice activity detection on audio about to be transcribed.
+
+    Returns:
+        None if the audio is silent and the request should be skipped, otherwise
+        (audio, filename) to transcribe; when enough silence was trimmed the audio
+        is replaced by a 16 kHz WAV and filename is 'audio.wav'
+    """
+    try:
+        pcm = await decode_to_pcm(audio_data)
+    except FFmpegError as e:
+        logger.warning(f"VAD decode failed, transcribing audio as is: {e.stderr or e}")
+        return audio_data, filename
+
+    span = _speech_span(pcm)
+    if span is None:
+        return None
+
+    start, end = span
+    trimmed = len(pcm) - (end - start)
+    if trimmed < settings.VAD_MIN_TRIM_MS * BYTES_PER_SECOND // 1000:
+        # Not worth replacing the compressed original with a larger WAV
+        return audio_data, filename
+
+    metrics.incr("vad.seconds_saved", trimmed / BYTES_PER_SECOND)
+    return pcm_to_wav(pcm[start:end]), "audio.wav"
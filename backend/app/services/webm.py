@@ -0,0 +1,186 @@
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# EBML element IDs (with their length marker bits, as they appear on the wire)
+EBML_HEADER_ID = 0x1A45DFA3
+SEGMENT_ID = 0x18538067
+CLUSTER_ID = 0x1F43B675
+INFO_ID = 0x1549A966
+TRACKS_ID = 0x1654AE6B
+VOID_ID = 0xEC
+
+# Level 1 elements that can follow a Cluster inside a Segment; one of them ends an
+# unknown-sized Cluster
+SEGMENT_CHILD_IDS = {
+    0x114D9B74,  # SeekHead
+    INFO_ID,
+    TRACKS_ID,
+    0x1C53BB6B,  # Cues
+    0x1043A770,  # Chapters
+    0x1941A469,  # Attachments
+    0x1254C367,  # Tags
+    CLUSTER_ID,
+}
+
+# Size field for "unknown size"; used for the Segment and every Cluster we emit so
+# that any run of Clusters can be concatenated without rewriting sizes.
+UNKNOWN_SIZE = b'\x01\xff\xff\xff\xff\xff\xff\xff'
+
+class WebMParseError(Exception):
+    """Raised when the stream is not a WebM/Matroska byte stream we can splice."""
+
+def _read_vint(data, pos: int, keep_marker: bool) -> Optional[Tuple[int, int, bool]]:
+    """
+    Read an EBML variable length integer.
+
+    Returns:
+        (value, length, all_ones) or None if more bytes are needed
+    """
+    if pos >= len(data):
+        return None
+    first = data[pos]
+    if first == 0:
+        raise WebMParseError(f"Invalid EBML length marker at offset {pos}")
+    length = 1
+    mask = 0x80
+    while not first & mask:
+        mask >>= 1
+        length += 1
+    if pos + length > len(data):
+        return None
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = (first & (mask - 1)) == mask - 1
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    return value, length, all_ones
+
+def _encode_id(element_id: int) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+
+class WebMSplicer:
+    """
+    Incremental parser for the WebM stream produced by MediaRecorder.
+
+    Chunks are fed as they arrive. The EBML header, Segment Info and Tracks of the
+    first chunk are kept as an init segment and every Cluster is stored on its own,
+    so a playable WebM file for any window of Clusters can be produced from memory
+    without remuxing through ffmpeg.
+    """
+
+    def __init__(self):
+        self.init_segment: Optional[bytes] = None
+        self.clusters: List[bytearray] = []
+        self._buffer = bytearray()
+        self._header_parts: List[bytes] = []
+        self._state = "ebml_header"
+        self._in_cluster = False
+        self._cluster_remaining: Optional[int] = None  # None for unknown-sized clusters
+
+    @property
+    def ready(self) -> bool:
+        """Whether the init segment is known and windows can be emitted."""
+        return self.init_segment is not None
+
+    @property
+    def cluster_count(self) -> int:
+        """Number of Clusters seen so far, including the one still being received."""
+        return len(self.clusters)
+
+    def feed(self, data: bytes):
+        """Parse the next chunk of the stream."""
+        self._buffer += data
+        pos = 0
+        try:
+            while True:
+                consumed = self._parse_element(pos)
+                if not consumed:
+                    break
+                pos += consumed
+        finally:
+            del self._buffer[:pos]
+
+    def window(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        """
+        Build a standalone WebM file from Clusters start..end.
+
+        The Cluster still being received is included up to its last complete block.
+        """
+        if not self.ready:
+            raise WebMParseError("Init segment has not been received yet")
+        return self.init_segment + b"".join(self.clusters[start:end])
+
+    def _parse_element(self, pos: int) -> int:
+        """Consume one element (or element header) at pos; returns bytes consumed, 0 if incomplete."""
+        element_id = _read_vint(self._buffer, pos, keep_marker=True)
+        if element_id is None:
+            return 0
+        element_id, id_length, _ = element_id
+        if id_length > 4:
+            raise WebMParseError(f"Invalid EBML element ID at offset {pos}")
+        size = _read_vint(self._buffer, pos + id_length, keep_marker=False)
+        if size is None:
+            return 0
+        size, size_length, unknown = size
+        header_length = id_length + size_length
+
+        if self._state == "ebml_header":
+            if element_id != EBML_HEADER_ID:
+                raise WebMParseError("Stream does not start with an EBML header")
+            consumed = self._take_whole(pos, header_length, size, self._header_parts.append)
+            if consumed:
+                self._state = "segment"
+            return consumed
+
+        if self._state == "segment":
+            if element_id != SEGMENT_ID:
+                raise WebMParseError("EBML header is not followed by a Segment")
+            # Enter the Segment; its size no longer holds once we splice Clusters
+            self._header_parts.append(_encode_id(SEGMENT_ID) + UNKNOWN_SIZE)
+            self._state = "body"
+            return header_length
+
+        if element_id == CLUSTER_ID:
+            if not self.ready:
+                self.init_segment = b"".join(self._header_parts)
+                logger.debug(f"WebM init segment captured ({len(self.init_segment)} bytes)")
+            self.clusters.append(bytearray(_encode_id(CLUSTER_ID) + UNKNOWN_SIZE))
+            self._in_cluster = unknown or size > 0
+            self._cluster_remaining = None if unknown else size
+            return header_length
+
+        if element_id in SEGMENT_CHILD_IDS:
+            self._in_cluster = False
+            if unknown:
+                raise WebMParseError(f"Unknown-sized element {element_id:#x} is not supported")
+            # Keep Info and Tracks for the init segment; SeekHead and Cues carry
+            # offsets that are wrong for spliced output, so they are dropped
+            keep = not self.ready and element_id in (INFO_ID, TRACKS_ID)
+            return self._take_whole(pos, header_length, size, self._header_parts.append if keep else None)
+
+        if self._in_cluster:
+            if unknown:
+                raise WebMParseError(f"Unknown-sized element {element_id:#x} inside a Cluster")
+            keep = element_id != VOID_ID
+            consumed = self._take_whole(pos, header_length, size, self.clusters[-1].extend if keep else None)
+            if consumed and self._cluster_remaining is not None:
+                self._cluster_remaining -= consumed
+                if self._cluster_remaining <= 0:
+                    self._in_cluster = False
+            return consumed
+
+        # Anything else at Segment level (Void, CRC-32, ...) is skipped
+        if unknown:
+            raise WebMParseError(f"Unknown-sized element {element_id:#x} at Segment level")
+        return self._take_whole(pos, header_length, size, None)
+
+    def _take_whole(self, pos: int, header_length: int, size: int, sink) -> int:
+        """Consume a complete element, handing its bytes to sink if given."""
+        end = pos + header_length + size
+        if end > len(self._buffer):
+            return 0
+        if sink is not None:
+            sink(bytes(self._buffer[pos:end]))
+        return end - pos
@@ -1,15 +1,30 @@
+import asyncio
+import hashlib
 import logging
+import time
 import jwt
-import tempfile
-import os
-import subprocess
 from fastapi import WebSocket, WebSocketDisconnect
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
-from app.models import users, voice_records
-from app.services.transcription import transcribe_audio
+from app.models import voice_records
+from app.services.transcription import transcribe_audio, pregenerate_ios_rendition
+from app.services.recording import append_chunk, finalize_recording
+from app.services.audio_metadata import store_audio_metadata
+from app.services.jobs import enqueue_transcription_job, postpone_job, schedule_job_now
+from app.services.ffmpeg import transcode, FFmpegError
+from app.services.transcript_merge import merge_transcripts
+from app.services.webm import WebMSplicer, WebMParseError
+from app.services.fmp4 import FragmentedMP4Parser, MP4ParseError
+from app.services.ingest_queue import ChunkQueue, DROP_PREVIEW, SIGNAL
+from app.services.scheduler import PRIORITY_FINAL, PRIORITY_COMMITTED, PRIORITY_PREVIEW
+from app.services.vad import remove_silence, trim_silence
+from app.services.pcm import BYTES_PER_SECOND, decode_to_pcm, pcm_to_wav
+from app.services.stream_decoder import StreamDecoder, StreamDecoderError
+from app.services.pagination import count_cache
+from app.services.principal_cache import get_principal
+from app.services.write_batcher import get_write_batcher
 from app.core.config import settings
 from datetime import datetime
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +32,40 @@ logger = logging.getLogger(__name__)
 LOW_CHUNK_COUNT = 2  # Number of chunks to accumulate before quick transcription
 HI_CHUNK_COUNT = 4  # Number of chunks to accumulate before database update
 
+# EBML ID of a WebM Cluster; everything before the first one is the stream header
+WEBM_CLUSTER_ID = b'\x1f\x43\xb6\x75'
+
 class WebSocketService:
-    def __init__(self, db: AsyncSession):
-        self.db = db
+    """
+    One recording session over a WebSocket.
+
+    A session can last hours, so the service holds no database session of its
+    own: each write opens one from session_factory and returns its connection
+    to the pool as soon as it commits. Chunk appends and transcript updates go
+    through the write batcher instead, when it is enabled.
+    """
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.batcher = get_write_batcher()  # Group-commits chunk and transcript writes, if enabled
         self.user = None
         self.session_id = None
         self.current_transcription_id = None
-        self.temp_dir = tempfile.mkdtemp()
-        self.chunk_files = []
         self.accumulated_chunks = []  # Store chunks in memory
         self.chunk_count = 0
-        self.webm_header = None  # Store WebM header from first chunk
+        self.webm = WebMSplicer()  # Splits the WebM stream into header and Clusters
+        self.mp4 = None  # Splits the iOS fragmented MP4 stream into init segment and fragments
+        self.chunk_clusters = []  # Index of the Cluster each accumulated chunk starts in
         self.client_type = "unknown"  # Initialize client type
+        self.committed_chunk_count = 0  # Chunks covered by the committed transcript
+        self.transcript = ""  # Committed transcript, mirrored to voice_records.transcript
+        self.ingest_queue = None  # Chunks received but not processed yet
+        self.worker = None  # Task processing the ingest queue
+        self.preview_tasks = set()  # Quick transcriptions running in the background
+        self.decoder = None  # Persistent ffmpeg decoding the stream to PCM, if enabled
+        self.committed_pcm_offset = 0  # Decoded audio covered by the committed transcript
+        self.final_job_id = None  # Queued full transcription of the recording, if jobs are enabled
+        self.final_job_postponed_at = 0.0  # time.monotonic() of the last push back of its run_after
 
     async def handle_connection(self, websocket: WebSocket, session_id: str):
         """Handle the WebSocket connection lifecycle."""
@@ -38,6 +75,9 @@ class WebSocketService:
         try:
             # Get client type from query parameters
             self.client_type = websocket.query_params.get("client_type", "unknown")
+            if self.client_type.lower() == 'ios':
+                self.webm = None  # iOS sends MP4, not WebM
+                self.mp4 = FragmentedMP4Parser()
             
             # Authenticate
             auth_message = await websocket.receive_json()
@@ -56,9 +96,8 @@ class WebSocketService:
                 await websocket.close(code=4002, reason="Invalid token")
                 return
                 
-            query = select(users).where(users.c.username == username)
-            result = await self.db.execute(query)
-            self.user = result.fetchone()
+            async with self.session_factory() as db:
+                self.user = await get_principal(db, username)
             
             if not self.user:
                 await websocket.close(code=4002, reason="User not found")
@@ -66,25 +105,98 @@ class WebSocketService:
                 
             logger.info(f"WebSocket connection accepted for user: {username}")
             
-            # Process audio stream
+            if settings.WS_STREAM_DECODER and self.webm is not None:
+                await self._start_decoder()
+            
+            # Chunks are processed by a worker so the socket keeps being read
+            self.ingest_queue = ChunkQueue(settings.WS_INGEST_QUEUE_SIZE, settings.WS_BACKPRESSURE_POLICY)
+            self.worker = asyncio.create_task(self._process_queue(websocket))
+            
+            # Receive audio stream
             while True:
                 message = await websocket.receive()
                 
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
                 if message["type"] == "websocket.receive" and "bytes" in message:
                     audio_byte = message["bytes"]
                     if audio_byte:
-                        await self._process_audio_byte(websocket, audio_byte)
+                        await self._enqueue(websocket, audio_byte)
                         
         except WebSocketDisconnect:
             logger.info("WebSocket disconnected")
-            # Save final transcription if there are remaining chunks
-            if self.accumulated_chunks:
-                await self._process_hi_chunk_count(websocket)
+            # Let the worker finish the chunks already received
+            await self._stop_worker()
+            if self.decoder is not None:
+                # Wait for the tail of the stream to be decoded
+                await self.decoder.close()
+            # Save final transcription if there are remaining chunks, unless a
+            # worker will transcribe the whole recording
+            if self.accumulated_chunks and self.final_job_id is None:
+                await self._process_hi_chunk_count(websocket, final=True)
         except Exception as e:
             logger.error(f"Error in WebSocket connection: {e}")
             await websocket.close(code=1011, reason=str(e))
         finally:
-            await self.cleanup()
+            await self._stop_worker()
+            if self.decoder is not None:
+                await self.decoder.abort()
+            if await self._flush_writes():
+                await self._finalize_recording()
+            await self._release_final_job()
+
+    async def _enqueue(self, websocket: WebSocket, audio_byte: bytes):
+        """Hand a received chunk to the processing worker."""
+        if self.ingest_queue.full():
+            logger.warning(f"Ingest queue full for session {self.session_id} ({self.ingest_queue.qsize()} chunks)")
+            if self.ingest_queue.policy == SIGNAL:
+                await websocket.send_json({
+                    "type": "backpressure",
+                    "queued": self.ingest_queue.qsize()
+                })
+        await self.ingest_queue.put(audio_byte)
+
+    async def _process_queue(self, websocket: WebSocket):
+        """Process queued chunks one at a time, in the order they were received."""
+        while True:
+            audio_byte = await self.ingest_queue.get()
+            if audio_byte is None:
+                break
+            try:
+                await self._process_audio_byte(websocket, audio_byte)
+            except Exception as e:
+                logger.error(f"Error processing queued chunk: {e}")
+
+    async def _stop_worker(self):
+        """Close the ingest queue and wait until the worker has drained it."""
+        if self.worker is None:
+            return
+        await self.ingest_queue.close()
+        await self.worker
+        self.worker = None
+        # The client is gone, nobody will see outstanding previews
+        for task in list(self.preview_tasks):
+            task.cancel()
+        if self.ingest_queue.coalesced:
+            logger.info(f"Coalesced {self.ingest_queue.coalesced} chunks for session {self.session_id}")
+
+    async def _start_decoder(self):
+        """Start the persistent stream decoder; windows are then cut from its PCM."""
+        decoder = StreamDecoder(settings.WS_STREAM_DECODER_MAX_SECONDS)
+        try:
+            await decoder.start()
+        except StreamDecoderError as e:
+            logger.error(f"Stream decoder unavailable, using per-window conversion: {e}")
+            return
+        self.decoder = decoder
+
+    def _skip_preview(self) -> bool:
+        """Whether quick transcriptions should be skipped because the worker is behind."""
+        if self.ingest_queue is None:
+            return False
+        if self.ingest_queue.closed:
+            return True  # The client is gone, nobody will see the preview
+        return self.ingest_queue.policy == DROP_PREVIEW and self.ingest_queue.qsize() > 0
 
     async def _process_audio_byte(self, websocket: WebSocket, audio_byte: bytes):
         """Process a single audio chunk and update the database."""
@@ -94,32 +206,37 @@ class WebSocketService:
                 logger.info(f"First chunk received, size: {len(audio_byte)} bytes")
                 logger.info(f"First chunk header: {audio_byte[:8].hex()}")
                 
-                # Store the WebM header from the first chunk
-                self.webm_header = audio_byte[:4]
-                logger.info(f"Extracted WebM header: {self.webm_header.hex()}")
-                
                 try:
                     # Create new record with the first chunk
                     insert_query = voice_records.insert().values(
                         session_id=self.session_id,
                         user_id=self.user.id,
                         audio_byte=audio_byte,
+                        audio_size=len(audio_byte),
                         transcript="",
                         created_at=datetime.utcnow(),
                         client_type=self.client_type
                     )
-                    result = await self.db.execute(insert_query)
-                    await self.db.commit()
+                    async with self.session_factory() as db:
+                        result = await db.execute(insert_query)
+                        await db.commit()
                     self.current_transcription_id = result.inserted_primary_key[0]
+                    count_cache.invalidate(self.user.id)
                     logger.info(f"Created new transcription record with first chunk: {self.current_transcription_id}")
                 except Exception as e:
-                    await self.db.rollback()
                     logger.error(f"Failed to create transcription record: {e}")
                     return
                 
+                if settings.TRANSCRIPTION_JOBS_ENABLED:
+                    await self._enqueue_final_job()
+                
                 # Try to transcribe the first chunk directly
                 try:
-                    new_transcript = await transcribe_audio(audio_byte, self.client_type)
+                    standalone = self._ios_standalone(audio_byte) if self.mp4 is not None else None
+                    if standalone:
+                        new_transcript = await self._transcribe(standalone, PRIORITY_PREVIEW, filename="audio.m4a")
+                    else:
+                        new_transcript = await self._transcribe(audio_byte, PRIORITY_PREVIEW)
                     if new_transcript:
                         await websocket.send_json({
                             "type": "transcript",
@@ -130,7 +247,7 @@ class WebSocketService:
                     logger.error(f"Failed to transcribe first chunk: {e}")
                     # Continue even if transcription fails
                 
-                self.accumulated_chunks.append(audio_byte)
+                self._accumulate(audio_byte)
                 self.chunk_count += 1
                 return
 
@@ -139,123 +256,83 @@ class WebSocketService:
                 # For iOS devices, we need to handle the chunks differently
                 if self.client_type.lower() == 'ios':
                     # For iOS, we'll process each chunk individually for transcription
-                    # First, save the chunk to a temporary file with .m4a extension
-                    temp_file = os.path.join(self.temp_dir, f"ios_chunk_{self.chunk_count}.m4a")
-                    with open(temp_file, 'wb') as f:
-                        f.write(audio_byte)
-                    
                     # Try multiple conversion approaches
-                    wav_file = temp_file + '.wav'
+                    mp4_input_args = [
+                        '-f', 'mp4',  # Force input format
+                        '-movflags', '+frag_keyframe+empty_moov'  # Handle fragmented MP4
+                    ]
                     success = False
                     
-                    # Approach 1: Try direct transcription without conversion
-                    try:
-                        logger.info("Trying direct transcription without conversion")
-                        new_transcript = await transcribe_audio(audio_byte, self.client_type)
-                        if new_transcript:
-                            await websocket.send_json({
-                                "type": "transcript",
-                                "text": new_transcript
-                            })
-                            logger.info(f"Direct transcription successful: {new_transcript}")
-                            success = True
-                    except Exception as e:
-                        logger.error(f"Direct transcription failed: {e}")
+                    # Fast path: prefix the fragment with the init segment from the first chunk
+                    standalone = self._ios_standalone(audio_byte) if self.mp4 is not None else None
+                    if standalone:
+                        try:
+                            new_transcript = await self._transcribe(standalone, PRIORITY_COMMITTED, filename="audio.m4a")
+                            if new_transcript:
+                                await websocket.send_json({
+                                    "type": "transcript",
+                                    "text": new_transcript
+                                })
+                                logger.info(f"Fragment transcription successful: {new_transcript}")
+                        except Exception as e:
+                            logger.error(f"Fragment transcription failed: {e}")
+                        # The file is valid, so the ffmpeg fallbacks would not do better
+                        success = True
                     
-                    # Approach 2: Try converting from M4A to WAV with fragmented MP4 handling
+                    # Approach 1: Try direct transcription without conversion
                     if not success:
                         try:
-                            wav_cmd = [
-                                'ffmpeg', '-y',
-                                '-f', 'mp4',  # Force input format
-                                '-movflags', '+frag_keyframe+empty_moov',  # Handle fragmented MP4
-                                '-i', temp_file,
-                                '-acodec', 'pcm_s16le',
-                                '-ar', '44100',
-                                '-ac', '1',
-                                '-f', 'wav',
-                                wav_file
-                            ]
-                            logger.info(f"Trying M4A to WAV conversion with fragmented MP4 handling: {' '.join(wav_cmd)}")
-                            result = subprocess.run(wav_cmd, capture_output=True, text=True)
-                            if result.returncode == 0:
-                                with open(wav_file, 'rb') as f:
-                                    wav_data = f.read()
-                                new_transcript = await transcribe_audio(wav_data, self.client_type)
-                                if new_transcript:
-                                    await websocket.send_json({
-                                        "type": "transcript",
-                                        "text": new_transcript
-                                    })
-                                    logger.info(f"M4A to WAV conversion successful: {new_transcript}")
-                                    success = True
-                            else:
-                                logger.error(f"M4A to WAV conversion failed: {result.stderr}")
+                            logger.info("Trying direct transcription without conversion")
+                            new_transcript = await self._transcribe(audio_byte, PRIORITY_COMMITTED)
+                            if new_transcript:
+                                await websocket.send_json({
+                                    "type": "transcript",
+                                    "text": new_transcript
+                                })
+                                logger.info(f"Direct transcription successful: {new_transcript}")
+                                success = True
                         except Exception as e:
-                            logger.error(f"M4A to WAV conversion failed: {e}")
+                            logger.error(f"Direct transcription failed: {e}")
                     
-                    # Approach 3: Try extracting raw audio with fragmented MP4 handling
+                    # Approach 2: Try converting from M4A to WAV with fragmented MP4 handling
                     if not success:
                         try:
-                            raw_file = temp_file + '.raw'
-                            raw_cmd = [
-                                'ffmpeg', '-y',
-                                '-f', 'mp4',  # Force input format
-                                '-movflags', '+frag_keyframe+empty_moov',  # Handle fragmented MP4
-                                '-i', temp_file,
-                                '-f', 's16le',
-                                '-ar', '44100',
-                                '-ac', '1',
-                                raw_file
-                            ]
-                            logger.info(f"Trying raw audio extraction with fragmented MP4 handling: {' '.join(raw_cmd)}")
-                            result = subprocess.run(raw_cmd, capture_output=True, text=True)
-                            if result.returncode == 0:
-                                with open(raw_file, 'rb') as f:
-                                    raw_data = f.read()
-                                new_transcript = await transcribe_audio(raw_data, self.client_type)
-                                if new_transcript:
-                                    await websocket.send_json({
-                                        "type": "transcript",
-                                        "text": new_transcript
-                                    })
-                                    logger.info(f"Raw audio extraction successful: {new_transcript}")
-                                    success = True
-                            else:
-                                logger.error(f"Raw audio extraction failed: {result.stderr}")
+                            logger.info("Trying M4A to WAV conversion with fragmented MP4 handling")
+                            pcm = await decode_to_pcm(audio_byte, 44100, input_args=mp4_input_args)
+                            new_transcript = await self._transcribe(pcm_to_wav(pcm, 44100), PRIORITY_COMMITTED)
+                            if new_transcript:
+                                await websocket.send_json({
+                                    "type": "transcript",
+                                    "text": new_transcript
+                                })
+                                logger.info(f"M4A to WAV conversion successful: {new_transcript}")
+                                success = True
+                        except FFmpegError as e:
+                            logger.error(f"M4A to WAV conversion failed: {e.stderr or e}")
                         except Exception as e:
-                            logger.error(f"Raw audio extraction failed: {e}")
+                            logger.error(f"M4A to WAV conversion failed: {e}")
                     
-                    # Approach 4: Try with AAC format and fragmented MP4 handling
+                    # Approach 3: Try with AAC format and fragmented MP4 handling
                     if not success:
                         try:
-                            aac_file = temp_file + '.aac'
-                            aac_cmd = [
-                                'ffmpeg', '-y',
-                                '-f', 'mp4',  # Force input format
-                                '-movflags', '+frag_keyframe+empty_moov',  # Handle fragmented MP4
-                                '-i', temp_file,
+                            logger.info("Trying AAC conversion with fragmented MP4 handling")
+                            aac_data = await transcode(audio_byte, [
                                 '-c:a', 'aac',
                                 '-b:a', '128k',
                                 '-ar', '44100',
                                 '-ac', '1',
-                                aac_file
-                            ]
-                            logger.info(f"Trying AAC conversion with fragmented MP4 handling: {' '.join(aac_cmd)}")
-                            result = subprocess.run(aac_cmd, capture_output=True, text=True)
-                            if result.returncode == 0:
-                                with open(aac_file, 'rb') as f:
-                                    aac_data = f.read()
-                                new_transcript = await transcribe_audio(aac_data, self.client_type)
-                                if new_transcript:
-                                    await websocket.send_json({
-                                        "type": "transcript",
-                                        "text": new_transcript
-                                    })
-                                    logger.info(f"AAC conversion successful: {new_transcript}")
-                                    success = True
-                            else:
-                                logger.error(f"AAC conversion failed: {result.stderr}")
+                                '-f', 'adts'
+                            ], input_args=mp4_input_args)
+                            new_transcript = await self._transcribe(aac_data, PRIORITY_COMMITTED)
+                            if new_transcript:
+                                await websocket.send_json({
+                                    "type": "transcript",
+                                    "text": new_transcript
+                                })
+                                logger.info(f"AAC conversion successful: {new_transcript}")
+                                success = True
+                        except FFmpegError as e:
+                            logger.error(f"AAC conversion failed: {e.stderr or e}")
                         except Exception as e:
                             logger.error(f"AAC conversion failed: {e}")
                     
@@ -264,64 +341,41 @@ class WebSocketService:
                         # Log the audio chunk details for debugging
                         logger.error(f"Audio chunk size: {len(audio_byte)}")
                         logger.error(f"Audio chunk header: {audio_byte[:8].hex()}")
-                    
-                    # Clean up temporary files
-                    try:
-                        if os.path.exists(temp_file):
-                            os.unlink(temp_file)
-                        if os.path.exists(wav_file):
-                            os.unlink(wav_file)
-                        if os.path.exists(raw_file):
-                            os.unlink(raw_file)
-                        if os.path.exists(aac_file):
-                            os.unlink(aac_file)
-                    except Exception as e:
-                        logger.error(f"Error cleaning up iOS temporary files: {e}")
                 
-                # Save the chunk to a temporary file
-                chunk_file = os.path.join(self.temp_dir, f"chunk_{len(self.chunk_files)}.webm")
-                with open(chunk_file, 'wb') as f:
-                    f.write(audio_byte)
-                self.chunk_files.append(chunk_file)
-                self.accumulated_chunks.append(audio_byte)
+                self._accumulate(audio_byte)
+                seq = self.chunk_count
                 self.chunk_count += 1
 
-                # Get the current audio data from the database
-                query = select(voice_records.c.audio_byte).where(
-                    voice_records.c.id == self.current_transcription_id
-                )
-                result = await self.db.execute(query)
-                current_audio = result.scalar_one()
-
-                # Combine the audio data
-                combined_audio = current_audio + audio_byte
-
-                # Update the database with the combined audio
-                update_query = (
-                    update(voice_records)
-                    .where(voice_records.c.id == self.current_transcription_id)
-                    .values(
-                        audio_byte=combined_audio
-                    )
-                )
-                await self.db.execute(update_query)
-                await self.db.commit()
-                logger.info(f"Appended chunk to transcription: {self.current_transcription_id}")
+                # Append the chunk as its own row; the recording is assembled on close
+                if self.batcher is not None:
+                    await self.batcher.add_chunk(self.current_transcription_id, seq, audio_byte)
+                else:
+                    async with self.session_factory() as db:
+                        await append_chunk(db, self.current_transcription_id, seq, audio_byte)
+                logger.info(f"Appended chunk {seq} to transcription: {self.current_transcription_id}")
+                await self._postpone_final_job()
 
                 # Process chunks based on count (only for non-iOS devices)
                 if self.client_type.lower() != 'ios':
                     if self.chunk_count % LOW_CHUNK_COUNT == 0:
-                        await self._process_low_chunk_count(websocket)
+                        if self._skip_preview():
+                            logger.info(f"Skipping quick transcript at chunk {self.chunk_count}, worker is behind")
+                        else:
+                            # Previews do not hold up the chunk pipeline; the scheduler
+                            # drops a queued one when a newer one arrives
+                            task = asyncio.create_task(self._process_low_chunk_count(websocket))
+                            self.preview_tasks.add(task)
+                            task.add_done_callback(self.preview_tasks.discard)
                     
                     if self.chunk_count % HI_CHUNK_COUNT == 0:
                         await self._process_hi_chunk_count(websocket)
 
             except Exception as e:
-                await self.db.rollback()
                 logger.error(f"Database error processing chunk: {e}")
                 # Continue processing even if database update fails
-                self.accumulated_chunks.append(audio_byte)
-                self.chunk_count += 1
+                if not self.accumulated_chunks or self.accumulated_chunks[-1] is not audio_byte:
+                    self._accumulate(audio_byte)
+                    self.chunk_count += 1
 
         except Exception as e:
             logger.error(f"Error processing audio chunk: {e}")
@@ -329,41 +383,100 @@ class WebSocketService:
             logger.error(f"Chunk size: {len(audio_byte)}")
             logger.error(f"Chunk header: {audio_byte[:8].hex() if audio_byte else 'None'}")
             # Continue processing even if there's an error
-            self.accumulated_chunks.append(audio_byte)
-            self.chunk_count += 1
+            if not self.accumulated_chunks or self.accumulated_chunks[-1] is not audio_byte:
+                self._accumulate(audio_byte)
+                self.chunk_count += 1
 
-    async def _process_low_chunk_count(self, websocket: WebSocket):
-        """Process accumulated chunks for database transcription update."""
+    async def _transcribe(self, audio: bytes, priority: int, filename: Optional[str] = None) -> Optional[str]:
+        """Transcribe audio of this session through the shared scheduler."""
+        if settings.VAD_ENABLED:
+            prepared = await remove_silence(audio, filename)
+            if prepared is None:
+                return None
+            audio, filename = prepared
+        return await self._submit(audio, priority, filename)
+
+    async def _transcribe_pcm(self, pcm: bytes, priority: int) -> Optional[str]:
+        """Transcribe audio already decoded by the stream decoder."""
+        if settings.VAD_ENABLED:
+            pcm = trim_silence(pcm)
+            if pcm is None:
+                return None
+        return await self._submit(pcm_to_wav(pcm), priority, "audio.wav")
+
+    async def _submit(self, audio: bytes, priority: int, filename: Optional[str]) -> Optional[str]:
+        return await transcribe_audio(
+            audio,
+            self.client_type,
+            filename=filename,
+            user_id=self.user.id,
+            session_id=self.session_id,
+            priority=priority
+        )
+
+    def _ios_standalone(self, audio_byte: bytes) -> Optional[bytes]:
+        """Turn an iOS chunk into a standalone .m4a file, or None if that is not possible."""
         try:
-            # Create a properly formatted WebM file
-            input_file = os.path.join(self.temp_dir, f"temp_input_low_{self.chunk_count}.webm")
-            output_file = os.path.join(self.temp_dir, f"temp_output_low_{self.chunk_count}.webm")
-            
-            # Write the combined chunks with proper header
-            with open(input_file, 'wb') as f:
-                f.write(self.webm_header)  # Write header first
-                for chunk in self.accumulated_chunks:
-                    f.write(chunk[4:] if chunk.startswith(self.webm_header) else chunk)
-
-            # Use a simpler FFmpeg command that preserves the original format
-            ffmpeg_cmd = [
-                'ffmpeg', '-i', input_file,
-                '-c:a', 'copy',  # Copy the audio stream without re-encoding
-                output_file
-            ]
-
+            fragments = self.mp4.feed(audio_byte)
+        except MP4ParseError as e:
+            logger.warning(f"Not a fragmented MP4 stream, falling back to ffmpeg conversion: {e}")
+            self.mp4 = None
+            return None
+        if not self.mp4.ready or not fragments:
+            return None
+        return self.mp4.standalone(fragments)
+
+    def _accumulate(self, audio_byte: bytes):
+        """Keep a chunk in memory and feed it to the WebM splicer."""
+        self.accumulated_chunks.append(audio_byte)
+        if self.decoder is not None:
             try:
-                subprocess.run(ffmpeg_cmd, check=True, capture_output=True, text=True)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"FFmpeg processing failed: {e.stderr}")
-                return
+                self.decoder.feed(audio_byte)
+            except StreamDecoderError as e:
+                logger.error(f"Stream decoder failed, using per-window conversion: {e}")
+                asyncio.create_task(self.decoder.abort())
+                self.decoder = None
+        if self.webm is None:
+            return
+        # The chunk continues the Cluster in progress, if any
+        self.chunk_clusters.append(max(0, self.webm.cluster_count - 1))
+        try:
+            self.webm.feed(audio_byte)
+        except WebMParseError as e:
+            logger.warning(f"Not a spliceable WebM stream, falling back to ffmpeg remux: {e}")
+            self.webm = None
+
+    async def _get_window_audio(self, start: int, tag: str) -> Optional[bytes]:
+        """Get a playable WebM file of the accumulated chunks from index start onwards."""
+        if self.webm is not None and self.webm.ready:
+            # Splice the Clusters straight from memory
+            return self.webm.window(self.chunk_clusters[start])
+
+        # Fallback: concatenate the chunks and let ffmpeg remux them
+        try:
+            return await transcode(self._build_window_audio(start), [
+                '-c:a', 'copy',  # Copy the audio stream without re-encoding
+                '-f', 'webm'
+            ])
+        except FFmpegError as e:
+            logger.error(f"FFmpeg remux of {tag} window failed: {e.stderr or e}")
+            return None
 
-            # Read the processed file
-            with open(output_file, 'rb') as f:
-                processed_audio = f.read()
+    async def _process_low_chunk_count(self, websocket: WebSocket):
+        """Process accumulated chunks for database transcription update."""
+        try:
+            if self.decoder is not None:
+                pcm = self.decoder.pcm(self.decoder.start_offset)
+                if not pcm:
+                    return
+                new_transcript = await self._transcribe_pcm(pcm, PRIORITY_PREVIEW)
+            else:
+                processed_audio = await self._get_window_audio(0, "low")
+                if processed_audio is None:
+                    return
 
-            # Transcribe the processed audio
-            new_transcript = await transcribe_audio(processed_audio, self.client_type)
+                # Transcribe the processed audio
+                new_transcript = await self._transcribe(processed_audio, PRIORITY_PREVIEW)
             
             if new_transcript:
                 # Send transcript to client without updating database
@@ -377,129 +490,158 @@ class WebSocketService:
             logger.error(f"Error in low chunk transcription update: {e}")
 
 
-    async def _process_hi_chunk_count(self, websocket: WebSocket):
+    def _build_window_audio(self, start: int) -> bytes:
+        """Concatenate the accumulated chunks from index start onwards for remuxing."""
+        if start > 0:
+            # Later chunks carry no header, so prefix the one from the first chunk
+            header_end = self.accumulated_chunks[0].find(WEBM_CLUSTER_ID)
+            if header_end > 0:
+                return self.accumulated_chunks[0][:header_end] + b"".join(self.accumulated_chunks[start:])
+            logger.warning("No WebM header found in first chunk, transcribing full recording")
+        return b"".join(self.accumulated_chunks)
+
+    async def _process_hi_chunk_count(self, websocket: WebSocket, final: bool = False):
         """Process accumulated chunks for database transcription update."""
         try:
-            # Create a properly formatted WebM file
-            input_file = os.path.join(self.temp_dir, f"temp_input_hi_{self.chunk_count}.webm")
-            output_file = os.path.join(self.temp_dir, f"temp_output_hi_{self.chunk_count}.webm")
-            
-            # Write the combined chunks with proper header
-            with open(input_file, 'wb') as f:
-                f.write(self.webm_header)  # Write header first
-                for chunk in self.accumulated_chunks:
-                    f.write(chunk[4:] if chunk.startswith(self.webm_header) else chunk)
-
-            # Use a simpler FFmpeg command that preserves the original format
-            ffmpeg_cmd = [
-                'ffmpeg', '-i', input_file,
-                '-c:a', 'copy',  # Copy the audio stream without re-encoding
-                output_file
-            ]
-
-            try:
-                subprocess.run(ffmpeg_cmd, check=True, capture_output=True, text=True)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"FFmpeg processing failed: {e.stderr}")
-                return
-
-            # Read the processed file
-            with open(output_file, 'rb') as f:
-                processed_audio = f.read()
+            priority = PRIORITY_FINAL if final else PRIORITY_COMMITTED
+            end = len(self.accumulated_chunks)
+            if self.decoder is not None:
+                # Cut the window from the decoded stream; offsets are in PCM bytes
+                end_offset = self.decoder.end_offset
+                if settings.TRANSCRIBE_WINDOWED:
+                    if end_offset <= self.committed_pcm_offset:
+                        return
+                    overlap = settings.TRANSCRIBE_WINDOW_OVERLAP_MS * BYTES_PER_SECOND // 1000
+                    start_offset = max(0, self.committed_pcm_offset - overlap)
+                else:
+                    start_offset = 0
+                start = self.committed_chunk_count
+                pcm = self.decoder.pcm(start_offset, end_offset)
+                if not pcm:
+                    return
+                new_transcript = await self._transcribe_pcm(pcm, priority)
+            else:
+                if settings.TRANSCRIBE_WINDOWED:
+                    # Only the audio added since the last committed pass, plus a small overlap
+                    if end <= self.committed_chunk_count:
+                        return
+                    start = max(0, self.committed_chunk_count - settings.TRANSCRIBE_WINDOW_OVERLAP_CHUNKS)
+                else:
+                    start = 0
+
+                processed_audio = await self._get_window_audio(start, "hi")
+                if processed_audio is None:
+                    return
 
-            # Transcribe the processed audio
-            new_transcript = await transcribe_audio(processed_audio, self.client_type)
+                # Transcribe the processed audio
+                new_transcript = await self._transcribe(processed_audio, priority)
             
             if new_transcript:
-                # Get the current transcript
-                query = select(voice_records.c.transcript).where(
-                    voice_records.c.id == self.current_transcription_id
-                )
-                result = await self.db.execute(query)
-                prev_transcript = result.scalar_one() or ""
-                
-                # Append the new transcript
-                combined_transcript = f"{prev_transcript} {new_transcript}".strip()
+                if settings.TRANSCRIBE_WINDOWED:
+                    # Drop the words the overlapping audio transcribed twice
+                    combined_transcript = merge_transcripts(self.transcript, new_transcript)
+                else:
+                    combined_transcript = f"{self.transcript} {new_transcript}".strip()
                 
                 # Update the transcript in database
-                update_query = (
-                    update(voice_records)
-                    .where(voice_records.c.id == self.current_transcription_id)
-                    .values(
-                        transcript=combined_transcript
+                if self.batcher is not None:
+                    await self.batcher.set_transcript(self.current_transcription_id, combined_transcript)
+                else:
+                    update_query = (
+                        update(voice_records)
+                        .where(voice_records.c.id == self.current_transcription_id)
+                        .values(
+                            transcript=combined_transcript
+                        )
                     )
-                )
-                await self.db.execute(update_query)
-                await self.db.commit()
+                    async with self.session_factory() as db:
+                        await db.execute(update_query)
+                        await db.commit()
+                self.transcript = combined_transcript
+                self.committed_chunk_count = end
+                if self.decoder is not None:
+                    self.committed_pcm_offset = end_offset
                 
-                logger.info(f"Updated database transcript for chunks 1 to {self.chunk_count}")
+                logger.info(f"Updated database transcript for chunks {start + 1} to {end}")
 
         except Exception as e:
             logger.error(f"Error in database transcription update: {e}")
 
-    async def cleanup(self):
-        """Clean up temporary files."""
+    async def _flush_writes(self) -> bool:
+        """Commit this session's queued writes, so finalizing sees every chunk; False if that failed."""
+        if self.batcher is None:
+            return True
         try:
-            for file in self.chunk_files:
-                if os.path.exists(file):
-                    os.remove(file)
-            if os.path.exists(self.temp_dir):
-                os.rmdir(self.temp_dir)
+            await self.batcher.flush()
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}") 
-        
-
-    async def ZZ_process_low_chunk_countZZ(self, websocket: WebSocket):
-        """Process accumulated chunks for quick transcription without database update."""
+            # Not finalized then: chunks written later are still assembled on read
+            logger.error(f"Failed to flush queued writes of recording {self.current_transcription_id}: {e}")
+            return False
+        return True
+
+    async def _finalize_recording(self):
+        """Fold the chunks appended during this session into the recording."""
+        if not self.current_transcription_id:
+            return
         try:
-            # Combine recent chunks for transcription
-            recent_chunks = self.accumulated_chunks[-LOW_CHUNK_COUNT:]
-            
-            # Create a properly formatted WebM file
-            input_file = os.path.join(self.temp_dir, f"temp_input_{self.chunk_count}.webm")
-            output_file = os.path.join(self.temp_dir, f"temp_output_{self.chunk_count}.webm")
-            
-            # Write the combined chunks with proper header
-            with open(input_file, 'wb') as f:
-                # Write header only once
-                f.write(self.webm_header)
-                # For each chunk, skip the header if it exists
-                for chunk in recent_chunks:
-                    if chunk[:4] == self.webm_header:
-                        f.write(chunk[4:])
-                    else:
-                        f.write(chunk)
-
-            # Use a simpler FFmpeg command that preserves the original format
-            ffmpeg_cmd = [
-                'ffmpeg', '-i', input_file,
-                '-c:a', 'copy',  # Copy the audio stream without re-encoding
-                output_file
-            ]
-
-            try:
-                subprocess.run(ffmpeg_cmd, check=True, capture_output=True, text=True)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"FFmpeg processing failed: {e.stderr}")
-                return
-
-            # Read the processed file
-            with open(output_file, 'rb') as f:
-                processed_audio = f.read()
+            async with self.session_factory() as db:
+                audio_data = await finalize_recording(db, self.current_transcription_id)
+        except Exception as e:
+            # Chunks stay in voice_chunks and are still assembled on read
+            logger.error(f"Failed to finalize recording {self.current_transcription_id}: {e}")
+            return
+        if not audio_data:
+            return
+        try:
+            async with self.session_factory() as db:
+                await store_audio_metadata(db, self.current_transcription_id, audio_data)
+        except Exception as e:
+            logger.error(f"Failed to store metadata of recording {self.current_transcription_id}: {e}")
+        if settings.RENDITION_PREGENERATE:
+            pregenerate_ios_rendition(hashlib.sha256(audio_data).hexdigest(), audio_data)
 
-            # Transcribe the processed audio
-            new_transcript = await transcribe_audio(processed_audio, self.client_type)
-            
-            if new_transcript:
-                # Send transcript to client without updating database
-                await websocket.send_json({
-                    "type": "transcript",
-                    "text": new_transcript
-                })
-                logger.info(f"Sent quick transcript for chunks {self.chunk_count - LOW_CHUNK_COUNT + 1} to {self.chunk_count}")
+    async def _enqueue_final_job(self):
+        """Queue the full transcription of the recording, due only if the session is never closed."""
+        try:
+            async with self.session_factory() as db:
+                self.final_job_id = await enqueue_transcription_job(
+                    db,
+                    self.current_transcription_id,
+                    delay_seconds=settings.JOB_ORPHAN_DELAY_SECONDS
+                )
+            self.final_job_postponed_at = time.monotonic()
+        except Exception as e:
+            # Without a job the final pass runs inline on disconnect
+            logger.error(f"Failed to queue final transcription job: {e}")
+
+    async def _postpone_final_job(self):
+        """
+        Keep the queued full transcription from coming due while chunks still arrive.
+
+        A worker running it mid-session would fold and rewrite the recording under
+        the live session, so a session longer than JOB_ORPHAN_DELAY_SECONDS pushes
+        it back, at most once per half of that delay.
+        """
+        if self.final_job_id is None:
+            return
+        if time.monotonic() - self.final_job_postponed_at < settings.JOB_ORPHAN_DELAY_SECONDS / 2:
+            return
+        try:
+            async with self.session_factory() as db:
+                await postpone_job(db, self.final_job_id, settings.JOB_ORPHAN_DELAY_SECONDS)
+            self.final_job_postponed_at = time.monotonic()
+        except Exception as e:
+            # Tried again with the next chunk
+            logger.error(f"Failed to postpone final transcription job {self.final_job_id}: {e}")
 
+    async def _release_final_job(self):
+        """Make the queued full transcription of the recording due now."""
+        if self.final_job_id is None:
+            return
+        try:
+            async with self.session_factory() as db:
+                await schedule_job_now(db, self.final_job_id)
+            logger.info(f"Queued final transcription job {self.final_job_id} for recording {self.current_transcription_id}")
         except Exception as e:
-            logger.error(f"Error in quick transcription: {e}")
-            logger.error(f"Chunk count: {self.chunk_count}")
-            logger.error(f"Recent chunks: {len(recent_chunks)}")
-            logger.error(f"WebM header: {self.webm_header.hex() if self.webm_header else 'None'}")
+            # The job still comes due after JOB_ORPHAN_DELAY_SECONDS
+            logger.error(f"Failed to release final transcription job {self.final_job_id}: {e}")
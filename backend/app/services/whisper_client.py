@@ -0,0 +1,118 @@
+import asyncio
+import random
+import logging
+from typing import Optional, Dict, Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class WhisperError(Exception):
+    """Raised when the transcription API request fails for good."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class WhisperClient:
+    """
+    Async client for the OpenAI audio transcription endpoint.
+
+    A single instance keeps a pool of keep-alive connections, so many sessions
+    can transcribe concurrently without blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.openai.com/v1",
+        model: str = "whisper-1",
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            )
+        )
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        return delay
+
+    async def transcribe(
+        self,
+        audio_data: bytes,
+        filename: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Transcribe audio bytes.
+
+        Args:
+            audio_data: Encoded audio
+            filename: File name sent with the upload; its extension tells the API the format
+            params: Extra form fields (e.g. language, prompt)
+
+        Returns:
+            The transcribed text
+        """
+        data = {"model": self.model}
+        if params:
+            data.update(params)
+
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self._client.post(
+                    "/audio/transcriptions",
+                    data=data,
+                    files={"file": (filename, audio_data)}
+                )
+                if response.status_code == 200:
+                    return response.json()["text"]
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise WhisperError(
+                        f"Transcription request failed ({response.status_code}): {response.text}",
+                        status_code=response.status_code
+                    )
+                error = WhisperError(
+                    f"Transcription request failed ({response.status_code})",
+                    status_code=response.status_code
+                )
+                retry_after = response.headers.get("retry-after")
+            except httpx.TransportError as e:
+                error = WhisperError(f"Transcription request failed: {e!r}")
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            logger.warning(f"{error}; retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self._client.aclose()
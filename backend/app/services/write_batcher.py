@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import WriterSessionFactory
+from app.models.transcription import voice_records, voice_chunks
+
+logger = logging.getLogger(__name__)
+
+# Chunk appends and transcript updates of every live session are queued here and
+# written together: one transaction, and one commit, for all the writes made in the
+# last WRITE_BATCH_MAX_DELAY_SECONDS instead of one per chunk. Reads of a recording
+# still in progress may miss its writes of that interval; the session flushes before
+# it finalizes the recording, so nothing is missed once it is closed.
+
+class WriteBatcher:
+    """
+    Write-behind buffer of chunk inserts and transcript updates, group-committed.
+
+    A batch is written max_delay seconds after its first write, or at once when
+    it holds max_rows writes or max_bytes of audio. Transcript updates replace
+    the whole transcript, so only the latest one per recording is written.
+
+    A batch that violates a constraint is written again one chunk per
+    transaction and the offending chunks are dropped. A batch that fails
+    otherwise is queued again, up to max_retries times, then dropped.
+    """
+
+    def __init__(self, session_factory, max_delay: float, max_rows: int, max_bytes: int, max_retries: int = 5):
+        self.session_factory = session_factory
+        self.max_delay = max_delay
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_retries = max_retries
+        self._chunks: List[Dict] = []
+        self._chunk_bytes = 0
+        self._transcripts: Dict[int, str] = {}
+        self._lock = asyncio.Lock()  # One flush at a time, so batches commit in order
+        self._timer: Optional[asyncio.Task] = None
+        self._failures = 0  # Consecutive failed flushes of the batch at the head of the queue
+
+    def pending(self) -> int:
+        return len(self._chunks) + len(self._transcripts)
+
+    async def add_chunk(self, record_id: int, seq: int, chunk: bytes):
+        """
+        Queue the append of one audio chunk to a recording.
+
+        Raises:
+            The error of a flush this write triggered; the writes stay queued and are retried
+        """
+        self._chunks.append(dict(record_id=record_id, seq=seq, chunk_byte=chunk))
+        self._chunk_bytes += len(chunk)
+        await self._added()
+
+    async def set_transcript(self, record_id: int, transcript: str):
+        """Queue the update of a recording's transcript; see add_chunk."""
+        self._transcripts[record_id] = transcript
+        await self._added()
+
+    async def _added(self):
+        metrics.set_gauge("write_batcher.pending", self.pending())
+        if self.pending() >= self.max_rows or self._chunk_bytes >= self.max_bytes:
+            # The writer waits for this flush, which holds back sessions that outpace the database
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Write-behind flush failed, retrying in {self.max_delay}s: {e}")
+
+    async def flush(self):
+        """
+        Write everything queued in one transaction.
+
+        Raises:
+            The database error, after queueing the writes again to be retried,
+            or dropping them once they have failed max_retries times
+        """
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            chunks, self._chunks = self._chunks, []
+            transcripts, self._transcripts = self._transcripts, {}
+            chunk_bytes, self._chunk_bytes = self._chunk_bytes, 0
+            if not chunks and not transcripts:
+                return
+
+            started = time.perf_counter()
+            dropped = 0
+            try:
+                try:
+                    async with self.session_factory() as db:
+                        await self._write(db, chunks, transcripts)
+                except IntegrityError as e:
+                    # One bad row, such as a chunk of a recording deleted mid-session or one
+                    # already written by a flush whose commit was reported as failed, must
+                    # not hold back the writes of every other session
+                    logger.warning(f"Write-behind batch violated a constraint, writing it row by row: {e}")
+                    dropped = await self._write_rows(chunks, transcripts)
+            except Exception:
+                metrics.incr("write_batcher.failures")
+                self._failures += 1
+                if self._failures > self.max_retries:
+                    logger.error(f"Dropped {len(chunks)} chunks and {len(transcripts)} transcripts after {self._failures} failed flushes")
+                    metrics.incr("write_batcher.dropped", len(chunks) + len(transcripts))
+                    self._failures = 0
+                else:
+                    # Put the batch back ahead of anything queued meanwhile; a newer transcript wins
+                    self._chunks = chunks + self._chunks
+                    self._chunk_bytes += chunk_bytes
+                    for record_id, transcript in transcripts.items():
+                        self._transcripts.setdefault(record_id, transcript)
+                if self.pending() and self._timer is None:
+                    self._timer = asyncio.create_task(self._flush_later())
+                raise
+            finally:
+                metrics.set_gauge("write_batcher.pending", self.pending())
+
+            self._failures = 0
+            metrics.incr("write_batcher.flushes")
+            metrics.incr("write_batcher.rows", len(chunks) + len(transcripts) - dropped)
+            metrics.observe("write_batcher.flush_seconds", time.perf_counter() - started)
+
+    async def _write(self, db, chunks: List[Dict], transcripts: Dict[int, str]):
+        if chunks:
+            await db.execute(voice_chunks.insert(), chunks)
+            added: Dict[int, int] = {}
+            for row in chunks:
+                added[row["record_id"]] = added.get(row["record_id"], 0) + len(row["chunk_byte"])
+            # Rows without a size yet are left to the backfill, as in append_chunk
+            size_query = (
+                update(voice_records)
+                .where(voice_records.c.id == bindparam("record_id"))
+                .where(voice_records.c.audio_size.isnot(None))
+                .values(audio_size=voice_records.c.audio_size + bindparam("added"))
+            )
+            await db.execute(size_query, [dict(record_id=record_id, added=size) for record_id, size in added.items()])
+        if transcripts:
+            transcript_query = (
+                update(voice_records)
+                .where(voice_records.c.id == bindparam("record_id"))
+                .values(transcript=bindparam("new_transcript"))
+            )
+            await db.execute(transcript_query, [
+                dict(record_id=record_id, new_transcript=transcript) for record_id, transcript in transcripts.items()
+            ])
+        await db.commit()
+
+    async def _write_rows(self, chunks: List[Dict], transcripts: Dict[int, str]) -> int:
+        """
+        Write each chunk in a transaction of its own, dropping those that violate a constraint.
+
+        Returns:
+            Number of chunks dropped
+        """
+        dropped = 0
+        async with self.session_factory() as db:
+            for row in chunks:
+                try:
+                    await self._write(db, [row], {})
+                except IntegrityError as e:
+                    await db.rollback()
+                    dropped += 1
+                    logger.error(f"Dropped chunk {row['seq']} of recording {row['record_id']}: {e}")
+            if transcripts:
+                # An UPDATE of a missing recording changes nothing, so these cannot conflict
+                await self._write(db, [], transcripts)
+        metrics.incr("write_batcher.dropped", dropped)
+        return dropped
+
+_batcher: Optional[WriteBatcher] = None
+
+def get_write_batcher() -> Optional[WriteBatcher]:
+    """Return the process-wide batcher, or None when WRITE_BATCH_ENABLED is off."""
+    global _batcher
+    if _batcher is None and settings.WRITE_BATCH_ENABLED:
+        _batcher = WriteBatcher(
+            WriterSessionFactory,
+            settings.WRITE_BATCH_MAX_DELAY_SECONDS,
+            settings.WRITE_BATCH_MAX_ROWS,
+            settings.WRITE_BATCH_MAX_BYTES,
+            settings.WRITE_BATCH_MAX_RETRIES
+        )
+    return _batcher
+
+async def close_write_batcher():
+    """Flush and drop the batcher; called on application shutdown."""
+    global _batcher
+    if _batcher is not None:
+        try:
+            await _batcher.flush()
+        except Exception as e:
+            logger.error(f"Lost {_batcher.pending()} queued writes on shutdown: {e}")
+        _batcher = None
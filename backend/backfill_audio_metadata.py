@@ -0,0 +1,28 @@
+"""
+Backfill of voice_records.audio_size, audio_duration_ms and audio_codec.
+
+Fills in the metadata of recordings stored before those columns existed. Safe
+to stop and run again; only rows still missing a value are touched:
+
+    python backfill_audio_metadata.py [--batch-size N] [--size-only]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.db.session import AsyncSessionFactory
+from app.services.audio_metadata import backfill_audio_metadata
+
+logger = logging.getLogger(__name__)
+
+async def main(batch_size: int, probe: bool):
+    async with AsyncSessionFactory() as db:
+        sized, probed = await backfill_audio_metadata(db, batch_size=batch_size, probe=probe)
+    logger.info(f"Backfill done: {sized} sizes, {probed} recordings probed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill in audio metadata of existing recordings")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows read per query")
+    parser.add_argument("--size-only", action="store_true", help="Skip probing duration and codec with ffmpeg")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, not args.size_only))
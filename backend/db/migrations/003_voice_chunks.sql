@@ -0,0 +1,10 @@
+-- Append-only chunk table: each incoming audio chunk is INSERTed here instead of
+-- rewriting voice_records.audio_byte. Chunks are folded into audio_byte on session close.
+CREATE TABLE IF NOT EXISTS voice_chunks (
+    id SERIAL PRIMARY KEY,
+    record_id INTEGER NOT NULL REFERENCES voice_records(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    chunk_byte BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_voice_chunks_record_seq UNIQUE (record_id, seq)
+);
@@ -0,0 +1,17 @@
+-- Durable transcription jobs. Workers claim due rows with SELECT ... FOR UPDATE SKIP LOCKED;
+-- a running job whose locked_until has passed is considered abandoned and claimed again.
+-- Times are UTC without time zone, as written by the application.
+CREATE TABLE IF NOT EXISTS transcription_jobs (
+    id SERIAL PRIMARY KEY,
+    record_id INTEGER NOT NULL REFERENCES voice_records(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+    locked_until TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'utc'),
+    updated_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX IF NOT EXISTS idx_transcription_jobs_status_run_after ON transcription_jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_transcription_jobs_record_id ON transcription_jobs(record_id);
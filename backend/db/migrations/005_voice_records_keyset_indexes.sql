@@ -0,0 +1,5 @@
+-- Indexes for keyset pagination of GET /api/transcriptions, which orders by
+-- (created_at DESC, id DESC) and continues from the last row of a page with
+-- (created_at, id) < (:created_at, :id). One for a user's own list, one for the admin view.
+CREATE INDEX IF NOT EXISTS idx_voice_records_user_created_id ON voice_records(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_voice_records_created_id ON voice_records(created_at DESC, id DESC);
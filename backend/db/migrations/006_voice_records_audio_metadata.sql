@@ -0,0 +1,6 @@
+-- Size, duration and codec of each recording, so the transcription list does not
+-- read audio_byte. New recordings maintain them at ingest; run
+-- backfill_audio_metadata.py to fill them in for existing rows.
+ALTER TABLE voice_records ADD COLUMN IF NOT EXISTS audio_size BIGINT;
+ALTER TABLE voice_records ADD COLUMN IF NOT EXISTS audio_duration_ms INTEGER;
+ALTER TABLE voice_records ADD COLUMN IF NOT EXISTS audio_codec VARCHAR(32);
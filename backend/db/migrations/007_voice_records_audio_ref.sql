@@ -0,0 +1,5 @@
+-- SHA-256 of a recording's finished audio, set when the recording is finalized. With
+-- audio_byte NULL the audio is in the content-addressed blob store under this name.
+-- Existing rows are moved by migrate_audio_to_blob_store.py.
+ALTER TABLE voice_records ADD COLUMN IF NOT EXISTS audio_ref VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_voice_records_audio_ref ON voice_records(audio_ref);
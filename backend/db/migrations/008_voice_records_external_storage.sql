@@ -0,0 +1,5 @@
+-- Keep audio out-of-line but uncompressed, so substring() on it reads only the TOAST
+-- chunks of the requested range when streaming. Audio codecs leave nothing for pglz
+-- to compress anyway. Applies to values written from now on.
+ALTER TABLE voice_records ALTER COLUMN audio_byte SET STORAGE EXTERNAL;
+ALTER TABLE voice_chunks ALTER COLUMN chunk_byte SET STORAGE EXTERNAL;
@@ -0,0 +1,68 @@
+"""
+Deterministic stand-in for the OpenAI transcription API, for load tests and offline runs.
+
+Run it and point the backend at it:
+
+    python fake_whisper_server.py
+    TRANSCRIPTION_BACKEND=fake uvicorn main:app
+
+The transcript is derived from a hash of the uploaded bytes, so the same audio
+always gets the same text. Behaviour is tuned with environment variables:
+
+    FAKE_WHISPER_PORT            Port to listen on (9000)
+    FAKE_WHISPER_LATENCY_MS      Fixed delay per request (300)
+    FAKE_WHISPER_LATENCY_PER_MB_MS
+                                 Extra delay per MB uploaded (200)
+    FAKE_WHISPER_ERROR_RATE      Fraction of requests that fail, 0 to 1 (0)
+    FAKE_WHISPER_ERROR_STATUSES  Comma-separated statuses for failures (503,429)
+    FAKE_WHISPER_SEED            Seed of the error sequence (0)
+"""
+import asyncio
+import hashlib
+import os
+import random
+
+import uvicorn
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import JSONResponse
+
+PORT = int(os.getenv("FAKE_WHISPER_PORT", "9000"))
+LATENCY_MS = float(os.getenv("FAKE_WHISPER_LATENCY_MS", "300"))
+LATENCY_PER_MB_MS = float(os.getenv("FAKE_WHISPER_LATENCY_PER_MB_MS", "200"))
+ERROR_RATE = float(os.getenv("FAKE_WHISPER_ERROR_RATE", "0"))
+ERROR_STATUSES = [int(status) for status in os.getenv("FAKE_WHISPER_ERROR_STATUSES", "503,429").split(",")]
+
+WORDS = [
+    "the", "quick", "brown", "fox", "jumps", "over", "a", "lazy", "dog",
+    "we", "talked", "about", "the", "meeting", "notes", "and", "next", "steps",
+    "please", "send", "me", "report", "by", "friday", "thanks", "everyone",
+]
+
+app = FastAPI(title="Fake transcription API")
+# One sequence for the whole process, so a run with the same seed fails the same requests
+errors = random.Random(int(os.getenv("FAKE_WHISPER_SEED", "0")))
+
+def fake_transcript(audio_data: bytes) -> str:
+    """Deterministic text, roughly one word per 2 KB of audio."""
+    digest = hashlib.sha256(audio_data).digest()
+    count = max(1, min(len(digest), len(audio_data) // 2048))
+    return " ".join(WORDS[byte % len(WORDS)] for byte in digest[:count]).capitalize() + "."
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(file: UploadFile = File(...), model: str = Form(...)):
+    audio_data = await file.read()
+    await asyncio.sleep((LATENCY_MS + LATENCY_PER_MB_MS * len(audio_data) / (1024 * 1024)) / 1000)
+
+    if errors.random() < ERROR_RATE:
+        status = errors.choice(ERROR_STATUSES)
+        headers = {"Retry-After": "1"} if status == 429 else None
+        return JSONResponse(
+            {"error": {"message": "Injected failure", "type": "fake_error"}},
+            status_code=status,
+            headers=headers
+        )
+
+    return {"text": fake_transcript(audio_data)}
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
@@ -9,7 +9,6 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert as pg_insert # Use dialect specific insert for potential ON CONFLICT later
 import aiofiles # For async file operations
-import openai
 from sqlalchemy import select, func
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
@@ -21,22 +20,30 @@ import jwt
 from jwt.exceptions import InvalidTokenError
 import io
 from app.core.google_oauth import google_auth_callback
-from app.core.security import create_access_token
+from app.core.security import create_access_token, password_pool_busy
+from app.core.passwords import PasswordHasherBusyError, get_password_hasher, verify_password
 import httpx
 
-from database import engine, get_db_session
+from database import engine, get_db_session, AsyncSessionFactory
+from app.db.session import WriterSessionFactory, writer_engine
 from app.models import voice_records, users, create_tables, User
 from app.core.config import settings
 from app.services.transcription import transcribe_audio
+from app.services.audio_stream import open_recording, stream_response
+from app.services.principal_cache import get_principal, principal_cache
+from app.services.pagination import (
+    COUNT_CACHED, COUNT_MODES, InvalidCursorError, count_cache, count_rows, decode_cursor, encode_cursor,
+    keyset_after, keyset_order
+)
+from app.services.transcription_backends import close_transcription_backend
+from app.services.write_batcher import close_write_batcher
 from app import create_app
 from app.services.websocket_service import WebSocketService
 from app.core.logging import logger
+from app.api.routes import get_metrics_endpoint
 
 # --- Configuration & Setup ---
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-if not openai.api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
 
 # Constants
 CHUNKS_COUNT_NEED_FOR_TRANSCRIPTION = 3  # Number of chunks to process for transcription
@@ -74,6 +81,13 @@ async def startup_event():
     await create_tables(engine) # Create DB tables if they don't exist
     logger.info("Database tables checked/created.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("Shutting down...")
+    await close_transcription_backend()  # Release pooled API connections or worker processes
+    await close_write_batcher()  # Commit the chunks and transcripts still queued
+    await writer_engine.dispose()
+
 # Add after the imports
 class LoginRequest(BaseModel):
     username: str
@@ -114,9 +128,7 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
     except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    query = select(users).where(users.c.username == username)
-    result = await db.execute(query)
-    user = result.fetchone()
+    user = await get_principal(db, username)
     
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
@@ -142,22 +154,11 @@ async def verify_user(username: str, password: str, db: AsyncSession):
     print(f".......Stored hash: {user.password_hash}")
     print(f".......Input password: {password}")
     
-    # Convert password to bytes for bcrypt
-    password_bytes = password.strip().encode('utf-8')
-    stored_hash_bytes = user.password_hash.encode('utf-8')
-    
-    print(f".......Password bytes: {password_bytes}")
-    print(f".......Stored hash bytes: {stored_hash_bytes}")
     print(f".......Stored hash type: {type(user.password_hash)}")
     print(f".......Stored hash length: {len(user.password_hash)}")
     
     try:
-        # First, try to hash the input password to ensure it's in the correct format
-        hashed_input = hash_password(password)
-        print(f".......Hashed input password: {hashed_input}")
-        
-        # Then compare the hashes
-        is_valid = bcrypt.checkpw(password_bytes, stored_hash_bytes)
+        is_valid = await verify_password(password, user.password_hash)
         print(f".......Password check result: {is_valid}")
         
         if not is_valid:
@@ -169,6 +170,9 @@ async def verify_user(username: str, password: str, db: AsyncSession):
             
         return user
         
+    except PasswordHasherBusyError as e:
+        logger.warning(f"Refusing login of {username}: {e}")
+        raise password_pool_busy()
     except Exception as e:
         print(f".......Error during password check: {str(e)}")
         print(f".......Error type: {type(e)}")
@@ -218,13 +222,14 @@ active_connections: dict[str, WebSocket] = {}
 
 # --- WebSocket Endpoint ---
 @app.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str, db: AsyncSession = Depends(get_db_session)):
+async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """Handles WebSocket connections for audio recording with real-time transcription."""
     logger.info(f"New WebSocket connection request for session: {session_id}")
     
     try:
         # Create WebSocket service instance
-        websocket_service = WebSocketService(db)
+        # Writes use short sessions from the ingest pool, not one held for the whole recording
+        websocket_service = WebSocketService(WriterSessionFactory)
         
         # Handle the connection
         await websocket_service.handle_connection(websocket, session_id)
@@ -252,6 +257,8 @@ async def get_transcriptions(
     page: int = 1,
     per_page: int = 10,
     time_filter: str = "all",
+    cursor: Optional[str] = None,
+    count: str = COUNT_CACHED,
     db: AsyncSession = Depends(get_db_session),
     current_user = Depends(verify_token)
 ):
@@ -259,10 +266,16 @@ async def get_transcriptions(
     Get paginated transcriptions for the current user with optional time filtering.
     If the user is an admin, returns all transcriptions.
     
+    Rows are ordered newest first by (created_at, id). Pass the next_cursor of a
+    response as cursor to get the following page by keyset instead of OFFSET;
+    page is then ignored.
+    
     Args:
         page: Page number (1-based)
         per_page: Number of items per page
         time_filter: Filter by time period ('all', 'today', 'week', 'month')
+        cursor: Position to continue from, as returned in next_cursor
+        count: How the total is computed ('cached', 'exact', 'estimate', 'none')
         db: Database session
         current_user: Current authenticated user
         
@@ -276,22 +289,33 @@ async def get_transcriptions(
         per_page = 10
     if per_page > 100:  # Limit maximum items per page
         per_page = 100
-    
-    # Calculate offset for pagination
-    offset = (page - 1) * per_page
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of {', '.join(sorted(COUNT_MODES))}")
     
     # Base query
-    query = select(voice_records, users.c.username).join(users, voice_records.c.user_id == users.c.id)
+    # Metadata columns only: audio_byte is never read for a listing. Rows the
+    # backfill has not reached yet get their size from length(), which PostgreSQL
+    # answers from the TOAST header without loading the blob.
+    query = select(
+        voice_records.c.id,
+        voice_records.c.transcript,
+        func.coalesce(voice_records.c.audio_size, func.length(voice_records.c.audio_byte)).label("audio_size"),
+        voice_records.c.audio_duration_ms,
+        voice_records.c.audio_codec,
+        voice_records.c.created_at,
+        voice_records.c.client_type,
+        voice_records.c.user_id,
+        users.c.username
+    ).join(users, voice_records.c.user_id == users.c.id)
     
     # Check if user is admin
     if current_user.role == 'admin':
         logger.info(f"Admin {current_user.username} accessing all transcriptions")
+        scope = None
     else:
         # For non-admin users, filter by user_id
-        try:
-            query = query.where(voice_records.c.user_id == current_user.id)
-        except AttributeError:
-            logger.warning("user_id column not found in voice_records table. Returning all transcriptions.")
+        query = query.where(voice_records.c.user_id == current_user.id)
+        scope = current_user.id
     
     # Apply time filter
     now = datetime.utcnow()
@@ -313,34 +337,49 @@ async def get_transcriptions(
     else:
         logger.info("No time filter applied")
     
-    # Get total count after applying filters
-    count_query = select(func.count()).select_from(query.subquery())
-    total_count_result = await db.execute(count_query)
-    total_count = total_count_result.scalar()
+    # Total after applying filters; exact only when asked for
+    total_count = await count_rows(db, query, count, scope, time_filter)
+    total_pages = (total_count + per_page - 1) // per_page if total_count is not None else None
     
-    # Calculate total pages
-    total_pages = (total_count + per_page - 1) // per_page
+    query = query.order_by(*keyset_order(voice_records.c.created_at, voice_records.c.id))
+    if cursor:
+        # Keyset: continue after the last row of the previous page
+        try:
+            last_created_at, last_id, start_row = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(keyset_after(voice_records.c.created_at, voice_records.c.id, last_created_at, last_id))
+        page = (start_row - 1) // per_page + 1
+    else:
+        start_row = (page - 1) * per_page + 1
+        query = query.offset(start_row - 1)
     
-    # Get paginated results
-    query = query.order_by(voice_records.c.id.desc()).offset(offset).limit(per_page)
-    result = await db.execute(query)
+    # One extra row tells whether there is a next page
+    result = await db.execute(query.limit(per_page + 1))
     transcriptions = result.fetchall()
+    has_more = len(transcriptions) > per_page
+    transcriptions = transcriptions[:per_page]
     
-    # Calculate row numbers (1-based)
-    start_row = offset + 1
     items = []
     for i, transcription in enumerate(transcriptions):
         items.append({
             "id": transcription.id,
             "transcript": transcription.transcript,
-            "file_size": format_file_size(len(transcription.audio_byte)) if transcription.audio_byte else "0 B",
+            "file_size": format_file_size(transcription.audio_size or 0),
+            "duration_ms": transcription.audio_duration_ms,
+            "codec": transcription.audio_codec,
             "created_at": transcription.created_at.isoformat() if transcription.created_at else None,
             "row_number": start_row + i,
             "client_type": transcription.client_type,
-            "user_id": transcription.user_id if hasattr(transcription, 'user_id') else None,
+            "user_id": transcription.user_id,
             "username": transcription.username
         })
     
+    next_cursor = None
+    if has_more:
+        last = transcriptions[-1]
+        next_cursor = encode_cursor(last.created_at, last.id, start_row + len(transcriptions))
+    
     # Prepare response
     response = {
         "items": items,
@@ -348,7 +387,8 @@ async def get_transcriptions(
         "page": page,
         "per_page": per_page,
         "total_pages": total_pages,
-        "has_more": page < total_pages,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
         "is_admin": current_user.role == 'admin',
         "time_filter": time_filter
     }
@@ -379,6 +419,7 @@ async def delete_transcription(
         query = voice_records.delete().where(voice_records.c.id == transcription_id)
         await db.execute(query)
         await db.commit()
+        count_cache.invalidate()
         return {"message": "Transcription deleted successfully"}
     except Exception as e:
         await db.rollback()
@@ -396,6 +437,7 @@ async def delete_multiple_transcriptions(
         query = voice_records.delete().where(voice_records.c.id.in_(request.ids))
         await db.execute(query)
         await db.commit()
+        count_cache.invalidate()
         return {"message": "Transcriptions deleted successfully"}
     except Exception as e:
         await db.rollback()
@@ -405,32 +447,32 @@ async def delete_multiple_transcriptions(
 @app.get("/api/transcriptions/{transcription_id}/audio")
 async def get_transcription_audio(
     transcription_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db_session),
     user = Depends(verify_token)  # Use token verification instead of basic auth
 ):
-    """Get the audio chunk for a transcription."""
+    """Stream the audio of a transcription, honouring Range requests."""
     try:
-        query = select(voice_records.c.audio_byte).where(voice_records.c.id == transcription_id)
-        result = await db.execute(query)
-        record = result.fetchone()
+        recording = await open_recording(db, transcription_id, AsyncSessionFactory)
         
-        if not record:
+        if recording is None:
             raise HTTPException(status_code=404, detail="Transcription not found")
         
-        # Return the audio data with proper headers
-        return Response(
-            content=record.audio_byte,
-            media_type="audio/webm;codecs=opus",
-            headers={
-                "Content-Disposition": f"attachment; filename=transcription_{transcription_id}.webm",
-                "Accept-Ranges": "bytes",
-                "Cache-Control": "no-cache, no-store, must-revalidate"
-            }
+        return stream_response(
+            request,
+            recording,
+            "audio/webm;codecs=opus",
+            {"Content-Disposition": f"attachment; filename=transcription_{transcription_id}.webm"}
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching audio: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Served by the API router's handler, which this app does not mount
+app.add_api_route("/api/metrics", get_metrics_endpoint, methods=["GET"])
+
 @app.get("/test-logging")
 async def test_logging():
     """Test endpoint to verify logging is working."""
@@ -513,8 +555,8 @@ async def reset_password(reset_data: PasswordResetRequest, db: AsyncSession = De
                 detail="User not found"
             )
         
-        # Hash the new password
-        hashed_password = hash_password(reset_data.new_password)
+        # Hash the new password, off the event loop
+        hashed_password = await get_password_hasher().run(hash_password, reset_data.new_password)
         
         # Update the user's password
         update_query = users.update().where(users.c.username == reset_data.username).values(
@@ -522,8 +564,11 @@ async def reset_password(reset_data: PasswordResetRequest, db: AsyncSession = De
         )
         await db.execute(update_query)
         await db.commit()
+        principal_cache.invalidate(reset_data.username)
         
         return {"message": "Password reset successfully"}
+    except PasswordHasherBusyError:
+        raise password_pool_busy()
     except Exception as e:
         await db.rollback()
         logger.error(f"Error resetting password: {e}")
@@ -587,6 +632,7 @@ async def update_user_language(
         )
         await db.execute(update_query)
         await db.commit()
+        principal_cache.invalidate(current_user.username)
         
         return {"message": "Language updated successfully", "lang": language_data.lang}
     except Exception as e:
@@ -0,0 +1,39 @@
+"""
+Moves recordings from voice_records.audio_byte to the blob store in BLOB_STORE_DIR.
+
+Runs alongside the application and can be stopped and started again at any
+point; each recording is moved in its own transaction:
+
+    BLOB_STORE_DIR=/srv/audio python migrate_audio_to_blob_store.py [--batch-size N] [--gc]
+
+With --gc, blobs no recording refers to any more (deleted recordings) are
+removed afterwards.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.db.session import AsyncSessionFactory
+from app.services.blob_store import get_blob_store
+from app.services.recording import migrate_to_blob_store, collect_garbage
+
+logger = logging.getLogger(__name__)
+
+async def main(batch_size: int, gc: bool):
+    store = get_blob_store()
+    if store is None:
+        logger.error("BLOB_STORE_DIR is not set")
+        sys.exit(1)
+    async with AsyncSessionFactory() as db:
+        moved = await migrate_to_blob_store(db, store, batch_size=batch_size)
+        logger.info(f"Migration done: {moved} recordings moved to {store.root}")
+        if gc:
+            await collect_garbage(db, store)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move stored audio out of the database into the blob store")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows read per query")
+    parser.add_argument("--gc", action="store_true", help="Delete unreferenced blobs afterwards")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.gc))
@@ -18,6 +18,7 @@ from app.db.session import get_db_session
 from app.models import create_tables, metadata
 from app.core.security import hash_password
 from app.models.user import users
+from app.models.transcription import voice_records
 
 # Test database URL
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -70,12 +71,62 @@ async def setup_database():
     async with test_engine.begin() as conn:
         await conn.run_sync(metadata.drop_all)
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start each test with empty in-process caches; tables are recreated per test."""
+    import app.services.transcription_cache as transcription_cache
+    import app.services.rendition_cache as rendition_cache
+    from app.services.principal_cache import principal_cache
+    from app.services.pagination import count_cache
+
+    def reset():
+        transcription_cache._cache = None
+        rendition_cache._cache = None
+        principal_cache.invalidate()
+        count_cache.invalidate()
+
+    reset()
+    yield
+    reset()
+
 @pytest.fixture
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     """Create a fresh database session for a test."""
     async with TestSessionFactory() as session:
         yield session
 
+@pytest.fixture
+def session_factory():
+    """Session factory on the test database, for code that opens its own sessions."""
+    return TestSessionFactory
+
+@pytest.fixture
+def create_record(db_session: AsyncSession):
+    """Return a function that inserts a voice record and returns its id; values override the defaults."""
+    async def create(**values):
+        values.setdefault("session_id", "test-session")
+        values.setdefault("audio_byte", b"head")
+        values.setdefault("audio_size", len(values["audio_byte"]))
+        values.setdefault("transcript", "")
+        result = await db_session.execute(voice_records.insert().values(**values))
+        await db_session.commit()
+        return result.inserted_primary_key[0]
+    return create
+
+@pytest.fixture
+def tone_pcm():
+    """Return a function that builds PCM from (seconds, amplitude) segments of a 440 Hz tone."""
+    import numpy as np
+    from app.services.pcm import SAMPLE_RATE
+
+    def build(*segments):
+        parts = []
+        for seconds, amplitude in segments:
+            t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+            parts.append((amplitude * 32767 * np.sin(2 * np.pi * 440 * t)).astype('<i2'))
+        return np.concatenate(parts).tobytes()
+    return build
+
 @pytest.fixture
 async def test_user(db_session: AsyncSession):
     """Create a test user in the database."""
@@ -152,4 +203,4 @@ def test_admin_token(test_admin):
         expires_delta=access_token_expires
     )
     
-    return access_token 
\ No newline at end of file
+    return access_token
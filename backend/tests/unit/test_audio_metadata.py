@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from sqlalchemy import select
+
+from app.services.audio_metadata import (
+    parse_probe_output,
+    probe_audio,
+    store_audio_metadata,
+    backfill_audio_metadata
+)
+from app.services.ffmpeg import FFmpegError, FFmpegResult
+from app.services.recording import append_chunk
+from app.models.transcription import voice_records
+
+PROBE_STDERR = """Input #0, matroska,webm, from 'pipe:0':
+  Duration: N/A, start: 0.000000, bitrate: N/A
+  Stream #0:0(eng): Audio: opus, 48000 Hz, mono, fltp (default)
+Output #0, null, to 'pipe:':
+  Stream #0:0(eng): Audio: pcm_s16le, 48000 Hz, mono, s16, 768 kb/s (default)
+size=N/A time=00:00:04.02 bitrate=N/A speed= 402x
+size=N/A time=00:01:05.48 bitrate=N/A speed= 410x
+"""
+
+async def _metadata(db_session, record_id):
+    query = select(
+        voice_records.c.audio_size,
+        voice_records.c.audio_duration_ms,
+        voice_records.c.audio_codec
+    ).where(voice_records.c.id == record_id)
+    result = await db_session.execute(query)
+    return tuple(result.fetchone())
+
+def test_parse_probe_output():
+    """Test that the input codec and the last progress time are read."""
+    assert parse_probe_output(PROBE_STDERR) == (65480, "opus")
+
+def test_parse_probe_output_empty():
+    """Test that missing values come back as None."""
+    assert parse_probe_output("") == (None, None)
+
+@pytest.mark.asyncio
+async def test_probe_audio_unreadable():
+    """Test that audio ffmpeg cannot decode has no metadata rather than an error."""
+    with patch("app.services.audio_metadata.run_ffmpeg", AsyncMock(side_effect=FFmpegError("bad", 1, "Invalid data"))):
+        assert await probe_audio(b"garbage") == (None, None)
+
+@pytest.mark.asyncio
+async def test_store_audio_metadata(db_session, create_record):
+    """Test that probed metadata is stored on the recording."""
+    record_id = await create_record(audio_byte=b"audio")
+
+    with patch("app.services.audio_metadata.run_ffmpeg", AsyncMock(return_value=FFmpegResult(0, b"", PROBE_STDERR))):
+        await store_audio_metadata(db_session, record_id, b"audio-and-more")
+
+    assert await _metadata(db_session, record_id) == (len(b"audio-and-more"), 65480, "opus")
+
+@pytest.mark.asyncio
+async def test_backfill_audio_metadata(db_session, create_record):
+    """Test that existing rows get their size in SQL and their duration from a probe."""
+    # Rows written before audio_size was tracked
+    first = await create_record(audio_byte=b"first", audio_size=None)
+    second = await create_record(audio_byte=b"second", audio_size=None)
+    await append_chunk(db_session, second, 1, b"-chunk")
+    empty = await create_record(audio_byte=b"", audio_size=None)
+
+    probe = AsyncMock(return_value=(1500, "opus"))
+    with patch("app.services.audio_metadata.probe_audio", probe):
+        assert await backfill_audio_metadata(db_session, batch_size=2) == (3, 2)
+
+    assert await _metadata(db_session, first) == (5, 1500, "opus")
+    # Pending chunks are part of the probed audio
+    assert await _metadata(db_session, second) == (len(b"second-chunk"), 1500, "opus")
+    assert await _metadata(db_session, empty) == (0, None, None)
+
+    # A second run finds nothing left to do
+    with patch("app.services.audio_metadata.probe_audio", probe):
+        assert await backfill_audio_metadata(db_session) == (0, 0)
@@ -0,0 +1,124 @@
+import hashlib
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+from starlette.requests import Request
+
+from app.services.audio_stream import (
+    BytesSource,
+    RangeNotSatisfiableError,
+    open_recording,
+    parse_range,
+    stream_response
+)
+from app.services.blob_store import BlobStore
+from app.services.recording import append_chunk, finalize_recording
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+def _factory(db_session):
+    @asynccontextmanager
+    async def session():
+        yield db_session
+    return session
+
+async def _body(response) -> bytes:
+    return b"".join([piece async for piece in response.body_iterator])
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-3", (0, 4)),
+    ("bytes=4-", (4, 10)),
+    ("bytes=-3", (7, 10)),
+    ("bytes=-30", (0, 10)),
+    ("bytes=8-100", (8, 10)),
+    ("bytes=0-1,4-5", None),
+    ("bytes=5-2", None),
+    ("items=0-3", None),
+    ("bytes=abc", None)
+])
+def test_parse_range(header, expected):
+    """Test single ranges, suffix ranges and the headers that are ignored."""
+    assert parse_range(header, 10) == expected
+
+@pytest.mark.parametrize("header", ["bytes=10-", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    """Test that ranges selecting nothing are rejected."""
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, 10)
+
+@pytest.mark.asyncio
+async def test_range_response():
+    """Test that a Range request gets a 206 with only the requested bytes."""
+    source = BytesSource(b"0123456789")
+
+    with patch("app.services.audio_stream.settings.AUDIO_STREAM_CHUNK_BYTES", 3):
+        response = stream_response(_request(range="bytes=2-7"), source, "audio/webm", {})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == "bytes 2-7/10"
+        assert response.headers["content-length"] == "6"
+        assert await _body(response) == b"234567"
+
+@pytest.mark.asyncio
+async def test_if_range_mismatch_sends_everything():
+    """Test that a Range is ignored when If-Range names another version."""
+    source = BytesSource(b"0123456789")
+    assert source.etag == f'"{hashlib.sha256(b"0123456789").hexdigest()}"'
+
+    response = stream_response(_request(range="bytes=2-7", if_range='"old"'), source, "audio/webm", {})
+    assert response.status_code == 200
+    assert await _body(response) == b"0123456789"
+
+    response = stream_response(_request(range="bytes=2-7", if_range=source.etag), source, "audio/webm", {})
+    assert response.status_code == 206
+
+def test_not_modified_and_unsatisfiable():
+    """Test the 304 and 416 responses."""
+    source = BytesSource(b"0123456789")
+
+    assert stream_response(_request(if_none_match=source.etag), source, "audio/webm", {}).status_code == 304
+    response = stream_response(_request(range="bytes=20-"), source, "audio/webm", {})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+@pytest.mark.asyncio
+async def test_recording_source_spans_chunks(db_session, create_record):
+    """Test that a range across audio_byte and pending chunks is read piecewise from the database."""
+    record_id = await create_record()
+    await append_chunk(db_session, record_id, 1, b"-one")
+    await append_chunk(db_session, record_id, 2, b"-two")
+
+    recording = await open_recording(db_session, record_id, _factory(db_session))
+
+    assert recording.size == len(b"head-one-two")
+    # Still receiving chunks, so no validator
+    assert recording.etag is None
+    with patch("app.services.audio_stream.settings.AUDIO_STREAM_CHUNK_BYTES", 3):
+        assert b"".join([piece async for piece in recording.read(2, 10)]) == b"ad-one-t"
+
+@pytest.mark.asyncio
+async def test_recording_source_from_blob_store(db_session, tmp_path, create_record):
+    """Test that a finalized recording in the blob store is streamed with its hash as ETag."""
+    store = BlobStore(str(tmp_path))
+    record_id = await create_record()
+    await append_chunk(db_session, record_id, 1, b"-one")
+
+    with patch("app.services.recording.get_blob_store", return_value=store), \
+         patch("app.services.audio_stream.get_blob_store", return_value=store):
+        await finalize_recording(db_session, record_id)
+        recording = await open_recording(db_session, record_id, _factory(db_session))
+        response = stream_response(_request(range="bytes=-3"), recording, "audio/webm", {})
+
+        assert recording.etag == f'"{hashlib.sha256(b"head-one").hexdigest()}"'
+        assert response.status_code == 206
+        assert await _body(response) == b"one"
+
+@pytest.mark.asyncio
+async def test_open_recording_nonexistent(db_session):
+    """Test that an unknown recording has no source."""
+    assert await open_recording(db_session, 999, _factory(db_session)) is None
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select
+
+from app.services.blob_store import BlobStore, BlobNotFoundError
+from app.services.recording import (
+    append_chunk,
+    load_recording_audio,
+    finalize_recording,
+    migrate_to_blob_store,
+    collect_garbage
+)
+from app.models.transcription import voice_records
+
+async def _stored(db_session, record_id):
+    query = select(voice_records.c.audio_byte, voice_records.c.audio_ref).where(voice_records.c.id == record_id)
+    result = await db_session.execute(query)
+    return result.fetchone()
+
+def test_put_and_read(tmp_path):
+    """Test that blobs are named by their SHA-256 and sharded by its first bytes."""
+    store = BlobStore(str(tmp_path))
+
+    ref = store.put(b"audio data")
+
+    assert ref == hashlib.sha256(b"audio data").hexdigest()
+    assert store.path(ref) == os.path.join(str(tmp_path), ref[:2], ref[2:4], ref)
+    assert store.read(ref) == b"audio data"
+    assert store.size(ref) == len(b"audio data")
+    with store.open(ref) as blob:
+        assert blob[6:] == b"data"
+
+def test_put_deduplicates(tmp_path):
+    """Test that identical content is stored once."""
+    store = BlobStore(str(tmp_path))
+
+    assert store.put(b"same") == store.put(b"same")
+    assert list(store.refs()) == [hashlib.sha256(b"same").hexdigest()]
+
+def test_empty_blob(tmp_path):
+    """Test that an empty blob can be stored and read back."""
+    store = BlobStore(str(tmp_path))
+
+    assert store.read(store.put(b"")) == b""
+
+def test_missing_blob(tmp_path):
+    """Test that reading an unknown reference raises BlobNotFoundError."""
+    store = BlobStore(str(tmp_path))
+
+    with pytest.raises(BlobNotFoundError):
+        store.read("0" * 64)
+
+@pytest.mark.asyncio
+async def test_finalize_into_blob_store(db_session, tmp_path, create_record):
+    """Test that finalizing writes the recording to the store and clears audio_byte."""
+    store = BlobStore(str(tmp_path))
+    record_id = await create_record()
+    await append_chunk(db_session, record_id, 1, b"-one")
+
+    with patch("app.services.recording.get_blob_store", return_value=store):
+        assert await finalize_recording(db_session, record_id) == b"head-one"
+        record = await _stored(db_session, record_id)
+        assert record.audio_byte is None
+        assert store.read(record.audio_ref) == b"head-one"
+
+        # Chunks arriving later are appended to the stored audio
+        await append_chunk(db_session, record_id, 2, b"-two")
+        assert await load_recording_audio(db_session, record_id) == b"head-one-two"
+        assert await finalize_recording(db_session, record_id) == b"head-one-two"
+
+@pytest.mark.asyncio
+async def test_migrate_to_blob_store(db_session, tmp_path, create_record):
+    """Test that stored recordings are moved and open sessions are left alone."""
+    store = BlobStore(str(tmp_path))
+    first = await create_record(audio_byte=b"same audio")
+    second = await create_record(audio_byte=b"same audio")
+    live = await create_record(audio_byte=b"live")
+    await append_chunk(db_session, live, 1, b"-chunk")
+
+    assert await migrate_to_blob_store(db_session, store, batch_size=1) == 2
+
+    first_record = await _stored(db_session, first)
+    second_record = await _stored(db_session, second)
+    assert first_record.audio_byte is None
+    assert first_record.audio_ref == second_record.audio_ref
+    assert len(list(store.refs())) == 1
+    assert (await _stored(db_session, live)).audio_byte == b"live"
+
+    with patch("app.services.recording.get_blob_store", return_value=store):
+        assert await load_recording_audio(db_session, first) == b"same audio"
+
+@pytest.mark.asyncio
+async def test_collect_garbage(db_session, tmp_path, create_record):
+    """Test that only old, unreferenced blobs are deleted."""
+    store = BlobStore(str(tmp_path))
+    record_id = await create_record(audio_byte=b"kept")
+    await migrate_to_blob_store(db_session, store)
+    orphan = store.put(b"orphan")
+    recent = store.put(b"recent")
+    os.utime(store.path(orphan), (0, 0))
+    os.utime(store.path((await _stored(db_session, record_id)).audio_ref), (0, 0))
+
+    assert await collect_garbage(db_session, store) == (1, 1)
+
+    assert not os.path.exists(store.path(orphan))
+    assert os.path.exists(store.path(recent))
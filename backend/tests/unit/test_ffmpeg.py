@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from unittest.mock import patch
+
+from app.core.metrics import metrics
+from app.services.ffmpeg import run_ffmpeg, transcode, FFmpegError, FFmpegTimeoutError
+
+FAKE_FFMPEG = """#!{python}
+# Copies the -i input to the output path, reading and writing pipes or files like ffmpeg
+import sys
+args = sys.argv[1:]
+source, target = args[args.index('-i') + 1], args[-1]
+if source == 'missing':
+    sys.exit(1)
+data = sys.stdin.buffer.read() if source == 'pipe:0' else open(source, 'rb').read()
+if target == 'pipe:1':
+    sys.stdout.buffer.write(data)
+else:
+    with open(target, 'wb') as f:
+        f.write(b'seekable:' + data)
+"""
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Point FFMPEG_BINARY at a script that copies input to output."""
+    script = tmp_path / "fake-ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    script.chmod(0o755)
+    with patch("app.services.ffmpeg.settings.FFMPEG_BINARY", str(script)):
+        yield
+
+@pytest.mark.asyncio
+async def test_transcode_through_pipes(fake_ffmpeg):
+    """Test that by default input and output go through stdin and stdout."""
+    assert await transcode(b"audio", ['-f', 'wav']) == b"audio"
+
+@pytest.mark.asyncio
+async def test_transcode_seekable_buffers(fake_ffmpeg):
+    """Test that seekable input and output are readable and writable by the process."""
+    output = await transcode(b"audio", ['-f', 'mp4'], seekable_input=True, seekable_output=True)
+
+    assert output == b"seekable:audio"
+
+@pytest.mark.asyncio
+async def test_transcode_scratch_fallback(fake_ffmpeg, tmp_path):
+    """Test the tmpfs scratch fallback when memfd is unavailable, and that it is counted."""
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    before = metrics.snapshot()["counters"].get("ffmpeg.scratch_fallbacks", 0)
+
+    with patch("app.services.ffmpeg.os.memfd_create", side_effect=OSError), \
+         patch("app.services.ffmpeg.settings.TRANSCODE_SCRATCH_DIR", str(scratch)):
+        output = await transcode(b"audio", ['-f', 'mp4'], seekable_output=True)
+
+    assert output == b"seekable:audio"
+    assert metrics.snapshot()["counters"]["ffmpeg.scratch_fallbacks"] == before + 1
+    assert list(scratch.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_transcode_failure_raises(fake_ffmpeg):
+    """Test that a failing process raises FFmpegError."""
+    with patch("app.services.ffmpeg.settings.FFMPEG_BINARY", "/bin/false"):
+        with pytest.raises(FFmpegError):
+            await transcode(b"audio", ['-f', 'wav'])
+
+def _script(tmp_path, body):
+    """Install a Python script as FFMPEG_BINARY; the caller patches it in."""
+    script = tmp_path / "script-ffmpeg"
+    script.write_text(f"#!{sys.executable}\nimport os, sys, time\n{body}")
+    script.chmod(0o755)
+    return str(script)
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_nonzero_exit(tmp_path):
+    """Test that a non-zero exit raises with its code and stderr, unless check is off."""
+    binary = _script(tmp_path, "sys.stderr.write('boom')\nsys.exit(3)\n")
+
+    with patch("app.services.ffmpeg.settings.FFMPEG_BINARY", binary):
+        with pytest.raises(FFmpegError) as excinfo:
+            await run_ffmpeg([])
+        result = await run_ffmpeg([], check=False)
+
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.stderr == "boom"
+    assert result.returncode == 3
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_missing_binary(tmp_path):
+    """Test that a binary that cannot be started raises FFmpegError."""
+    with patch("app.services.ffmpeg.settings.FFMPEG_BINARY", str(tmp_path / "no-ffmpeg")):
+        with pytest.raises(FFmpegError):
+            await run_ffmpeg([])
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_timeout_kills_process(tmp_path):
+    """Test that a process past its timeout is killed and FFmpegTimeoutError raised."""
+    pid_file = tmp_path / "pid"
+    binary = _script(tmp_path, f"open({str(pid_file)!r}, 'w').write(str(os.getpid()))\ntime.sleep(30)\n")
+
+    with patch("app.services.ffmpeg.settings.FFMPEG_BINARY", binary):
+        with pytest.raises(FFmpegTimeoutError):
+            await run_ffmpeg([], timeout=1)
+
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+@pytest.mark.asyncio
+async def test_run_ffmpeg_concurrency_is_bounded(tmp_path):
+    """Test that no more than FFMPEG_MAX_CONCURRENCY processes run at once."""
+    running = tmp_path / "running"
+    # Fails if another copy is running at the same time
+    binary = _script(tmp_path, f"os.mkdir({str(running)!r})\ntime.sleep(0.2)\nos.rmdir({str(running)!r})\n")
+
+    with patch("app.services.ffmpeg.settings.FFMPEG_BINARY", binary), \
+         patch("app.services.ffmpeg.settings.FFMPEG_MAX_CONCURRENCY", 1), \
+         patch("app.services.ffmpeg._semaphore", None):
+        results = await asyncio.gather(*(run_ffmpeg([]) for _ in range(3)))
+
+    assert [result.returncode for result in results] == [0, 0, 0]
@@ -0,0 +1,54 @@
+import struct
+import pytest
+
+from app.services.fmp4 import FragmentedMP4Parser, MP4ParseError
+
+def _box(box_type: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+FTYP = _box(b'ftyp', b'iso5\x00\x00\x02\x00')
+MOOV = _box(b'moov', _box(b'mvhd', bytes(20)))
+FRAGMENT_1 = _box(b'moof', _box(b'mfhd', b'\x00\x00\x00\x00\x00\x00\x00\x01')) + _box(b'mdat', b'audio-1')
+FRAGMENT_2 = _box(b'moof', _box(b'mfhd', b'\x00\x00\x00\x00\x00\x00\x00\x02')) + _box(b'mdat', b'audio-2')
+
+def test_first_chunk_captures_init_segment():
+    """Test that ftyp and moov are kept as the init segment."""
+    parser = FragmentedMP4Parser()
+
+    fragments = parser.feed(FTYP + MOOV + FRAGMENT_1)
+
+    assert parser.ready
+    assert parser.init_segment == FTYP + MOOV
+    assert fragments == FRAGMENT_1
+
+def test_later_fragment_becomes_standalone_file():
+    """Test that a later fragment is prefixed with the init segment."""
+    parser = FragmentedMP4Parser()
+    parser.feed(FTYP + MOOV + FRAGMENT_1)
+
+    fragments = parser.feed(FRAGMENT_2)
+
+    assert parser.standalone(fragments) == FTYP + MOOV + FRAGMENT_2
+
+def test_box_split_across_chunks_is_held_back():
+    """Test that a box cut at a chunk boundary is returned once complete."""
+    parser = FragmentedMP4Parser()
+    parser.feed(FTYP + MOOV)
+
+    assert parser.feed(FRAGMENT_2[:10]) == b""
+    assert parser.feed(FRAGMENT_2[10:]) == FRAGMENT_2
+
+def test_free_boxes_are_dropped():
+    """Test that free/skip boxes carry no media and are dropped."""
+    parser = FragmentedMP4Parser()
+
+    fragments = parser.feed(FTYP + _box(b'free', b'xx') + MOOV + FRAGMENT_1)
+
+    assert fragments == FRAGMENT_1
+
+def test_invalid_stream_raises():
+    """Test that a non-MP4 stream raises a parse error."""
+    parser = FragmentedMP4Parser()
+
+    with pytest.raises(MP4ParseError):
+        parser.feed(b'\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81')
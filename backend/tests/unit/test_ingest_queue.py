@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+
+from app.services.ingest_queue import ChunkQueue, COALESCE, DROP_PREVIEW
+
+@pytest.mark.asyncio
+async def test_queue_preserves_order_and_drains_after_close():
+    """Test that chunks come out in order and the queue drains after close."""
+    queue = ChunkQueue(maxsize=4)
+    for chunk in (b"a", b"b", b"c"):
+        await queue.put(chunk)
+    await queue.close()
+
+    assert [await queue.get() for _ in range(4)] == [b"a", b"b", b"c", None]
+
+@pytest.mark.asyncio
+async def test_full_queue_blocks_receiver_until_space():
+    """Test that put waits for the worker when the queue is full."""
+    queue = ChunkQueue(maxsize=1, policy=DROP_PREVIEW)
+    await queue.put(b"a")
+
+    put_task = asyncio.create_task(queue.put(b"b"))
+    await asyncio.sleep(0)
+    assert not put_task.done()
+
+    assert await queue.get() == b"a"
+    await put_task
+    assert await queue.get() == b"b"
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_into_last_chunk():
+    """Test that a full coalescing queue appends to the last queued chunk."""
+    queue = ChunkQueue(maxsize=2, policy=COALESCE)
+    for chunk in (b"a", b"b", b"c", b"d"):
+        await queue.put(chunk)
+
+    assert queue.qsize() == 2
+    assert queue.coalesced == 2
+    assert await queue.get() == b"a"
+    assert await queue.get() == b"bcd"
+
+def test_unknown_policy_raises():
+    """Test that an unknown backpressure policy is rejected."""
+    with pytest.raises(ValueError):
+        ChunkQueue(maxsize=1, policy="drop_everything")
@@ -0,0 +1,172 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock
+from sqlalchemy import select, update
+
+from app.services.jobs import (
+    enqueue_transcription_job,
+    schedule_job_now,
+    postpone_job,
+    claim_job,
+    complete_job,
+    fail_job,
+    run_final_pass,
+    TranscriptionJobError,
+    QUEUED,
+    RUNNING,
+    DONE,
+    FAILED
+)
+from app.services.recording import append_chunk
+from app.models.transcription import voice_records, voice_chunks, transcription_jobs
+
+async def _job(db_session, job_id):
+    result = await db_session.execute(select(transcription_jobs).where(transcription_jobs.c.id == job_id))
+    return result.fetchone()
+
+@pytest.mark.asyncio
+async def test_claim_job(db_session, create_record):
+    """Test that a due job is claimed once and marked running."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id)
+
+    job = await claim_job(db_session)
+
+    assert job.id == job_id
+    assert job.status == RUNNING
+    assert job.attempts == 1
+    assert job.locked_until > datetime.utcnow()
+    assert await claim_job(db_session) is None
+
+@pytest.mark.asyncio
+async def test_delayed_job_is_not_claimed_until_scheduled(db_session, create_record):
+    """Test that a delayed job waits until it is made due."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id, delay_seconds=3600)
+
+    assert await claim_job(db_session) is None
+
+    await schedule_job_now(db_session, job_id)
+    job = await claim_job(db_session)
+
+    assert job.id == job_id
+
+@pytest.mark.asyncio
+async def test_schedule_job_now_leaves_running_job(db_session, create_record):
+    """Test that a job a worker is running is not handed to another one."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id)
+    await claim_job(db_session)
+
+    await schedule_job_now(db_session, job_id)
+
+    job = await _job(db_session, job_id)
+    assert job.status == RUNNING
+    assert job.attempts == 1
+    assert await claim_job(db_session) is None
+
+@pytest.mark.asyncio
+async def test_postpone_job(db_session, create_record):
+    """Test that a queued job is pushed back and a running one left alone."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id, delay_seconds=60)
+
+    await postpone_job(db_session, job_id, 3600)
+    assert (await _job(db_session, job_id)).run_after > datetime.utcnow() + timedelta(seconds=3000)
+
+    await schedule_job_now(db_session, job_id)
+    await claim_job(db_session)
+    await postpone_job(db_session, job_id, 3600)
+    assert (await _job(db_session, job_id)).run_after <= datetime.utcnow()
+
+@pytest.mark.asyncio
+async def test_abandoned_job_is_claimed_again(db_session, create_record):
+    """Test that a running job past its visibility timeout is handed out again."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id)
+    await claim_job(db_session)
+
+    await db_session.execute(
+        update(transcription_jobs)
+        .where(transcription_jobs.c.id == job_id)
+        .values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+    )
+    await db_session.commit()
+    job = await claim_job(db_session)
+
+    assert job.id == job_id
+    assert job.attempts == 2
+
+@pytest.mark.asyncio
+async def test_fail_job_retries_with_backoff_then_gives_up(db_session, create_record):
+    """Test that failures are retried later and the job fails after the last attempt."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id)
+
+    with patch("app.services.jobs.settings.JOB_MAX_ATTEMPTS", 2), \
+         patch("app.services.jobs.retry_delay", return_value=60):
+        job = await claim_job(db_session)
+        await fail_job(db_session, job, "boom")
+
+        job = await _job(db_session, job_id)
+        assert job.status == QUEUED
+        assert job.last_error == "boom"
+        assert job.run_after > datetime.utcnow() + timedelta(seconds=30)
+        assert await claim_job(db_session) is None
+
+        # Let the backoff pass
+        await db_session.execute(
+            update(transcription_jobs)
+            .where(transcription_jobs.c.id == job_id)
+            .values(run_after=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+        job = await claim_job(db_session)
+        assert job.attempts == 2
+        await fail_job(db_session, job, "boom again")
+
+    job = await _job(db_session, job_id)
+    assert job.status == FAILED
+    assert job.last_error == "boom again"
+
+@pytest.mark.asyncio
+async def test_complete_job(db_session, create_record):
+    """Test that a completed job is not claimed again."""
+    record_id = await create_record()
+    job_id = await enqueue_transcription_job(db_session, record_id)
+    await claim_job(db_session)
+
+    await complete_job(db_session, job_id)
+
+    assert (await _job(db_session, job_id)).status == DONE
+    assert await claim_job(db_session) is None
+
+@pytest.mark.asyncio
+async def test_run_final_pass(db_session, create_record):
+    """Test that the final pass transcribes the whole recording and replaces the transcript."""
+    record_id = await create_record(transcript="live transcript")
+    await append_chunk(db_session, record_id, 1, b"-one")
+
+    with patch("app.services.jobs.settings.LONG_AUDIO_ENABLED", False), \
+         patch("app.services.jobs.store_audio_metadata", AsyncMock()) as store_metadata, \
+         patch("app.services.jobs.transcribe_audio", AsyncMock(return_value="full transcript")) as transcribe:
+        await run_final_pass(db_session, record_id)
+
+    assert transcribe.call_args[0][0] == b"head-one"
+    # The session never stored the metadata, so the job does
+    store_metadata.assert_awaited_once_with(db_session, record_id, b"head-one")
+    result = await db_session.execute(select(voice_records.c.transcript).where(voice_records.c.id == record_id))
+    assert result.scalar() == "full transcript"
+    result = await db_session.execute(select(voice_chunks).where(voice_chunks.c.record_id == record_id))
+    assert result.fetchall() == []
+
+@pytest.mark.asyncio
+async def test_run_final_pass_failure_raises(db_session, create_record):
+    """Test that a failed transcription raises so the job is retried."""
+    record_id = await create_record()
+
+    with patch("app.services.jobs.settings.LONG_AUDIO_ENABLED", False), \
+         patch("app.services.jobs.store_audio_metadata", AsyncMock()), \
+         patch("app.services.jobs.transcribe_audio", AsyncMock(return_value=None)):
+        with pytest.raises(TranscriptionJobError):
+            await run_final_pass(db_session, record_id)
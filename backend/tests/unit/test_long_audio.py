@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.services.long_audio import split_at_silence, stitch, transcribe_long_audio, transcribe_segments, TranscriptSegment
+from app.services.pcm import BYTES_PER_SECOND
+
+def test_split_lands_in_pause(tone_pcm):
+    """Test that a cut moves from the target duration into a nearby pause."""
+    pcm = tone_pcm((55, 0.5), (2, 0.0), (30, 0.5))
+
+    spans = split_at_silence(pcm, target_seconds=60, search_seconds=10)
+
+    assert len(spans) == 2
+    assert 55 * BYTES_PER_SECOND <= spans[0][1] <= 57 * BYTES_PER_SECOND
+    assert spans[0][0] == 0
+    assert spans[0][1] == spans[1][0]
+    assert spans[1][1] == len(pcm)
+
+def test_short_audio_is_one_segment(tone_pcm):
+    """Test that audio shorter than a segment is not split."""
+    pcm = tone_pcm((5, 0.5))
+
+    assert split_at_silence(pcm, target_seconds=60, search_seconds=10) == [(0, len(pcm))]
+
+def test_stitch_with_timestamps():
+    """Test that texts are joined in order with their start offsets."""
+    segments = [
+        TranscriptSegment(0, 65, " Hello there. "),
+        TranscriptSegment(65.5, 130, ""),
+        TranscriptSegment(3725, 3790, "Goodbye.")
+    ]
+
+    assert stitch(segments) == "[00:00:00] Hello there.\n[01:02:05] Goodbye."
+    assert stitch(segments, timestamps=False) == "Hello there. Goodbye."
+
+@pytest.mark.asyncio
+async def test_transcribe_segments_keeps_order(tone_pcm):
+    """Test that segments are transcribed concurrently and returned in order."""
+    pcm = tone_pcm((55, 0.5), (2, 0.0), (30, 0.5))
+    transcribe = AsyncMock(side_effect=["first", "second"])
+
+    with patch("app.services.long_audio.transcribe_audio", transcribe):
+        segments = await transcribe_segments(pcm)
+
+    assert [segment.text for segment in segments] == ["first", "second"]
+    assert segments[0].start == 0
+    assert segments[1].start == segments[0].end
+    assert all(call.kwargs["filename"] == "audio.wav" for call in transcribe.call_args_list)
+
+@pytest.mark.asyncio
+async def test_transcribe_segments_failure(tone_pcm):
+    """Test that one failed segment fails the whole transcription."""
+    pcm = tone_pcm((55, 0.5), (2, 0.0), (30, 0.5))
+
+    with patch("app.services.long_audio.transcribe_audio", AsyncMock(side_effect=["first", None])):
+        assert await transcribe_segments(pcm) is None
+
+@pytest.mark.asyncio
+async def test_short_recording_is_not_decoded():
+    """Test that a recording known to be short is sent whole without decoding it."""
+    decode = AsyncMock()
+    transcribe = AsyncMock(return_value="whole")
+
+    with patch("app.services.long_audio.decode_to_pcm", decode), \
+         patch("app.services.long_audio.transcribe_audio", transcribe):
+        assert await transcribe_long_audio(b"audio", duration_ms=5000) == "whole"
+
+    decode.assert_not_awaited()
+    assert transcribe.call_args[0][0] == b"audio"
@@ -0,0 +1,128 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import select
+
+from app.services.pagination import (
+    CountCache,
+    InvalidCursorError,
+    count_cache,
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+    explain_statement,
+    keyset_after,
+    keyset_order,
+    COUNT_CACHED,
+    COUNT_ESTIMATE,
+    COUNT_EXACT,
+    COUNT_NONE
+)
+from app.models.transcription import voice_records
+
+async def _create_records(db_session, user_id, count):
+    for i in range(count):
+        await db_session.execute(voice_records.insert().values(
+            user_id=user_id,
+            audio_byte=b"audio",
+            transcript=f"transcript {i}",
+            created_at=datetime(2024, 1, 1, 12, 0, i),
+            client_type="web"
+        ))
+    await db_session.commit()
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes to the position it was made from."""
+    created_at = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    cursor = encode_cursor(created_at, 42, 11)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42, 11)
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(None, 1, 2)[:-3]])
+def test_decode_invalid_cursor(cursor):
+    """Test that malformed cursors are rejected with InvalidCursorError."""
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+def test_explain_statement_binds_values():
+    """Test that the PostgreSQL EXPLAIN of a date-filtered listing keeps its values as parameters."""
+    since = datetime(2024, 1, 1)
+    query = select(voice_records.c.id).where(voice_records.c.user_id == 1).where(voice_records.c.created_at >= since)
+
+    sql, params = explain_statement(query)
+
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "2024" not in sql
+    assert sorted(params.values(), key=str) == sorted([1, since], key=str)
+    for name in params:
+        assert f":{name}" in sql
+
+def test_count_cache_expires():
+    """Test that cached totals are dropped after the TTL."""
+    cache = CountCache(ttl=10)
+    with patch("app.services.pagination.time.monotonic", return_value=100.0):
+        cache.set(1, "all", 5)
+    with patch("app.services.pagination.time.monotonic", return_value=105.0):
+        assert cache.get(1, "all") == 5
+        assert cache.get(1, "week") is None
+    with patch("app.services.pagination.time.monotonic", return_value=111.0):
+        assert cache.get(1, "all") is None
+
+def test_count_cache_invalidate_user():
+    """Test that invalidating a user drops their totals and the all-users totals only."""
+    cache = CountCache(ttl=60)
+    cache.set(1, "all", 5)
+    cache.set(2, "all", 7)
+    cache.set(None, "all", 12)
+
+    cache.invalidate(1)
+
+    assert cache.get(1, "all") is None
+    assert cache.get(None, "all") is None
+    assert cache.get(2, "all") == 7
+
+@pytest.mark.asyncio
+async def test_count_rows_modes(db_session):
+    """Test the exact, cached and disabled totals of a listing."""
+    await _create_records(db_session, 1, 3)
+    query = select(voice_records).where(voice_records.c.user_id == 1)
+
+    assert await count_rows(db_session, query, COUNT_NONE, 1, "all") is None
+    assert await count_rows(db_session, query, COUNT_EXACT, 1, "all") == 3
+    # Estimates fall back to an exact count outside PostgreSQL
+    assert await count_rows(db_session, query, COUNT_ESTIMATE, 1, "all") == 3
+
+    assert await count_rows(db_session, query, COUNT_CACHED, 1, "all") == 3
+    await _create_records(db_session, 1, 1)
+    assert await count_rows(db_session, query, COUNT_CACHED, 1, "all") == 3
+
+    count_cache.invalidate(1)
+    assert await count_rows(db_session, query, COUNT_CACHED, 1, "all") == 4
+
+@pytest.mark.asyncio
+async def test_keyset_pages_past_null_created_at(db_session):
+    """Test that keyset pages continue past rows without a created_at."""
+    await _create_records(db_session, 1, 3)
+    for _ in range(3):
+        await db_session.execute(voice_records.insert().values(user_id=1, audio_byte=b"audio", created_at=None))
+    await db_session.commit()
+    result = await db_session.execute(select(voice_records.c.id))
+    all_ids = {row.id for row in result.fetchall()}
+
+    seen = []
+    last = None
+    while True:
+        query = select(voice_records.c.id, voice_records.c.created_at).order_by(
+            *keyset_order(voice_records.c.created_at, voice_records.c.id)
+        )
+        if last is not None:
+            query = query.where(keyset_after(voice_records.c.created_at, voice_records.c.id, last.created_at, last.id))
+        rows = (await db_session.execute(query.limit(2))).fetchall()
+        if not rows:
+            break
+        seen.extend(row.id for row in rows)
+        last = rows[-1]
+
+    assert sorted(seen) == sorted(all_ids)
+    assert len(seen) == len(all_ids)
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import bcrypt
+import pytest
+
+from app.core.passwords import PasswordHasher, PasswordHasherBusyError, verify_password
+from app.core.metrics import metrics
+
+@pytest.mark.asyncio
+async def test_check_password():
+    """Test that passwords are checked in the pool."""
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4))
+
+    assert await hasher.check(b"secret", hashed) is True
+    assert await hasher.check(b"wrong", hashed) is False
+    assert metrics.snapshot()["timings"]["passwords.hash_seconds"]["count"] >= 2
+
+@pytest.mark.asyncio
+async def test_verify_password():
+    """Test that a password is stripped and checked against its stored hash."""
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+    assert await verify_password(" secret ", hashed) is True
+    assert await verify_password("wrong", hashed) is False
+
+@pytest.mark.asyncio
+async def test_rejects_beyond_queue():
+    """Test that calls beyond the pool and its queue are refused at once."""
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(hasher.run(release.wait))
+    waiting = asyncio.ensure_future(hasher.run(lambda: True))
+    await asyncio.sleep(0.01)
+    assert metrics.snapshot()["gauges"]["passwords.queue_depth"] == 1
+
+    with pytest.raises(PasswordHasherBusyError):
+        await hasher.run(lambda: True)
+
+    release.set()
+    assert await running is True
+    assert await waiting is True
+    # Capacity is back once the queue drains
+    assert await hasher.run(lambda: "done") == "done"
+    assert metrics.snapshot()["gauges"]["passwords.queue_depth"] == 0
@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import patch
+
+from app.services.principal_cache import PrincipalCache, get_principal, principal_cache
+from app.services.auth import reset_password
+from app.core.security import hash_password
+from app.models.user import users
+
+async def _create_user(db_session, username):
+    await db_session.execute(users.insert().values(
+        username=username,
+        password_hash=hash_password("testpassword"),
+        role="user",
+        lang="en",
+        conf={}
+    ))
+    await db_session.commit()
+
+def test_principal_cache_expires():
+    """Test that cached users are dropped after the TTL."""
+    cache = PrincipalCache(max_entries=10, ttl=60)
+    with patch("app.services.principal_cache.time.monotonic", return_value=100.0):
+        cache.set("alice", "row")
+    with patch("app.services.principal_cache.time.monotonic", return_value=150.0):
+        assert cache.get("alice") == "row"
+    with patch("app.services.principal_cache.time.monotonic", return_value=161.0):
+        assert cache.get("alice") is None
+
+def test_principal_cache_is_bounded():
+    """Test that the least recently used users are evicted beyond max_entries."""
+    cache = PrincipalCache(max_entries=2, ttl=60)
+    cache.set("alice", "a")
+    cache.set("bob", "b")
+    cache.get("alice")
+    cache.set("carol", "c")
+
+    assert cache.get("bob") is None
+    assert cache.get("alice") == "a"
+    assert cache.get("carol") == "c"
+
+@pytest.mark.asyncio
+async def test_get_principal_uses_cache(db_session):
+    """Test that a cached user is returned without querying the database."""
+    await _create_user(db_session, "testuser")
+    user = await get_principal(db_session, "testuser")
+    assert user.username == "testuser"
+
+    # The row changes behind the cache's back
+    await db_session.execute(users.update().where(users.c.username == "testuser").values(lang="de"))
+    await db_session.commit()
+    assert (await get_principal(db_session, "testuser")).lang == user.lang
+
+    principal_cache.invalidate("testuser")
+    assert (await get_principal(db_session, "testuser")).lang == "de"
+
+@pytest.mark.asyncio
+async def test_get_principal_does_not_cache_missing_users(db_session):
+    """Test that an unknown username is looked up again on the next request."""
+    assert await get_principal(db_session, "newuser") is None
+
+    await db_session.execute(users.insert().values(
+        username="newuser",
+        email="new@example.com",
+        password_hash="",
+        role="user",
+        lang="en",
+        conf={}
+    ))
+    await db_session.commit()
+
+    assert (await get_principal(db_session, "newuser")).username == "newuser"
+
+@pytest.mark.asyncio
+async def test_reset_password_invalidates(db_session):
+    """Test that a password reset drops the cached user."""
+    await _create_user(db_session, "testuser")
+    old_hash = (await get_principal(db_session, "testuser")).password_hash
+
+    assert await reset_password("testuser", "newpassword", db_session) is True
+
+    assert (await get_principal(db_session, "testuser")).password_hash != old_hash
@@ -0,0 +1,72 @@
+import hashlib
+import pytest
+from sqlalchemy import select
+
+from app.services.recording import append_chunk, load_recording_audio, finalize_recording
+from app.models.transcription import voice_records, voice_chunks
+
+@pytest.mark.asyncio
+async def test_append_and_load_recording(db_session, create_record):
+    """Test that appended chunks are assembled in order on read."""
+    record_id = await create_record()
+
+    # Append out of order to make sure seq decides the order
+    await append_chunk(db_session, record_id, 2, b"-two")
+    await append_chunk(db_session, record_id, 1, b"-one")
+
+    audio_data = await load_recording_audio(db_session, record_id)
+
+    assert audio_data == b"head-one-two"
+
+@pytest.mark.asyncio
+async def test_load_recording_nonexistent(db_session):
+    """Test loading audio for a nonexistent recording."""
+    audio_data = await load_recording_audio(db_session, 999)
+
+    assert audio_data is None
+
+@pytest.mark.asyncio
+async def test_finalize_recording(db_session, create_record):
+    """Test that finalizing folds the chunks into audio_byte."""
+    record_id = await create_record()
+    await append_chunk(db_session, record_id, 1, b"-one")
+    await append_chunk(db_session, record_id, 2, b"-two")
+
+    audio_data = await finalize_recording(db_session, record_id)
+
+    assert audio_data == b"head-one-two"
+
+    # Verify the blob was rewritten and the chunks removed
+    query = select(voice_records.c.audio_byte, voice_records.c.audio_ref).where(voice_records.c.id == record_id)
+    result = await db_session.execute(query)
+    record = result.fetchone()
+    assert record.audio_byte == b"head-one-two"
+    assert record.audio_ref == hashlib.sha256(b"head-one-two").hexdigest()
+
+    query = select(voice_chunks).where(voice_chunks.c.record_id == record_id)
+    result = await db_session.execute(query)
+    assert result.fetchall() == []
+
+    # Reading after finalize returns the same audio
+    assert await load_recording_audio(db_session, record_id) == b"head-one-two"
+
+@pytest.mark.asyncio
+async def test_finalize_single_chunk_recording(db_session, create_record):
+    """Test that a recording with nothing to fold still gets its content hash."""
+    record_id = await create_record()
+
+    assert await finalize_recording(db_session, record_id) == b"head"
+
+    result = await db_session.execute(select(voice_records.c.audio_ref).where(voice_records.c.id == record_id))
+    assert result.scalar() == hashlib.sha256(b"head").hexdigest()
+
+@pytest.mark.asyncio
+async def test_append_chunk_tracks_size(db_session, create_record):
+    """Test that audio_size follows appended chunks without reading the blob."""
+    record_id = await create_record()
+    await append_chunk(db_session, record_id, 1, b"-one")
+    await append_chunk(db_session, record_id, 2, b"-two")
+
+    query = select(voice_records.c.audio_size).where(voice_records.c.id == record_id)
+    result = await db_session.execute(query)
+    assert result.scalar_one() == len(b"head-one-two")
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.services.rendition_cache import RenditionCache, rendition_key
+from app.services.recording import append_chunk, finalize_recording
+from app.services.transcription import get_transcription_audio
+
+def test_memory_tier_evicts_least_recently_used():
+    """Test that the memory tier stays within its byte budget, dropping the oldest entries."""
+    cache = RenditionCache(max_memory_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"  # b is now the least recently used
+
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+
+def test_disk_tier(tmp_path):
+    """Test that renditions survive a restart and the disk tier is bounded by size."""
+    cache = RenditionCache(max_memory_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=10)
+    cache.set(rendition_key("first", "mp4"), b"11111")
+    cache.set(rendition_key("second", "mp4"), b"22222")
+    assert cache.get(rendition_key("first", "mp4")) == b"11111"
+    cache.set(rendition_key("third", "mp4"), b"33333")
+
+    restarted = RenditionCache(max_memory_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=10)
+
+    assert restarted.get(rendition_key("second", "mp4")) is None
+    assert restarted.get(rendition_key("first", "mp4")) == b"11111"
+    assert restarted.get(rendition_key("third", "mp4")) == b"33333"
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 2
+
+@pytest.mark.asyncio
+async def test_get_or_create_single_flight():
+    """Test that concurrent requests for a missing rendition share one encode."""
+    cache = RenditionCache(max_memory_bytes=1024)
+    calls = 0
+
+    async def produce():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"rendition"
+
+    results = await asyncio.gather(*(cache.get_or_create("key", produce) for _ in range(5)))
+
+    assert results == [b"rendition"] * 5
+    assert calls == 1
+    assert await cache.get_or_create("key", produce) == b"rendition"
+    assert calls == 1
+
+@pytest.mark.asyncio
+async def test_get_or_create_failure_is_not_cached():
+    """Test that a failed or empty encode is retried by the next request."""
+    cache = RenditionCache(max_memory_bytes=1024)
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_create("key", AsyncMock(side_effect=RuntimeError("ffmpeg failed")))
+    assert await cache.get_or_create("key", AsyncMock(return_value=None)) is None
+    assert await cache.get_or_create("key", AsyncMock(return_value=b"rendition")) == b"rendition"
+
+@pytest.mark.asyncio
+async def test_get_transcription_audio_converts_once(db_session, create_record):
+    """Test that downloads of a finished recording reuse its rendition."""
+    record_id = await create_record()
+    await append_chunk(db_session, record_id, 1, b"-one")
+
+    convert = AsyncMock(side_effect=lambda audio: b"mp4:" + audio)
+    with patch("app.services.transcription.convert_to_ios_compatible", convert):
+        # Still recording: cached under its id and current size
+        assert await get_transcription_audio(db_session, record_id) == (b"mp4:head-one", "audio/mp4")
+        assert await get_transcription_audio(db_session, record_id) == (b"mp4:head-one", "audio/mp4")
+        assert convert.await_count == 1
+
+        await append_chunk(db_session, record_id, 2, b"-two")
+        assert await get_transcription_audio(db_session, record_id) == (b"mp4:head-one-two", "audio/mp4")
+
+        await finalize_recording(db_session, record_id)
+        assert await get_transcription_audio(db_session, record_id) == (b"mp4:head-one-two", "audio/mp4")
+        assert await get_transcription_audio(db_session, record_id) == (b"mp4:head-one-two", "audio/mp4")
+        assert convert.await_count == 3
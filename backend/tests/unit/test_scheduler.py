@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+
+from app.services.scheduler import (
+    TranscriptionScheduler,
+    StaleJobError,
+    PRIORITY_FINAL,
+    PRIORITY_COMMITTED,
+    PRIORITY_PREVIEW
+)
+
+async def _blocked_scheduler():
+    """Return a scheduler with its only slot held until the returned event is set."""
+    scheduler = TranscriptionScheduler(max_concurrency=1)
+    release = asyncio.Event()
+    blocker = asyncio.create_task(scheduler.run(release.wait, user_id="blocker"))
+    await asyncio.sleep(0)
+    return scheduler, release, blocker
+
+@pytest.mark.asyncio
+async def test_higher_priority_runs_first():
+    """Test that final jobs run before previews queued earlier."""
+    scheduler, release, blocker = await _blocked_scheduler()
+    order = []
+
+    async def job(name):
+        order.append(name)
+
+    preview = asyncio.create_task(scheduler.run(lambda: job("preview"), priority=PRIORITY_PREVIEW))
+    final = asyncio.create_task(scheduler.run(lambda: job("final"), priority=PRIORITY_FINAL))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocker, preview, final)
+
+    assert order == ["final", "preview"]
+
+@pytest.mark.asyncio
+async def test_users_are_served_round_robin():
+    """Test that a user with many queued jobs does not starve another user."""
+    scheduler, release, blocker = await _blocked_scheduler()
+    order = []
+
+    async def job(name):
+        order.append(name)
+
+    tasks = [asyncio.create_task(scheduler.run(lambda i=i: job(f"a{i}"), user_id="a")) for i in range(3)]
+    tasks.append(asyncio.create_task(scheduler.run(lambda: job("b0"), user_id="b")))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocker, *tasks)
+
+    assert order == ["a0", "b0", "a1", "a2"]
+
+@pytest.mark.asyncio
+async def test_newer_preview_replaces_queued_one():
+    """Test that a queued preview is dropped when the same session submits another."""
+    scheduler, release, blocker = await _blocked_scheduler()
+
+    async def job(name):
+        return name
+
+    old = asyncio.create_task(scheduler.run(lambda: job("old"), session_id="s", priority=PRIORITY_PREVIEW))
+    await asyncio.sleep(0)
+    new = asyncio.create_task(scheduler.run(lambda: job("new"), session_id="s", priority=PRIORITY_PREVIEW))
+    await asyncio.sleep(0)
+    release.set()
+
+    with pytest.raises(StaleJobError):
+        await old
+    assert await new == "new"
+    assert scheduler.dropped_stale == 1
+    await blocker
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """Test that no more than max_concurrency jobs run at once."""
+    scheduler = TranscriptionScheduler(max_concurrency=2)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        peak = max(peak, scheduler.running)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(scheduler.run(job, priority=PRIORITY_COMMITTED) for _ in range(6)))
+
+    assert peak == 2
+    assert scheduler.running == 0
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+from app.services.stream_decoder import StreamDecoder, StreamDecoderError
+
+@pytest.fixture
+def cat_binary(tmp_path):
+    """A stand-in for ffmpeg that copies stdin to stdout unchanged."""
+    script = tmp_path / "fake-ffmpeg"
+    script.write_text("#!/bin/sh\nexec cat\n")
+    script.chmod(0o755)
+    with patch("app.services.stream_decoder.settings.FFMPEG_BINARY", str(script)):
+        yield
+
+@pytest.mark.asyncio
+async def test_decoded_stream_is_readable_by_offset(cat_binary):
+    """Test that everything fed comes out and can be cut by absolute offsets."""
+    decoder = StreamDecoder(max_seconds=10)
+    await decoder.start()
+    decoder.feed(b"\x01\x00" * 100)
+    decoder.feed(b"\x02\x00" * 100)
+    await decoder.close()
+
+    assert decoder.end_offset == 400
+    assert decoder.pcm(0) == b"\x01\x00" * 100 + b"\x02\x00" * 100
+    assert decoder.pcm(200, 300) == b"\x02\x00" * 50
+
+@pytest.mark.asyncio
+async def test_ring_buffer_keeps_the_most_recent_audio(cat_binary):
+    """Test that old audio is dropped once the buffer is full."""
+    decoder = StreamDecoder(max_seconds=0.001)  # 32 bytes
+    await decoder.start()
+    decoder.feed(bytes(range(100)))
+    await decoder.close()
+
+    assert decoder.capacity == 32
+    assert decoder.start_offset == 68
+    assert decoder.end_offset == 100
+    # Requests for dropped audio start at the oldest byte still held
+    assert decoder.pcm(0) == bytes(range(68, 100))
+
+@pytest.mark.asyncio
+async def test_pcm_keeps_sample_alignment(cat_binary):
+    """Test that windows never start or end in the middle of a sample."""
+    decoder = StreamDecoder(max_seconds=10)
+    await decoder.start()
+    decoder.feed(bytes(10))
+    await decoder.close()
+
+    assert decoder.pcm(3, 9) == bytes(4)
+    assert decoder.pcm(8, 9) == b""
+
+@pytest.mark.asyncio
+async def test_feed_after_exit_raises(cat_binary):
+    """Test that feeding a decoder whose process is gone raises."""
+    decoder = StreamDecoder(max_seconds=10)
+    await decoder.start()
+    await decoder.abort()
+
+    with pytest.raises(StreamDecoderError):
+        decoder.feed(b"data")
+
+@pytest.mark.asyncio
+async def test_missing_binary_raises():
+    """Test that a missing ffmpeg binary is reported as a decoder error."""
+    decoder = StreamDecoder(max_seconds=10)
+    with patch("app.services.stream_decoder.settings.FFMPEG_BINARY", "/nonexistent/ffmpeg"):
+        with pytest.raises(StreamDecoderError):
+            await decoder.start()
@@ -0,0 +1,29 @@
+from app.services.transcript_merge import merge_transcripts
+
+def test_merge_drops_overlapping_words():
+    """Test that words repeated by the overlap are merged once."""
+    merged = merge_transcripts("Hello there, how are you", "how are you doing today?")
+
+    assert merged == "Hello there, how are you doing today?"
+
+def test_merge_ignores_case_and_punctuation():
+    """Test that the overlap match is case and punctuation insensitive."""
+    merged = merge_transcripts("we said yes", "Yes. And then we left.")
+
+    assert merged == "we said yes And then we left."
+
+def test_merge_skips_cut_leading_word():
+    """Test that a word cut by the window boundary does not prevent the match."""
+    merged = merge_transcripts("Hello there, how are you", "-ow are you doing today?")
+
+    assert merged == "Hello there, how are you doing today?"
+
+def test_merge_without_overlap_appends():
+    """Test that unrelated text is appended unchanged."""
+    assert merge_transcripts("one two", "three four") == "one two three four"
+
+def test_merge_empty_inputs():
+    """Test merging with empty transcripts."""
+    assert merge_transcripts("", "first words") == "first words"
+    assert merge_transcripts("first words", "") == "first words"
+    assert merge_transcripts(None, None) == ""
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.services.transcription_backends import create_backend, WhisperAPIBackend
+from fake_whisper_server import fake_transcript
+
+@pytest.mark.asyncio
+async def test_fake_backend_uses_fake_server_url():
+    """Test that the fake backend talks to the configured stand-in server."""
+    with patch("app.services.transcription_backends.settings.FAKE_WHISPER_URL", "http://fake:9000/v1"):
+        backend = create_backend("fake")
+    try:
+        assert isinstance(backend, WhisperAPIBackend)
+        assert backend.name == "fake"
+        assert str(backend.client._client.base_url).startswith("http://fake:9000/v1")
+    finally:
+        await backend.aclose()
+
+@pytest.mark.asyncio
+async def test_api_backend_delegates_to_client():
+    """Test that the API backend sends the audio through its Whisper client."""
+    backend = create_backend("openai")
+    backend.client.transcribe = AsyncMock(return_value="hello")
+    try:
+        assert await backend.transcribe(b"audio", "audio.webm") == "hello"
+        backend.client.transcribe.assert_awaited_once_with(b"audio", "audio.webm")
+    finally:
+        await backend.aclose()
+
+def test_openai_backend_needs_key():
+    """Test that only the openai backend requires OPENAI_API_KEY."""
+    with patch("app.services.transcription_backends.settings.OPENAI_API_KEY", ""):
+        with pytest.raises(ValueError):
+            create_backend("openai")
+
+def test_unknown_backend():
+    """Test that an unknown backend name is rejected."""
+    with pytest.raises(ValueError):
+        create_backend("carrier-pigeon")
+
+def test_local_backend_requires_faster_whisper():
+    """Test that the local backend fails clearly when faster-whisper is missing."""
+    with patch("app.services.transcription_backends.importlib.util.find_spec", return_value=None):
+        with pytest.raises(RuntimeError):
+            create_backend("local")
+
+def test_fake_transcript_is_deterministic():
+    """Test that the fake server returns the same text for the same audio."""
+    audio = bytes(range(256)) * 40
+
+    assert fake_transcript(audio) == fake_transcript(audio)
+    assert fake_transcript(audio) != fake_transcript(audio[1:])
+    assert fake_transcript(b"x").endswith(".")
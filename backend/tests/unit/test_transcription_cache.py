@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+from app.services.transcription_cache import TranscriptionCache, cache_key
+
+def test_cache_key_covers_params():
+    """Test that the key changes with the audio and with every parameter."""
+    key = cache_key(b"audio", "web", None)
+
+    assert key == cache_key(b"audio", "web", None)
+    assert key != cache_key(b"audio2", "web", None)
+    assert key != cache_key(b"audio", "ios", None)
+    assert key != cache_key(b"audio", "web", "audio.wav")
+
+def test_hit_and_miss_counts():
+    """Test that hits and misses are counted."""
+    cache = TranscriptionCache(max_entries=10, ttl=60)
+
+    assert cache.get("a") is None
+    cache.set("a", "hello")
+    assert cache.get("a") == "hello"
+
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+def test_empty_transcript_is_a_hit():
+    """Test that an empty transcript (silence) is cached like any other."""
+    cache = TranscriptionCache(max_entries=10, ttl=60)
+    cache.set("a", "")
+
+    assert cache.get("a") == ""
+    assert cache.hits == 1
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted over the limit."""
+    cache = TranscriptionCache(max_entries=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_ttl_expiry():
+    """Test that entries older than the TTL are misses."""
+    cache = TranscriptionCache(max_entries=10, ttl=60)
+    with patch("app.services.transcription_cache.time.time", return_value=1000.0):
+        cache.set("a", "hello")
+    with patch("app.services.transcription_cache.time.time", return_value=1061.0):
+        assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that a new cache instance reads entries written by an old one."""
+    TranscriptionCache(max_entries=10, ttl=60, disk_dir=str(tmp_path)).set("ab12", "hello")
+
+    cache = TranscriptionCache(max_entries=10, ttl=60, disk_dir=str(tmp_path))
+
+    assert cache.get("ab12") == "hello"
+    assert cache.stats()["entries"] == 1
+
+def test_disk_tier_expiry(tmp_path):
+    """Test that expired disk entries are misses and are removed."""
+    with patch("app.services.transcription_cache.time.time", return_value=1000.0):
+        TranscriptionCache(max_entries=10, ttl=60, disk_dir=str(tmp_path)).set("ab12", "hello")
+
+    cache = TranscriptionCache(max_entries=10, ttl=60, disk_dir=str(tmp_path))
+    with patch("app.services.transcription_cache.time.time", return_value=1061.0):
+        assert cache.get("ab12") is None
+    assert not (tmp_path / "ab" / "ab12.json").exists()
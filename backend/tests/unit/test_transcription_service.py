@@ -1,6 +1,6 @@
 import pytest
 import io
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from sqlalchemy import select, func
 
 from app.services.transcription import (
@@ -18,12 +18,12 @@ async def test_transcribe_audio():
     # Create a mock audio file
     audio_file = io.BytesIO(b"mock audio data")
     
-    # Mock the OpenAI API response
-    mock_response = MagicMock()
-    mock_response.text = "This is a test transcription."
+    # Mock the transcription backend
+    mock_client = MagicMock()
+    mock_client.transcribe = AsyncMock(return_value="This is a test transcription.")
     
-    # Patch the OpenAI API call
-    with patch("openai.Audio.atranscribe", return_value=mock_response):
+    # Patch the transcription backend
+    with patch("app.services.transcription.get_transcription_backend", return_value=mock_client):
         # Transcribe the audio
         result = await transcribe_audio(audio_file)
         
@@ -32,18 +32,18 @@ async def test_transcribe_audio():
 
 @pytest.mark.asyncio
 async def test_transcribe_audio_error():
-    """Test audio transcription error handling."""
-    # Create a mock audio file
-    audio_file = io.BytesIO(b"mock audio data")
+    """Test that a backend error is logged and reported as no transcript."""
+    # Mock the transcription backend to raise an exception
+    mock_client = MagicMock()
+    mock_client.transcribe = AsyncMock(side_effect=Exception("API error"))
     
-    # Mock the OpenAI API call to raise an exception
-    with patch("openai.Audio.atranscribe", side_effect=Exception("API error")):
+    with patch("app.services.transcription.get_transcription_backend", return_value=mock_client):
         # Transcribe the audio
-        with pytest.raises(Exception) as excinfo:
-            await transcribe_audio(audio_file)
+        result = await transcribe_audio(b"mock audio data")
         
-        # Verify the exception
-        assert str(excinfo.value) == "API error"
+        # The error does not propagate
+        assert result is None
+        mock_client.transcribe.assert_awaited()
 
 @pytest.mark.asyncio
 async def test_delete_transcription_success(db_session):
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.services.ffmpeg import FFmpegError
+from app.services.upload_encoder import prepare_upload
+
+async def _half_size(audio_data, output_args, input_args=None):
+    """Stand-in encoder whose output is half the size of its input."""
+    return audio_data[:len(audio_data) // 2]
+
+@pytest.mark.asyncio
+async def test_compressed_upload_is_sent_as_is():
+    """Test that already compressed audio is not re-encoded."""
+    with patch("app.services.upload_encoder.transcode", AsyncMock()) as transcode:
+        parts = await prepare_upload(b"webm data", "audio.webm")
+
+    assert parts == [(b"webm data", "audio.webm")]
+    transcode.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_wav_upload_is_encoded():
+    """Test that WAV uploads are re-encoded with the configured encoder."""
+    with patch("app.services.upload_encoder.settings.UPLOAD_ENCODING", "opus"), \
+         patch("app.services.upload_encoder.transcode", AsyncMock(return_value=b"ogg")) as transcode:
+        parts = await prepare_upload(b"wav data" * 100, "audio.wav")
+
+    assert parts == [(b"ogg", "audio.ogg")]
+    output_args = transcode.call_args[0][1]
+    assert output_args[output_args.index('-ar') + 1] == '16000'
+    assert output_args[output_args.index('-c:a') + 1] == 'libopus'
+
+@pytest.mark.asyncio
+async def test_encoding_failure_sends_original():
+    """Test that the original audio is sent when encoding fails."""
+    with patch("app.services.upload_encoder.settings.UPLOAD_ENCODING", "flac"), \
+         patch("app.services.upload_encoder.transcode", AsyncMock(side_effect=FFmpegError("failed"))):
+        parts = await prepare_upload(b"wav data", "audio.wav")
+
+    assert parts == [(b"wav data", "audio.wav")]
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_split():
+    """Test that audio over the upload limit is split into parts that fit, in order."""
+    pcm = bytes(range(256)) * 64  # 16384 bytes
+    with patch("app.services.upload_encoder.settings.UPLOAD_ENCODING", "flac"), \
+         patch("app.services.upload_encoder.settings.WHISPER_MAX_UPLOAD_BYTES", 3000), \
+         patch("app.services.upload_encoder.transcode", side_effect=_half_size), \
+         patch("app.services.upload_encoder.decode_to_pcm", AsyncMock(return_value=pcm)):
+        parts = await prepare_upload(b"x" * 20000, "audio.wav")
+
+    assert len(parts) > 1
+    assert all(len(part) <= 3000 and filename == "audio.flac" for part, filename in parts)
+    assert sum(len(part) for part, _ in parts) == len(pcm) // 2
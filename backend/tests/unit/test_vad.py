@@ -0,0 +1,38 @@
+from app.services.vad import find_speech, frame_levels, FRAME_SAMPLES
+from app.services.pcm import SAMPLE_RATE, SAMPLE_WIDTH
+
+def test_frame_levels(tone_pcm):
+    """Test that frame levels separate silence from a loud tone."""
+    levels = frame_levels(tone_pcm((0.2, 0.0), (0.2, 0.5)))
+
+    assert len(levels) == 20
+    assert levels[:10].max() < -90
+    assert levels[10:].min() > -10
+
+def test_silent_audio_is_skipped(tone_pcm):
+    """Test that silence and faint noise are reported as no speech."""
+    assert find_speech(tone_pcm((2.0, 0.0))) is None
+    assert find_speech(tone_pcm((2.0, 0.001))) is None
+
+def test_short_blip_is_not_speech(tone_pcm):
+    """Test that less than min_speech_ms of sound counts as silence."""
+    assert find_speech(tone_pcm((1.0, 0.0), (0.1, 0.5), (1.0, 0.0)), min_speech_ms=200) is None
+
+def test_speech_is_trimmed_with_padding(tone_pcm):
+    """Test that leading and trailing silence is trimmed, keeping the padding."""
+    pcm = tone_pcm((2.0, 0.0), (1.0, 0.5), (2.0, 0.0))
+
+    start, end = find_speech(pcm, padding_ms=300)
+
+    bytes_per_ms = SAMPLE_RATE * SAMPLE_WIDTH // 1000
+    assert start == 1700 * bytes_per_ms
+    assert end == 3300 * bytes_per_ms
+    assert start % (FRAME_SAMPLES * SAMPLE_WIDTH) == 0
+
+def test_speech_up_to_the_end_keeps_partial_frame(tone_pcm):
+    """Test that speech running to the end keeps every trailing byte."""
+    pcm = tone_pcm((1.0, 0.0), (1.005, 0.5))
+
+    start, end = find_speech(pcm)
+
+    assert end == len(pcm)
@@ -0,0 +1,61 @@
+import pytest
+
+from app.services.webm import WebMSplicer, WebMParseError, UNKNOWN_SIZE
+
+def _element(element_id: bytes, payload: bytes, unknown_size: bool = False) -> bytes:
+    """Build an EBML element with a 2-byte size (or unknown size)."""
+    if unknown_size:
+        return element_id + UNKNOWN_SIZE + payload
+    return element_id + bytes([0x40 | (len(payload) >> 8), len(payload) & 0xFF]) + payload
+
+EBML_HEADER = _element(b'\x1a\x45\xdf\xa3', _element(b'\x42\x82', b'webm'))
+SEGMENT_START = b'\x18\x53\x80\x67' + UNKNOWN_SIZE
+SEEK_HEAD = _element(b'\x11\x4d\x9b\x74', b'seek')
+INFO = _element(b'\x15\x49\xa9\x66', _element(b'\x2a\xd7\xb1', b'\x0f\x42\x40'))
+TRACKS = _element(b'\x16\x54\xae\x6b', _element(b'\xae', _element(b'\xd7', b'\x01')))
+
+def _cluster(index: int) -> bytes:
+    timecode = _element(b'\xe7', bytes([index]))
+    block = _element(b'\xa3', b'\x81\x00\x00\x80' + bytes(40))
+    # MediaRecorder writes unknown-sized Clusters; mix both kinds
+    return _element(b'\x1f\x43\xb6\x75', timecode + block, unknown_size=index % 2 == 0)
+
+STREAM = EBML_HEADER + SEGMENT_START + SEEK_HEAD + INFO + TRACKS + b"".join(_cluster(i) for i in range(5))
+
+def test_splicer_captures_init_segment_across_chunks():
+    """Test that the init segment is captured when split over arbitrary chunks."""
+    splicer = WebMSplicer()
+    for offset in range(0, len(STREAM), 7):
+        splicer.feed(STREAM[offset:offset + 7])
+
+    assert splicer.ready
+    # SeekHead is dropped because its offsets no longer hold
+    assert splicer.init_segment == EBML_HEADER + SEGMENT_START + INFO + TRACKS
+    assert splicer.cluster_count == 5
+
+def test_splicer_window_is_a_valid_stream():
+    """Test that a window of Clusters parses as a standalone WebM stream."""
+    splicer = WebMSplicer()
+    splicer.feed(STREAM)
+
+    window = splicer.window(2, 4)
+
+    reparsed = WebMSplicer()
+    reparsed.feed(window)
+    assert reparsed.init_segment == splicer.init_segment
+    assert reparsed.cluster_count == 2
+
+def test_splicer_rejects_non_webm():
+    """Test that a non-WebM stream raises a parse error."""
+    splicer = WebMSplicer()
+
+    with pytest.raises(WebMParseError):
+        splicer.feed(b'\x00\x00\x00\x18ftypmp42')
+
+def test_window_before_header_raises():
+    """Test that a window cannot be built before the header arrives."""
+    splicer = WebMSplicer()
+    splicer.feed(EBML_HEADER[:3])
+
+    with pytest.raises(WebMParseError):
+        splicer.window()
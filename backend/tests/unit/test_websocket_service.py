@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import AsyncMock
+from sqlalchemy import select
+
+from app.core.security import create_access_token
+from app.services.websocket_service import WebSocketService
+from app.services.write_batcher import WriteBatcher
+from app.models.transcription import voice_records, voice_chunks
+from app.models.user import users
+
+class FakeWebSocket:
+    """Client that authenticates, sends chunks and disconnects."""
+
+    def __init__(self, token, chunks):
+        self.query_params = {"client_type": "web"}
+        self.messages = [{"type": "websocket.receive", "bytes": chunk} for chunk in chunks]
+        self.messages.append({"type": "websocket.disconnect", "code": 1000})
+        self.token = token
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def receive_json(self):
+        return {"type": "auth", "token": self.token}
+
+    async def receive(self):
+        return self.messages.pop(0)
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+@pytest.fixture
+async def recorder(db_session, monkeypatch):
+    """A user, a token for them, and transcription and probing patched out."""
+    await db_session.execute(users.insert().values(
+        username="recorder",
+        password_hash="",
+        role="user",
+        lang="en"
+    ))
+    await db_session.commit()
+    monkeypatch.setattr("app.services.websocket_service.settings.RENDITION_PREGENERATE", False)
+    monkeypatch.setattr("app.services.websocket_service.store_audio_metadata", AsyncMock())
+    monkeypatch.setattr(WebSocketService, "_transcribe", AsyncMock(return_value="hello"))
+    monkeypatch.setattr(WebSocketService, "_get_window_audio", AsyncMock(return_value=b"window"))
+    return create_access_token({"sub": "recorder", "role": "user"})
+
+@pytest.mark.asyncio
+async def test_session_writes_through_factory(db_session, session_factory, recorder, monkeypatch):
+    """Test that a recording is written with short sessions from the factory."""
+    monkeypatch.setattr("app.services.websocket_service.get_write_batcher", lambda: None)
+    opened = []
+
+    def counting_factory():
+        opened.append(True)
+        return session_factory()
+
+    chunks = [b"one", b"two", b"three", b"four"]
+    await WebSocketService(counting_factory).handle_connection(FakeWebSocket(recorder, chunks), "session-1")
+
+    result = await db_session.execute(select(voice_records.c.audio_byte, voice_records.c.transcript))
+    record = result.fetchone()
+    assert record.audio_byte == b"onetwothreefour"
+    assert record.transcript == "hello"
+    assert (await db_session.execute(select(voice_chunks.c.id))).fetchall() == []
+    # Principal, insert, three appends, transcript and finalize each had a session of their own
+    assert len(opened) >= 7
+
+@pytest.mark.asyncio
+async def test_session_flushes_batcher_on_disconnect(db_session, session_factory, recorder, monkeypatch):
+    """Test that queued writes are committed before the recording is finalized."""
+    batcher = WriteBatcher(session_factory, max_delay=60, max_rows=100, max_bytes=1024)
+    monkeypatch.setattr("app.services.websocket_service.get_write_batcher", lambda: batcher)
+
+    chunks = [b"one", b"two", b"three", b"four"]
+    await WebSocketService(session_factory).handle_connection(FakeWebSocket(recorder, chunks), "session-1")
+
+    assert batcher.pending() == 0
+    result = await db_session.execute(select(voice_records.c.audio_byte, voice_records.c.transcript))
+    record = result.fetchone()
+    assert record.audio_byte == b"onetwothreefour"
+    assert record.transcript == "hello"
@@ -0,0 +1,53 @@
+import pytest
+import httpx
+from unittest.mock import patch, AsyncMock
+
+from app.services.whisper_client import WhisperClient, WhisperError
+
+def _response(status_code, json=None, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/audio/transcriptions")
+    return httpx.Response(status_code, json=json, headers=headers, request=request)
+
+@pytest.mark.asyncio
+async def test_transcribe_retries_on_rate_limit():
+    """Test that 429 responses are retried with backoff."""
+    client = WhisperClient(api_key="test", backoff_base=0, backoff_max=0)
+    responses = [
+        _response(429, json={"error": "rate limited"}),
+        _response(200, json={"text": "hello"})
+    ]
+
+    with patch.object(client._client, "post", AsyncMock(side_effect=responses)) as mock_post, \
+         patch("app.services.whisper_client.asyncio.sleep", AsyncMock()):
+        result = await client.transcribe(b"audio", "audio.webm")
+
+    assert result == "hello"
+    assert mock_post.call_count == 2
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_transcribe_does_not_retry_client_errors():
+    """Test that 4xx responses other than 429 fail immediately."""
+    client = WhisperClient(api_key="test")
+
+    with patch.object(client._client, "post", AsyncMock(return_value=_response(400, json={}))) as mock_post:
+        with pytest.raises(WhisperError) as excinfo:
+            await client.transcribe(b"audio", "audio.webm")
+
+    assert excinfo.value.status_code == 400
+    assert mock_post.call_count == 1
+    await client.aclose()
+
+@pytest.mark.asyncio
+async def test_transcribe_gives_up_after_max_retries():
+    """Test that persistent server errors are raised after the retry budget."""
+    client = WhisperClient(api_key="test", max_retries=2, backoff_base=0, backoff_max=0)
+
+    with patch.object(client._client, "post", AsyncMock(return_value=_response(503, json={}))) as mock_post, \
+         patch("app.services.whisper_client.asyncio.sleep", AsyncMock()):
+        with pytest.raises(WhisperError) as excinfo:
+            await client.transcribe(b"audio", "audio.webm")
+
+    assert excinfo.value.status_code == 503
+    assert mock_post.call_count == 3
+    await client.aclose()
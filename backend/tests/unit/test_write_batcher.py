@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+
+from app.services.write_batcher import WriteBatcher
+from app.models.transcription import voice_records, voice_chunks
+
+async def _chunks(db_session, record_id):
+    query = select(voice_chunks.c.seq, voice_chunks.c.chunk_byte).where(voice_chunks.c.record_id == record_id).order_by(voice_chunks.c.seq)
+    result = await db_session.execute(query)
+    return [(row.seq, row.chunk_byte) for row in result.fetchall()]
+
+async def _record(db_session, record_id):
+    query = select(voice_records.c.audio_size, voice_records.c.transcript).where(voice_records.c.id == record_id)
+    result = await db_session.execute(query)
+    return result.fetchone()
+
+@pytest.mark.asyncio
+async def test_flush_on_size(db_session, session_factory, create_record):
+    """Test that a full batch is written at once, in one transaction."""
+    record_id = await create_record()
+    batcher = WriteBatcher(session_factory, max_delay=60, max_rows=4, max_bytes=1024)
+
+    await batcher.add_chunk(record_id, 1, b"-one")
+    await batcher.add_chunk(record_id, 2, b"-two")
+    await batcher.set_transcript(record_id, "hello")
+    assert await _chunks(db_session, record_id) == []
+
+    # Only the latest transcript of a recording counts towards the batch
+    await batcher.set_transcript(record_id, "hello world")
+    await batcher.add_chunk(record_id, 3, b"-three")
+
+    assert batcher.pending() == 0
+    assert await _chunks(db_session, record_id) == [(1, b"-one"), (2, b"-two"), (3, b"-three")]
+    record = await _record(db_session, record_id)
+    assert record.audio_size == len(b"head-one-two-three")
+    assert record.transcript == "hello world"
+
+@pytest.mark.asyncio
+async def test_flush_on_delay(db_session, session_factory, create_record):
+    """Test that queued writes are committed after max_delay."""
+    record_id = await create_record()
+    batcher = WriteBatcher(session_factory, max_delay=0.01, max_rows=100, max_bytes=1024)
+
+    await batcher.add_chunk(record_id, 1, b"-one")
+    await asyncio.sleep(0.1)
+
+    assert batcher.pending() == 0
+    assert await _chunks(db_session, record_id) == [(1, b"-one")]
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_writes(db_session, session_factory, create_record):
+    """Test that a failed flush queues its writes again and a later flush writes them."""
+    record_id = await create_record()
+
+    def broken_factory():
+        raise ConnectionError("database is down")
+
+    batcher = WriteBatcher(broken_factory, max_delay=60, max_rows=100, max_bytes=1024)
+    await batcher.add_chunk(record_id, 1, b"-one")
+    await batcher.set_transcript(record_id, "old")
+
+    with pytest.raises(ConnectionError):
+        await batcher.flush()
+    assert batcher.pending() == 2
+
+    # A transcript queued after the failure replaces the one put back
+    await batcher.set_transcript(record_id, "new")
+    batcher.session_factory = session_factory
+    await batcher.flush()
+
+    assert await _chunks(db_session, record_id) == [(1, b"-one")]
+    assert (await _record(db_session, record_id)).transcript == "new"
+
+@pytest.mark.asyncio
+async def test_bad_row_does_not_block_other_recordings(db_session, session_factory, create_record):
+    """Test that a chunk violating a constraint is dropped and the rest of its batch written."""
+    first_id = await create_record()
+    second_id = await create_record()
+    batcher = WriteBatcher(session_factory, max_delay=60, max_rows=100, max_bytes=1024)
+    await batcher.add_chunk(first_id, 1, b"-one")
+    await batcher.flush()
+
+    # Same seq again, as after a retried flush whose commit had landed
+    await batcher.add_chunk(first_id, 1, b"-one")
+    await batcher.add_chunk(second_id, 1, b"-other")
+    await batcher.set_transcript(second_id, "other")
+    await batcher.flush()
+
+    assert batcher.pending() == 0
+    assert await _chunks(db_session, first_id) == [(1, b"-one")]
+    assert (await _record(db_session, first_id)).audio_size == len(b"head-one")
+    assert await _chunks(db_session, second_id) == [(1, b"-other")]
+    assert (await _record(db_session, second_id)).transcript == "other"
+
+@pytest.mark.asyncio
+async def test_failed_batch_dropped_after_max_retries():
+    """Test that a batch failing for another reason is queued again at most max_retries times."""
+    def broken_factory():
+        raise ConnectionError("database is down")
+
+    batcher = WriteBatcher(broken_factory, max_delay=60, max_rows=100, max_bytes=1024, max_retries=1)
+    await batcher.add_chunk(1, 1, b"-one")
+
+    with pytest.raises(ConnectionError):
+        await batcher.flush()
+    assert batcher.pending() == 1
+
+    with pytest.raises(ConnectionError):
+        await batcher.flush()
+    assert batcher.pending() == 0
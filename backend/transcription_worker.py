@@ -0,0 +1,75 @@
+"""
+Transcription job worker.
+
+Claims jobs from transcription_jobs and runs them. Start as many copies as
+needed, on any host that reaches the database:
+
+    python transcription_worker.py
+"""
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.db.session import AsyncSessionFactory
+from app.services.jobs import claim_job, complete_job, extend_lock, fail_job, run_final_pass
+from app.services.transcription_backends import close_transcription_backend
+
+logger = logging.getLogger(__name__)
+
+async def heartbeat(job_id: int):
+    """Keep extending the visibility timeout while the job runs."""
+    while True:
+        await asyncio.sleep(settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3)
+        try:
+            async with AsyncSessionFactory() as db:
+                await extend_lock(db, job_id)
+        except Exception as e:
+            # Tried again at the next beat, well before the timeout runs out; ending
+            # here would let a second worker claim the job while this one runs it
+            logger.error(f"Failed to extend the lock of job {job_id}: {e}")
+
+async def work(stop: asyncio.Event, number: int):
+    """Claim and run jobs one at a time until stop is set."""
+    while not stop.is_set():
+        try:
+            async with AsyncSessionFactory() as db:
+                job = await claim_job(db)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(stop.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                logger.info(f"Worker {number} running job {job.id} for recording {job.record_id} (attempt {job.attempts})")
+                lock = asyncio.create_task(heartbeat(job.id))
+                try:
+                    await run_final_pass(db, job.record_id)
+                except Exception as e:
+                    await db.rollback()
+                    await fail_job(db, job, str(e))
+                else:
+                    await complete_job(db, job.id)
+                finally:
+                    lock.cancel()
+        except Exception as e:
+            # Database unavailable and the like; the job, if any, comes back after its timeout
+            logger.error(f"Worker {number} error: {e}")
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish the jobs in progress, then exit
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Starting {settings.JOB_WORKER_CONCURRENCY} transcription job workers")
+    try:
+        await asyncio.gather(*(work(stop, number) for number in range(settings.JOB_WORKER_CONCURRENCY)))
+    finally:
+        await close_transcription_backend()
+
+if __name__ == "__main__":
+    asyncio.run(main())